@@ -0,0 +1,104 @@
+import math
+import threading
+import time
+
+
+class AdmissionRejected(Exception):
+    """Żądanie odrzucone przez kontrolę przyjęć; status HTTP i sugerowany Retry-After (s)."""
+
+    def __init__(self, message: str, status: int, retry_after: int | None = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Kontrola przyjęć przed syntezą. Dla każdego modelu przyjmuje najwyżej
+    max_pending żądań naraz (czekających i wykonywanych); kolejne dostają 429
+    z Retry-After wyliczonym ze średniego czasu obsługi. Żądanie o więcej niż
+    max_chunks fragmentach split_text (tekst albo łącznie wszystkie linie wsadu
+    lub projektu) jest odrzucane (413), a przy RSS / pamięci
+    CUDA ponad progiem nowe żądania dostają 503 do czasu zwolnienia pamięci.
+    memory_probe() zwraca (rss_mb, vram_mb); każda z wartości może być None.
+    """
+
+    def __init__(self, max_pending: int = 16, max_chunks: int = 100, max_rss_mb: float | None = None,
+                 max_vram_mb: float | None = None, memory_probe=None, default_retry_after: int = 5):
+        self.max_pending = max_pending
+        self.max_chunks = max_chunks
+        self.max_rss_mb = max_rss_mb
+        self.max_vram_mb = max_vram_mb
+        self.memory_probe = memory_probe
+        self.default_retry_after = default_retry_after
+        self._pending: dict[str, int] = {}
+        self._avg_seconds: dict[str, float] = {}
+        self._rejected = {"queue_full": 0, "too_large": 0, "memory": 0}
+        self._lock = threading.Lock()
+
+    def _retry_after(self, model_name: str, waiting: int) -> int:
+        average = self._avg_seconds.get(model_name)
+        if average is None:
+            return self.default_retry_after
+        return max(1, min(300, math.ceil(average * waiting)))
+
+    def acquire(self, model_name: str, chunks: int | None = None) -> tuple[str, float]:
+        """Rezerwuje miejsce dla żądania albo rzuca AdmissionRejected. Zwraca bilet dla release()."""
+        if chunks is not None:
+            self.check_size(chunks)
+
+        if self.memory_probe is not None and (self.max_rss_mb or self.max_vram_mb):
+            rss, vram = self.memory_probe()
+            over = None
+            if self.max_rss_mb and rss is not None and rss > self.max_rss_mb:
+                over = f"RSS {rss:.0f} MB > {self.max_rss_mb:.0f} MB"
+            elif self.max_vram_mb and vram is not None and vram > self.max_vram_mb:
+                over = f"VRAM {vram:.0f} MB > {self.max_vram_mb:.0f} MB"
+            if over is not None:
+                with self._lock:
+                    self._rejected["memory"] += 1
+                    retry_after = self._retry_after(model_name, 1)
+                raise AdmissionRejected(f"Server under memory pressure ({over})", 503, retry_after)
+
+        with self._lock:
+            pending = self._pending.get(model_name, 0)
+            if pending >= self.max_pending:
+                self._rejected["queue_full"] += 1
+                raise AdmissionRejected(
+                    f"Too many pending requests for '{model_name}' ({pending}/{self.max_pending})", 429,
+                    self._retry_after(model_name, pending - self.max_pending + 1))
+            self._pending[model_name] = pending + 1
+        return model_name, time.monotonic()
+
+    def check_size(self, chunks: int) -> None:
+        """
+        Rzuca AdmissionRejected (413), gdy żądanie ma więcej niż max_chunks fragmentów.
+        Osobno od acquire() - np. dla skryptu projektu liczba linii do syntezy jest znana
+        dopiero po porównaniu z indeksem.
+        """
+        if self.max_chunks and chunks > self.max_chunks:
+            with self._lock:
+                self._rejected["too_large"] += 1
+            raise AdmissionRejected(
+                f"Text too long: {chunks} chunks (limit {self.max_chunks}). Split it into smaller requests.", 413)
+
+    def release(self, ticket: tuple[str, float]) -> None:
+        model_name, started_at = ticket
+        elapsed = time.monotonic() - started_at
+        with self._lock:
+            self._pending[model_name] -= 1
+            average = self._avg_seconds.get(model_name)
+            # Średnia wykładnicza - szybko nadąża za zmianą długości tekstów
+            self._avg_seconds[model_name] = elapsed if average is None else 0.8 * average + 0.2 * elapsed
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_pending": self.max_pending,
+                "max_chunks": self.max_chunks,
+                "max_rss_mb": self.max_rss_mb,
+                "max_vram_mb": self.max_vram_mb,
+                "pending": dict(self._pending),
+                "avg_seconds": {k: round(v, 2) for k, v in self._avg_seconds.items()},
+                "rejected": dict(self._rejected),
+            }
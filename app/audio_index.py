@@ -0,0 +1,196 @@
+import atexit
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+from generators.audio_io import read_pcm
+
+AUDIO_INDEX_NAME = ".tts_audio.json"
+AUDIO_INDEX_VERSION = 1
+# Zapis indeksu jest odkładany - seria plików w jednym katalogu to jeden zapis JSON
+SAVE_DELAY = 2.0
+# Ile indeksów katalogów trzymać w pamięci (najdawniej używany jest zapisywany i zamykany)
+MAX_OPEN_DIRECTORIES = 64
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def _dbfs(value: float) -> float | None:
+    return round(20 * math.log10(value), 2) if value > 0 else None
+
+
+def describe_pcm(samples: np.ndarray, sample_rate: int) -> dict:
+    """Czas trwania, format i poziomy (szczyt / RMS w dBFS) próbek float."""
+    levels = PcmLevels(sample_rate)
+    levels.add(samples)
+    return levels.to_dict()
+
+
+class PcmLevels:
+    """Wynik describe_pcm liczony blokami - dla nagrań zapisywanych do pliku po kawałku."""
+
+    def __init__(self, sample_rate: int):
+        self.sample_rate = sample_rate
+        self.frames = 0
+        self.channels = 1
+        self._peak = 0.0
+        self._sum_squares = 0.0
+        self._count = 0
+
+    def add(self, samples: np.ndarray) -> None:
+        samples = np.asarray(samples, dtype=np.float32)
+        if samples.ndim > 1:
+            self.channels = samples.shape[1]
+        self.frames += samples.shape[0]
+        if samples.size:
+            self._peak = max(self._peak, float(np.abs(samples).max()))
+            self._sum_squares += float(np.sum(np.square(samples, dtype=np.float64)))
+            self._count += samples.size
+
+    def to_dict(self) -> dict:
+        rms = math.sqrt(self._sum_squares / self._count) if self._count else 0.0
+        return {
+            "duration_s": round(self.frames / self.sample_rate, 3) if self.sample_rate else 0.0,
+            "sample_rate": self.sample_rate,
+            "channels": self.channels,
+            "peak_dbfs": _dbfs(self._peak),
+            "rms_dbfs": _dbfs(rms),
+        }
+
+
+def describe_file(path: str | Path) -> dict:
+    samples, sample_rate = read_pcm(path)
+    return describe_pcm(samples, sample_rate)
+
+
+class AudioMetadataIndex:
+    """
+    Indeks metadanych plików audio w katalogu (.tts_audio.json): dla każdego pliku
+    czas trwania, sample rate, szczyt / RMS, hash tekstu, głos i model - zapisywane
+    przy generowaniu, żeby weryfikacja i raporty nie dekodowały audio ponownie.
+    Wpis jest ważny, dopóki plik ma ten sam rozmiar i mtime. Jeden obiekt na katalog
+    (for_directory, najwyżej MAX_OPEN_DIRECTORIES naraz); zapis na dysk jest odkładany
+    o SAVE_DELAY sekund.
+    """
+
+    _instances: "OrderedDict[Path, AudioMetadataIndex]" = OrderedDict()
+    _instances_lock = threading.Lock()
+
+    def __init__(self, directory: str | Path):
+        self.path = Path(directory) / AUDIO_INDEX_NAME
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._save_timer: threading.Timer | None = None
+        self._files: dict[str, dict] = self._read_files(self.path)
+
+    @staticmethod
+    def _read_files(index_path: Path) -> dict[str, dict]:
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return data.get("files", {}) if data.get("version") == AUDIO_INDEX_VERSION else {}
+
+    @classmethod
+    def for_directory(cls, directory: str | Path) -> "AudioMetadataIndex":
+        directory = Path(directory)
+        evicted = None
+        with cls._instances_lock:
+            index = cls._instances.get(directory)
+            if index is None:
+                index = cls._instances[directory] = cls(directory)
+                if len(cls._instances) > MAX_OPEN_DIRECTORIES:
+                    _, evicted = cls._instances.popitem(last=False)
+            else:
+                cls._instances.move_to_end(directory)
+        if evicted is not None and evicted._save_timer is not None:
+            evicted.flush()
+        return index
+
+    @classmethod
+    def opened(cls, directory: str | Path) -> "AudioMetadataIndex | None":
+        """Indeks katalogu, jeśli jest już w pamięci (bez tworzenia nowego)."""
+        with cls._instances_lock:
+            return cls._instances.get(Path(directory))
+
+    def get(self, path: str | Path) -> dict | None:
+        """Metadane pliku albo None, gdy go nie zindeksowano lub zmienił się od zapisu."""
+        path = Path(path)
+        with self._lock:
+            entry = self._files.get(path.name)
+        return _current_entry(entry, path)
+
+    def record(self, path: str | Path, metadata: dict, text: str | None = None, voice: str | None = None,
+               model: str | None = None) -> None:
+        path = Path(path)
+        stat = path.stat()
+        entry = dict(metadata, size=stat.st_size, mtime=stat.st_mtime, voice=voice, model=model,
+                     text_hash=text_hash(text) if text is not None else None, created_at=time.time())
+        with self._lock:
+            self._files[path.name] = entry
+            if self._save_timer is None:
+                self._save_timer = threading.Timer(SAVE_DELAY, self.flush)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            data = {"version": AUDIO_INDEX_VERSION, "files": dict(self._files)}
+        temp_path = self.path.with_suffix(".tmp")
+        with self._save_lock:
+            try:
+                with open(temp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(temp_path, self.path)
+            except OSError as e:
+                print(f"[AUDIO INDEX] Cannot save {self.path}: {e}")
+
+    @classmethod
+    def flush_all(cls) -> None:
+        with cls._instances_lock:
+            indexes = list(cls._instances.values())
+        for index in indexes:
+            if index._save_timer is not None:
+                index.flush()
+
+
+def _current_entry(entry: dict | None, path: Path) -> dict | None:
+    """Kopia wpisu, jeśli plik ma nadal ten sam rozmiar i mtime."""
+    if entry is None:
+        return None
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    if entry["size"] != stat.st_size or entry["mtime"] != stat.st_mtime:
+        return None
+    return dict(entry)
+
+
+def lookup(path: str | Path) -> dict | None:
+    """
+    Metadane pliku z indeksu jego katalogu (None, gdy trzeba zdekodować audio).
+    Katalog bez otwartego indeksu jest tylko odczytywany - lookup dowolnych ścieżek
+    klienta nie trzyma ich indeksów w pamięci.
+    """
+    path = Path(path)
+    index = AudioMetadataIndex.opened(path.parent)
+    if index is not None:
+        return index.get(path)
+    return _current_entry(AudioMetadataIndex._read_files(path.parent / AUDIO_INDEX_NAME).get(path.name), path)
+
+
+atexit.register(AudioMetadataIndex.flush_all)
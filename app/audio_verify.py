@@ -6,6 +6,8 @@ from rapidfuzz import fuzz
 import time
 from pydub import AudioSegment
 
+from app.audio_index import lookup as lookup_metadata
+
 # --- KONFIGURACJA ---
 API_URL = "http://localhost:8020/tts_to_audio"
 OUTPUT_FOLDER = "audio_game_final"
@@ -51,9 +53,17 @@ os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 os.makedirs(os.path.join(OUTPUT_FOLDER, "failed"), exist_ok=True)
 
 
-def verify_cps(text, audio_path):
-    audio = AudioSegment.from_file(audio_path)
-    duration_sec = len(audio) / 1000.0
+def verify_cps(text, audio_path, duration_s=None):
+    # Czas trwania: podany przez wołającego (znany przy generowaniu), z indeksu metadanych,
+    # a dopiero bez obu - z dekodowania pliku
+    duration_sec = duration_s
+    if duration_sec is None:
+        metadata = lookup_metadata(audio_path)
+        if metadata is not None:
+            duration_sec = metadata["duration_s"]
+        else:
+            audio = AudioSegment.from_file(audio_path)
+            duration_sec = len(audio) / 1000.0
 
     cps = len(text) / duration_sec
 
@@ -77,12 +87,16 @@ def analyze_audio(audio_path: str, original_text: str) -> dict:
 
         # Logowanie parametrów pliku audio i walidacja
         try:
-            from pydub.utils import mediainfo
+            info = lookup_metadata(audio_path)
+            if info is None:
+                # Plik spoza serwera (lub zmieniony) - ffprobe
+                from pydub.utils import mediainfo
 
-            info = mediainfo(audio_path)
+                info = mediainfo(audio_path)
+                info["duration_s"] = float(info.get("duration", 0))
             print(f"[AUDIO INFO] {audio_path}: {info}")
             # Sprawdź długość i rozmiar pliku
-            duration = float(info.get("duration", 0))
+            duration = info["duration_s"]
             filesize = os.path.getsize(audio_path)
             if duration < 0.5:
                 print(f"[AUDIO ERROR] Plik audio za krótki: {duration}s")
@@ -167,13 +181,14 @@ def analyze_audio(audio_path: str, original_text: str) -> dict:
         return {"success": False, "error": str(e)}
 
 
-def check_audio_quality(audio_path, original_text) -> bool:
+def check_audio_quality(audio_path, original_text, duration_s=None) -> bool:
     """
     Zwraca True jeśli audio jest poprawne, False jeśli podejrzewamy halucynacje.
+    duration_s: czas trwania znany z generowania - bez odczytu pliku.
     """
     try:
         return True
-        if not verify_cps(original_text, audio_path):
+        if not verify_cps(original_text, audio_path, duration_s):
             return False
         # 1. Transkrypcja (zamiana audio na tekst)
         result = asr_model.transcribe(audio_path, language="pl")
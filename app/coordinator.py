@@ -0,0 +1,373 @@
+import argparse
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+
+import requests
+from flask import Flask, request, jsonify
+from flask_cors import CORS
+
+# Odpowiedzi przeciążonego węzła (kontrola przyjęć: 429 / próg pamięci: 503) - linia wraca do kolejki
+RETRIABLE_STATUSES = {429, 503}
+# Przerwa dla węzła, który nie podał Retry-After, i górny limit podanej wartości (s)
+DEFAULT_RETRY_AFTER = 1.0
+MAX_RETRY_AFTER = 60.0
+
+
+def retry_after_seconds(response: requests.Response) -> float:
+    """Czas z nagłówka Retry-After (sekundy albo data HTTP), ograniczony do MAX_RETRY_AFTER."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return DEFAULT_RETRY_AFTER
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return DEFAULT_RETRY_AFTER
+    # Dolna granica chroni węzeł przed zalewem ponowień przy "Retry-After: 0"
+    return min(max(seconds, 0.1), MAX_RETRY_AFTER)
+
+
+class WorkerNode:
+    """Stan jednego serwera TTS (tts_api.py / wsl_api.py) widziany przez koordynatora."""
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.healthy = True
+        self.in_flight = 0
+        self.loaded: tuple[str, str | None] | None = None  # (model, głos) załadowane jako ostatnie
+        self.warm_voices: set[tuple[str, str | None]] = set()  # głosy z policzonymi latentami
+        self.failures = 0
+        self.completed = 0
+        self.last_seen: float | None = None
+        self.busy_until = 0.0  # po 429/503 węzeł nie dostaje linii do tego czasu (Retry-After)
+
+    def to_dict(self) -> dict:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "in_flight": self.in_flight,
+            "loaded": list(self.loaded) if self.loaded else None,
+            "warm_voices": len(self.warm_voices),
+            "failures": self.failures,
+            "completed": self.completed,
+            "last_seen": self.last_seen,
+            "busy_until": self.busy_until or None,
+        }
+
+
+class CoordinatorJob:
+    """Zadanie wsadowe rozdzielone na węzły; przechowuje postęp i wyniki linii."""
+
+    def __init__(self, model_name: str, items: list[dict]):
+        self.job_id = uuid.uuid4().hex
+        self.model_name = model_name
+        self.items = items
+        self.results: list[dict | None] = [None] * len(items)
+        self.created_at = time.time()
+        self.finished_at: float | None = None
+        self.error: str | None = None
+        self._lock = threading.Lock()
+
+    def set_result(self, index: int, result: dict) -> None:
+        with self._lock:
+            self.results[index] = result
+            if all(r is not None for r in self.results):
+                self.finished_at = time.time()
+
+    def fail(self, error: str) -> None:
+        """Zadanie przerwane - linie bez wyniku nie zostaną już wysłane."""
+        with self._lock:
+            self.error = error
+            self.finished_at = time.time()
+
+    @property
+    def finished(self) -> bool:
+        return self.finished_at is not None
+
+    def to_dict(self, include_results: bool = True) -> dict:
+        with self._lock:
+            done = sum(1 for r in self.results if r and r.get("status") == "ok")
+            failed = sum(1 for r in self.results if r and r.get("status") != "ok")
+            if self.error is not None:
+                status = "failed"
+            else:
+                status = "done" if self.finished_at else "running"
+            info = {
+                "job_id": self.job_id,
+                "model": self.model_name,
+                "status": status,
+                "total": len(self.items),
+                "done": done,
+                "failed": failed,
+                "pending": len(self.items) - done - failed,
+                "created_at": self.created_at,
+                "finished_at": self.finished_at,
+            }
+            if self.error is not None:
+                info["error"] = self.error
+            if include_results:
+                info["results"] = list(self.results)
+            return info
+
+
+class Coordinator:
+    """
+    Rozdziela linie między zarejestrowane węzły. Preferuje węzeł, który ma już
+    załadowany model i głos (a potem taki, który liczył już latenty tego głosu),
+    w drugiej kolejności najmniej obciążony. Węzły są okresowo sprawdzane,
+    a linia nieudana na jednym węźle jest ponawiana na innym. Węzeł odpowiadający
+    429/503 jest przeciążony, a nie zepsuty: nie dostaje linii przez Retry-After,
+    a linia czeka na wolny węzeł (bez zużywania max_retries, najdłużej request_timeout).
+    Pamiętanych jest najwyżej max_jobs zadań - najstarsze zakończone są usuwane.
+    """
+
+    def __init__(self, worker_urls: list[str], max_retries: int = 3, health_interval: float = 5.0,
+                 request_timeout: float = 600.0, max_jobs: int = 1000):
+        self.max_retries = max_retries
+        self.health_interval = health_interval
+        self.request_timeout = request_timeout
+        self.max_jobs = max_jobs
+        self.workers: dict[str, WorkerNode] = {}
+        self.jobs: OrderedDict[str, CoordinatorJob] = OrderedDict()
+        self._lock = threading.Condition()
+        for url in worker_urls:
+            self.register(url)
+        threading.Thread(target=self._health_loop, name="coordinator-health", daemon=True).start()
+
+    # --- Węzły ---
+    def register(self, url: str) -> WorkerNode:
+        with self._lock:
+            node = self.workers.get(url.rstrip("/"))
+            if node is None:
+                node = WorkerNode(url)
+                self.workers[node.url] = node
+                print(f"[COORD] Zarejestrowano węzeł {node.url}")
+            self._lock.notify_all()
+            return node
+
+    def unregister(self, url: str) -> bool:
+        with self._lock:
+            return self.workers.pop(url.rstrip("/"), None) is not None
+
+    def _check(self, node: WorkerNode) -> None:
+        try:
+            response = requests.get(f"{node.url}/", timeout=2)
+            healthy = response.status_code == 200
+        except requests.RequestException:
+            healthy = False
+        with self._lock:
+            if healthy and not node.healthy:
+                print(f"[COORD] Węzeł {node.url} znów dostępny.")
+            elif not healthy and node.healthy:
+                print(f"[COORD] Węzeł {node.url} niedostępny.")
+                node.loaded = None
+                node.warm_voices.clear()
+            node.healthy = healthy
+            if healthy:
+                node.last_seen = time.time()
+            self._lock.notify_all()
+
+    def _health_loop(self) -> None:
+        while True:
+            for node in list(self.workers.values()):
+                self._check(node)
+            time.sleep(self.health_interval)
+
+    def _acquire(self, model_name: str, voice: str | None, exclude: set[str]) -> WorkerNode | None:
+        """Wybiera węzeł dla linii; czeka, jeśli wszystkie zdrowe węzły są zajęte."""
+        key = (model_name, voice)
+        with self._lock:
+            while True:
+                candidates = [n for n in self.workers.values() if n.healthy and n.url not in exclude]
+                if not candidates:
+                    return None
+                now = time.time()
+                idle = [n for n in candidates if n.in_flight == 0 and n.busy_until <= now]
+                if idle:
+                    node = min(idle, key=lambda n: (n.loaded != key, key not in n.warm_voices))
+                    node.in_flight += 1
+                    return node
+                backing_off = [n.busy_until - now for n in candidates if n.busy_until > now]
+                self._lock.wait(timeout=min([1.0] + backing_off))
+
+    def _release(self, node: WorkerNode, key: tuple[str, str | None], ok: bool, retry_after: float | None = None) -> None:
+        with self._lock:
+            node.in_flight -= 1
+            if ok:
+                node.loaded = key
+                node.warm_voices.add(key)
+                node.completed += 1
+            elif retry_after is not None:
+                node.busy_until = time.time() + retry_after
+            else:
+                node.failures += 1
+            self._lock.notify_all()
+
+    # --- Wysyłanie linii ---
+    def dispatch(self, model_name: str, item: dict) -> dict:
+        """Wysyła jedną linię do węzła, z ponowieniami na innych węzłach."""
+        voice = item.get("voice_file")
+        key = (model_name, voice)
+        tried: set[str] = set()
+        failures = 0
+        deadline = time.time() + self.request_timeout
+        last_error = "No healthy workers available."
+        while failures < self.max_retries:
+            node = self._acquire(model_name, voice, tried)
+            if node is None:
+                break
+            ok = False
+            retry_after = None
+            try:
+                response = requests.post(
+                    f"{node.url}/{model_name}/tts",
+                    json={k: v for k, v in item.items() if k in ("text", "output_file", "voice_file")},
+                    timeout=self.request_timeout,
+                )
+                if response.status_code == 200:
+                    ok = True
+                    return {"output_file": item.get("output_file"), "status": "ok", "worker": node.url}
+                last_error = f"{node.url}: HTTP {response.status_code} {response.text[:200]}"
+                if response.status_code in RETRIABLE_STATUSES:
+                    # Węzeł przeciążony - linia trafi do innego albo do tego samego po Retry-After
+                    retry_after = retry_after_seconds(response)
+                    if time.time() + retry_after > deadline:
+                        break
+                    print(f"[COORD] {last_error[:80]}, ponawiam za {retry_after:.1f} s...")
+                    continue
+                failures += 1
+                tried.add(node.url)
+                if response.status_code < 500:
+                    # Błąd po stronie żądania - inny węzeł odpowie tak samo
+                    break
+            except requests.RequestException as e:
+                last_error = f"{node.url}: {e}"
+                failures += 1
+                tried.add(node.url)
+                self._check(node)
+            finally:
+                self._release(node, key, ok, retry_after)
+            print(f"[COORD] Linia nieudana ({last_error}), ponawiam na innym węźle...")
+        return {"output_file": item.get("output_file"), "status": "error", "error": last_error}
+
+    def _dispatch_safe(self, model_name: str, item: dict) -> dict:
+        try:
+            return self.dispatch(model_name, item)
+        except Exception as e:
+            # Np. linia w złym formacie - wynik z błędem zamiast linii, która nigdy się nie kończy
+            print(f"[COORD] Błąd wysyłania linii: {e}")
+            output_file = item.get("output_file") if isinstance(item, dict) else None
+            return {"output_file": output_file, "status": "error", "error": str(e)}
+
+    def _remember(self, job: CoordinatorJob) -> None:
+        with self._lock:
+            self.jobs[job.job_id] = job
+            finished = [job_id for job_id, j in self.jobs.items() if j.finished]
+            for job_id in finished[:max(0, len(self.jobs) - self.max_jobs)]:
+                del self.jobs[job_id]
+
+    def get_job(self, job_id: str) -> CoordinatorJob | None:
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def submit_batch(self, model_name: str, items: list[dict]) -> CoordinatorJob:
+        job = CoordinatorJob(model_name, items)
+        self._remember(job)
+
+        def run():
+            try:
+                # Tyle równoległych linii, ile węzłów - każdy węzeł przetwarza jedną naraz
+                with ThreadPoolExecutor(max_workers=max(1, len(self.workers))) as executor:
+                    for index, item in enumerate(items):
+                        executor.submit(lambda i=index, it=item: job.set_result(i, self._dispatch_safe(model_name, it)))
+            except Exception as e:
+                print(f"[COORD] Zadanie {job.job_id} przerwane: {e}")
+                job.fail(str(e))
+                return
+            print(f"[COORD] Zadanie {job.job_id} zakończone: {job.to_dict(include_results=False)}")
+
+        threading.Thread(target=run, name=f"coordinator-job-{job.job_id[:8]}", daemon=True).start()
+        return job
+
+
+def create_coordinator_app(coordinator: Coordinator):
+    app = Flask(__name__)
+    CORS(app)
+
+    @app.route("/", methods=["GET", "OPTIONS"])
+    def index():
+        return jsonify({"status": "running", "message": "TTS coordinator is up",
+                        "workers": len(coordinator.workers)}), 200
+
+    @app.route("/workers", methods=["GET"])
+    def list_workers():
+        return jsonify([node.to_dict() for node in coordinator.workers.values()]), 200
+
+    @app.route("/workers", methods=["POST"])
+    def register_worker():
+        data = request.get_json(silent=True) or {}
+        url = data.get("url")
+        if not url:
+            return jsonify({"error": "Missing 'url'"}), 400
+        return jsonify(coordinator.register(url).to_dict()), 200
+
+    @app.route("/workers", methods=["DELETE"])
+    def unregister_worker():
+        data = request.get_json(silent=True) or {}
+        if not coordinator.unregister(data.get("url") or ""):
+            return jsonify({"error": "Unknown worker"}), 404
+        return jsonify({"message": "Worker removed"}), 200
+
+    @app.route("/<model_name>/tts", methods=["POST"])
+    def tts_endpoint(model_name: str):
+        if not request.is_json:
+            return jsonify({"error": "Request must be JSON"}), 400
+        result = coordinator.dispatch(model_name.lower(), request.get_json())
+        return jsonify(result), 200 if result["status"] == "ok" else 502
+
+    @app.route("/<model_name>/batch", methods=["POST"])
+    def batch_endpoint(model_name: str):
+        if not request.is_json:
+            return jsonify({"error": "Request must be JSON"}), 400
+        data = request.get_json()
+        items = data.get("items")
+        if not isinstance(items, list) or not items:
+            return jsonify({"error": "Missing 'items'"}), 400
+        if not all(isinstance(item, dict) for item in items):
+            return jsonify({"error": "Every item must be an object"}), 400
+        default_voice = data.get("voice_file")
+        items = [dict(item, voice_file=item.get("voice_file") or default_voice) for item in items]
+        job = coordinator.submit_batch(model_name.lower(), items)
+        return jsonify({"job_id": job.job_id, "total": len(items)}), 202
+
+    @app.route("/jobs/<job_id>", methods=["GET"])
+    def job_status(job_id: str):
+        job = coordinator.get_job(job_id)
+        if job is None:
+            return jsonify({"error": f"Unknown job '{job_id}'"}), 404
+        include_results = request.args.get("results", "true").lower() == "true"
+        return jsonify(job.to_dict(include_results=include_results)), 200
+
+    return app
+
+
+def run_coordinator():
+    parser = argparse.ArgumentParser(description="TTS coordinator - rozdziela pracę między serwery TTS")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--worker", action="append", default=[],
+                        help="Adres serwera TTS, np. http://192.168.1.10:8001 (można podać wielokrotnie)")
+    parser.add_argument("--retries", type=int, default=3, help="Maks. liczba węzłów próbowanych dla jednej linii")
+    parser.add_argument("--health-interval", type=float, default=5.0)
+    args = parser.parse_args()
+
+    coordinator = Coordinator(args.worker, max_retries=args.retries, health_interval=args.health_interval)
+    print(f"🚀 Starting TTS coordinator on http://{args.host}:{args.port} ({len(args.worker)} workers)")
+    app = create_coordinator_app(coordinator)
+    app.run(host=args.host, port=args.port, threaded=True)
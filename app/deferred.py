@@ -0,0 +1,142 @@
+import os
+import shutil
+import threading
+import time
+import traceback
+from pathlib import Path
+
+
+class DeferredRender:
+    """Plik wygenerowany w wersji roboczej, czekający na render finalny."""
+
+    def __init__(self, model_name: str, voice_file: str | None, text: str, output_path: Path, on_done=None):
+        self.model_name = model_name
+        self.voice_file = voice_file
+        self.text = text
+        self.output_path = Path(output_path)
+        self.on_done = on_done
+        # Metadane wyniku renderu finalnego (wypełnia render, zapisuje on_swap po podmianie)
+        self.metadata: dict = {}
+        self.registered_at = time.time()
+        stat = self.output_path.stat()
+        self.draft_size = stat.st_size
+        self.draft_mtime = stat.st_mtime
+
+    def draft_unchanged(self) -> bool:
+        """Plik roboczy nadal leży na miejscu i nikt go nie nadpisał."""
+        try:
+            stat = self.output_path.stat()
+        except OSError:
+            return False
+        return stat.st_size == self.draft_size and stat.st_mtime == self.draft_mtime
+
+    def to_dict(self) -> dict:
+        return {
+            "model": self.model_name,
+            "voice_file": self.voice_file,
+            "output_file": str(self.output_path),
+            "text": self.text[:80],
+            "registered_at": self.registered_at,
+        }
+
+
+class DeferredRenderer:
+    """
+    Odroczone rendery finalne dla plików z trybu quality=draft. Wątek w tle bierze
+    najstarszą linię, która od settle_seconds się nie zmieniła (reżyser skończył ją
+    poprawiać), renderuje ją przez render(entry) -> Path z najniższym priorytetem
+    schedulera i podmienia plik roboczy przez os.replace. Render jest odrzucany, gdy
+    w międzyczasie linię zarejestrowano ponownie albo plik roboczy zmienił się na dysku.
+    Po podmianie wołane są on_swap(entry) (wspólne, np. indeks metadanych audio)
+    i opcjonalne on_done(entry) danej linii (np. aktualizacja indeksu projektu).
+    """
+
+    def __init__(self, render, settle_seconds: float = 10.0, on_swap=None):
+        self.render = render
+        self.settle_seconds = settle_seconds
+        self.on_swap = on_swap
+        self._pending: dict[Path, DeferredRender] = {}
+        self._condition = threading.Condition()
+        self._active: DeferredRender | None = None
+        self._counts = {"registered": 0, "finalized": 0, "superseded": 0, "failed": 0}
+        threading.Thread(target=self._run, name="tts-deferred-final", daemon=True).start()
+
+    def register(self, model_name: str, voice_file: str | None, text: str, output_path: Path,
+                 on_done=None) -> DeferredRender:
+        entry = DeferredRender(model_name, voice_file, text, output_path, on_done)
+        with self._condition:
+            self._pending[entry.output_path] = entry
+            self._counts["registered"] += 1
+            self._condition.notify()
+        return entry
+
+    def cancel(self, output_path: Path) -> bool:
+        """Rezygnuje z renderu finalnego (np. plik wyrenderowano już w jakości finalnej)."""
+        with self._condition:
+            return self._pending.pop(Path(output_path), None) is not None
+
+    def _next_entry(self) -> DeferredRender:
+        with self._condition:
+            while True:
+                now = time.time()
+                ready = [e for e in self._pending.values() if now - e.registered_at >= self.settle_seconds]
+                if ready:
+                    self._active = min(ready, key=lambda e: e.registered_at)
+                    return self._active
+                if self._pending:
+                    oldest = min(e.registered_at for e in self._pending.values())
+                    self._condition.wait(timeout=max(0.1, oldest + self.settle_seconds - now))
+                else:
+                    self._condition.wait()
+
+    def _run(self) -> None:
+        while True:
+            entry = self._next_entry()
+            generated_path = None
+            try:
+                generated_path = self.render(entry)
+                self._swap(entry, generated_path)
+            except Exception as e:
+                print(f"[DEFERRED] Final render of {entry.output_path} failed: {e}")
+                print(traceback.format_exc())
+                with self._condition:
+                    self._counts["failed"] += 1
+                    if self._pending.get(entry.output_path) is entry:
+                        del self._pending[entry.output_path]
+            finally:
+                if generated_path is not None and Path(generated_path).exists():
+                    Path(generated_path).unlink()
+                with self._condition:
+                    self._active = None
+
+    def _swap(self, entry: DeferredRender, generated_path: Path) -> None:
+        # Plik tymczasowy w katalogu docelowym - os.replace jest atomowy tylko w obrębie systemu plików
+        temp_path = entry.output_path.with_name(f".{entry.output_path.name}.final")
+        shutil.move(str(generated_path), str(temp_path))
+        with self._condition:
+            if self._pending.get(entry.output_path) is not entry or not entry.draft_unchanged():
+                temp_path.unlink(missing_ok=True)
+                # Plik zmieniony na dysku poza serwerem - wpis nie wróci do kolejki w nieskończoność
+                if self._pending.get(entry.output_path) is entry:
+                    del self._pending[entry.output_path]
+                self._counts["superseded"] += 1
+                print(f"[DEFERRED] {entry.output_path} changed during final render - discarded.")
+                return
+            os.replace(temp_path, entry.output_path)
+            del self._pending[entry.output_path]
+            self._counts["finalized"] += 1
+        print(f"[DEFERRED] Final render swapped in: {entry.output_path}")
+        if self.on_swap is not None:
+            self.on_swap(entry)
+        if entry.on_done is not None:
+            entry.on_done(entry)
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {
+                "settle_seconds": self.settle_seconds,
+                "pending": len(self._pending),
+                "active": self._active.to_dict() if self._active is not None else None,
+                "queue": [e.to_dict() for e in sorted(self._pending.values(), key=lambda e: e.registered_at)],
+                **self._counts,
+            }
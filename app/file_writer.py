@@ -0,0 +1,158 @@
+import queue
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+
+
+def deliver_file(generated_path: Path, destinations: list[Path], directories: "DirectoryCache | None" = None) -> None:
+    """
+    Rozsyła wygenerowany plik do celów. Plik ze stagingu jest kopiowany
+    do wszystkich celów poza ostatnim, na który zostaje przeniesiony.
+    Po błędzie zapisu katalogi celów są usuwane z directories (jeśli podano),
+    bo mogły zniknąć - kolejne ensure() założy je ponownie.
+    """
+    try:
+        if generated_path in destinations:
+            for destination in destinations:
+                if destination != generated_path:
+                    shutil.copyfile(generated_path, destination)
+            return
+        for destination in destinations[:-1]:
+            shutil.copyfile(generated_path, destination)
+        print(f"📦 Moving from staging to final dest: {destinations[-1]}")
+        shutil.move(str(generated_path), str(destinations[-1]))
+    except OSError:
+        if directories is not None:
+            for destination in destinations:
+                directories.forget(destination.parent)
+        raise
+
+
+class DirectoryCache:
+    """
+    Pamięta katalogi, o których wiadomo, że istnieją, żeby nie wołać
+    mkdir(parents=True) przy każdym żądaniu (na /mnt/<dysk> w WSL to kosztowne wywołania 9P).
+    """
+
+    def __init__(self):
+        self._known: set[Path] = set()
+        self._lock = threading.Lock()
+
+    def ensure(self, directory: Path) -> None:
+        if directory in self._known:
+            return
+        directory.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            # Rodzice też istnieją - zapamiętujemy całą ścieżkę
+            self._known.update(directory.parents)
+            self._known.add(directory)
+
+    def ensure_many(self, directories) -> None:
+        for directory in sorted(set(directories) - self._known, key=lambda d: len(d.parts)):
+            self.ensure(directory)
+
+    def forget(self, directory: Path) -> None:
+        with self._lock:
+            self._known.discard(directory)
+
+
+class BackgroundWriter:
+    """
+    Przenosi pliki ze stagingu do miejsca docelowego w osobnym wątku.
+
+    Kolejka jest ograniczona - gdy zapis nie nadąża, submit() blokuje
+    (backpressure), zamiast trzymać w RAM/na dysku nieograniczoną liczbę plików.
+    Zadania pobierane są partiami, a katalogi docelowe zakładane raz na partię.
+    """
+
+    _MAX_STATUSES = 10000
+
+    def __init__(self, directories: DirectoryCache | None = None, max_queue: int = 256, batch_size: int = 32):
+        self.directories = directories or DirectoryCache()
+        self.batch_size = batch_size
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._statuses: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="tts-background-writer", daemon=True)
+        self._thread.start()
+
+    def _set_status(self, job_id: str, **fields) -> None:
+        with self._lock:
+            status = self._statuses.setdefault(job_id, {"job_id": job_id})
+            status.update(fields)
+            self._statuses.move_to_end(job_id)
+            while len(self._statuses) > self._MAX_STATUSES:
+                self._statuses.popitem(last=False)
+
+    def submit(self, generated_path: Path, destinations: list[Path], job_id: str | None = None,
+               on_done=None) -> str:
+        """
+        Kolejkuje przeniesienie pliku i zwraca identyfikator zadania do odpytywania statusu.
+        on_done(destinations) jest wołane w wątku zapisu po udanym przeniesieniu.
+        """
+        job_id = job_id or uuid.uuid4().hex
+        self._set_status(
+            job_id,
+            status="staged",
+            output_files=[str(d) for d in destinations],
+            staged_at=time.time(),
+        )
+        self._queue.put((job_id, generated_path, destinations, on_done))
+        return job_id
+
+    def status(self, job_id: str) -> dict | None:
+        with self._lock:
+            status = self._statuses.get(job_id)
+            return dict(status) if status else None
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def flush(self) -> None:
+        """Czeka, aż wszystkie zakolejkowane pliki zostaną zapisane."""
+        self._queue.join()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write_batch(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write_batch(self, batch: list[tuple]) -> None:
+        try:
+            self.directories.ensure_many(d.parent for _, _, destinations, _ in batch for d in destinations)
+        except OSError as e:
+            print(f"[WRITER] Cannot create destination directories: {e}")
+        for job_id, generated_path, destinations, on_done in batch:
+            try:
+                for destination in destinations:
+                    self.directories.ensure(destination.parent)
+                deliver_file(generated_path, destinations, self.directories)
+            except Exception as e:
+                print(f"[WRITER] Failed to write {destinations}: {e}")
+                for destination in destinations:
+                    self.directories.forget(destination.parent)
+                # Plik nie zostanie już dostarczony - nie zostawiamy go w stagingu
+                if generated_path not in destinations:
+                    Path(generated_path).unlink(missing_ok=True)
+                self._set_status(job_id, status="failed", error=str(e), finished_at=time.time())
+                continue
+            self._set_status(job_id, status="done", finished_at=time.time())
+            if on_done is not None:
+                # Błąd callbacku (np. indeksu metadanych) nie zmienia statusu dostarczonego pliku
+                try:
+                    on_done(destinations)
+                except Exception as e:
+                    print(f"[WRITER] on_done for {destinations} failed: {e}")
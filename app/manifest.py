@@ -0,0 +1,209 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+
+# Stany linii zadania
+QUEUED = "queued"
+GENERATED = "generated"
+VERIFIED = "verified"
+FAILED = "failed"
+COMPLETED_STATES = (GENERATED, VERIFIED)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE TABLE IF NOT EXISTS lines (
+    job_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    voice_file TEXT,
+    output_file TEXT NOT NULL,
+    text_hash TEXT NOT NULL,
+    state TEXT NOT NULL,
+    output_hash TEXT,
+    output_size INTEGER,
+    output_mtime REAL,
+    error TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (job_id, idx)
+);
+CREATE INDEX IF NOT EXISTS lines_output ON lines (output_file, state);
+"""
+
+
+def text_fingerprint(model_name: str, voice_file: str | None, text: str) -> str:
+    """Odcisk linii: zmiana modelu, głosu lub (znormalizowanego) tekstu wymusza ponowną syntezę."""
+    return hashlib.sha1(f"{model_name}\0{voice_file or ''}\0{text}".encode("utf-8")).hexdigest()
+
+
+def file_sha256(path: str | Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def output_unchanged(path: str | Path, output_hash: str | None, size: int | None, mtime: float | None) -> bool:
+    """
+    Czy plik nadal jest tym, który zapisano. Szybka ścieżka: rozmiar i mtime;
+    przy innym mtime porównujemy skrót zawartości.
+    """
+    if not output_hash or not os.path.exists(path):
+        return False
+    stat = os.stat(path)
+    if stat.st_size != size:
+        return False
+    if stat.st_mtime == mtime:
+        return True
+    return file_sha256(path) == output_hash
+
+
+class JobManifest:
+    """
+    Trwały manifest zadań wsadowych w SQLite (tryb WAL). Dla każdej linii zapisuje
+    stan (queued / generated / verified / failed) oraz skrót i metadane pliku wynikowego,
+    dzięki czemu po restarcie serwera można wznowić zadanie i pominąć gotowe linie.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = str(path)
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+
+    # --- Zadania ---
+    def create_job(self, model_name: str, lines: list[dict]) -> tuple[str, int]:
+        """
+        Zapisuje nowe zadanie. lines: słowniki z kluczami text, voice_file, output_file.
+        Linie, których plik wynikowy powstał wcześniej z tego samego tekstu i głosu
+        i nie zmienił się od tamtej pory, od razu dostają stan tamtej linii.
+        Zwraca (job_id, liczba pominiętych linii).
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        skipped = 0
+        rows = []
+        for idx, line in enumerate(lines):
+            text_hash = text_fingerprint(model_name, line.get("voice_file"), line["text"])
+            previous = self.find_completed(line["output_file"], text_hash)
+            if previous is not None and self.is_output_unchanged(previous):
+                skipped += 1
+                rows.append((job_id, idx, line["text"], line.get("voice_file"), line["output_file"], text_hash,
+                             previous["state"], previous["output_hash"], previous["output_size"], previous["output_mtime"],
+                             None, now))
+            else:
+                rows.append((job_id, idx, line["text"], line.get("voice_file"), line["output_file"], text_hash,
+                             QUEUED, None, None, None, None, now))
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, model, status, created_at) VALUES (?, ?, 'running', ?)",
+                (job_id, model_name, now),
+            )
+            self._conn.executemany("INSERT INTO lines VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        return job_id, skipped
+
+    def finish_job(self, job_id: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'done', finished_at = ? WHERE job_id = ?", (time.time(), job_id)
+            )
+
+    def incomplete_jobs(self) -> list[tuple[str, str]]:
+        """Zadania przerwane (np. crash serwera) jako lista (job_id, model) w kolejności utworzenia."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_id, model FROM jobs WHERE status = 'running' ORDER BY created_at"
+            ).fetchall()
+        return [(row["job_id"], row["model"]) for row in rows]
+
+    def job_progress(self, job_id: str, include_lines: bool = False) -> dict | None:
+        with self._lock:
+            job = self._conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if job is None:
+                return None
+            counts = dict(self._conn.execute(
+                "SELECT state, COUNT(*) FROM lines WHERE job_id = ? GROUP BY state", (job_id,)
+            ).fetchall())
+            lines = None
+            if include_lines:
+                lines = [
+                    {"output_file": row["output_file"], "state": row["state"], "error": row["error"]}
+                    for row in self._conn.execute(
+                        "SELECT output_file, state, error FROM lines WHERE job_id = ? ORDER BY idx", (job_id,)
+                    )
+                ]
+        info = {
+            "job_id": job_id,
+            "model": job["model"],
+            "status": job["status"],
+            "total": sum(counts.values()),
+            "created_at": job["created_at"],
+            "finished_at": job["finished_at"],
+        }
+        for state in (QUEUED, GENERATED, VERIFIED, FAILED):
+            info[state] = counts.get(state, 0)
+        if lines is not None:
+            info["lines"] = lines
+        return info
+
+    # --- Linie ---
+    def job_lines(self, job_id: str, states: tuple[str, ...] | None = None) -> list[sqlite3.Row]:
+        query = "SELECT * FROM lines WHERE job_id = ?"
+        params: list = [job_id]
+        if states:
+            query += f" AND state IN ({', '.join('?' for _ in states)})"
+            params.extend(states)
+        with self._lock:
+            return self._conn.execute(query + " ORDER BY idx", params).fetchall()
+
+    def pending_lines(self, job_id: str) -> list[sqlite3.Row]:
+        """
+        Linie do syntezy przy uruchomieniu lub wznowieniu zadania: wszystkie poza gotowymi
+        (generated / verified), których plik wynikowy nie zmienił się od zapisu.
+        """
+        return [row for row in self.job_lines(job_id)
+                if not (row["state"] in COMPLETED_STATES and self.is_output_unchanged(row))]
+
+    def update_line(self, job_id: str, idx: int, state: str, output_path: str | Path | None = None,
+                    output_hash: str | None = None, error: str | None = None) -> None:
+        size = mtime = None
+        if output_path is not None:
+            stat = os.stat(output_path)
+            size, mtime = stat.st_size, stat.st_mtime
+        with self._lock, self._conn:
+            self._conn.execute(
+                """UPDATE lines SET state = ?, output_hash = COALESCE(?, output_hash),
+                   output_size = COALESCE(?, output_size), output_mtime = COALESCE(?, output_mtime),
+                   error = ?, updated_at = ? WHERE job_id = ? AND idx = ?""",
+                (state, output_hash, size, mtime, error, time.time(), job_id, idx),
+            )
+
+    def find_completed(self, output_file: str, text_hash: str) -> sqlite3.Row | None:
+        """Ostatnia ukończona linia, która zapisała output_file z tym samym odciskiem tekstu."""
+        with self._lock:
+            return self._conn.execute(
+                f"""SELECT * FROM lines WHERE output_file = ? AND text_hash = ?
+                    AND state IN ({', '.join('?' for _ in COMPLETED_STATES)})
+                    ORDER BY updated_at DESC LIMIT 1""",
+                (output_file, text_hash, *COMPLETED_STATES),
+            ).fetchone()
+
+    @staticmethod
+    def is_output_unchanged(row: sqlite3.Row) -> bool:
+        """Czy plik wynikowy linii nadal jest tym, który zapisano."""
+        return output_unchanged(row["output_file"], row["output_hash"], row["output_size"], row["output_mtime"])
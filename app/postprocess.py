@@ -0,0 +1,134 @@
+import numpy as np
+
+from generators.audio_io import loudness_gain, resample
+
+# Próg ciszy i minimalna długość ciszy na końcach, jak dotychczasowe trim_silence (pydub)
+DEFAULT_TRIM_DB = -40.0
+DEFAULT_MIN_SILENCE_MS = 1350
+# Ramka analizy przy wykrywaniu ciszy
+TRIM_FRAME_MS = 10
+
+
+class PostProcessor:
+    """
+    Obróbka wyniku syntezy na tablicach NumPy przed jedynym zapisem pliku:
+    przycięcie ciszy na końcach każdego fragmentu, sklejenie z przerwą (gap_ms)
+    albo przenikaniem (crossfade_ms) w jedną prealokowaną tablicę, resampling do
+    sample_rate, wyrównanie głośności do target_dbfs (RMS) z limitem szczytu
+    i dither TPDF dla 16-bitowego wyjścia. Bez opcji (PostProcessor()) robi tylko
+    to, co dotąd robił serwer dla dzielonych tekstów: przycięcie i sklejenie.
+    """
+
+    def __init__(self, trim_db: float | None = DEFAULT_TRIM_DB, min_silence_ms: int = DEFAULT_MIN_SILENCE_MS,
+                 gap_ms: int = 0, crossfade_ms: int = 0, sample_rate: int | None = None,
+                 target_dbfs: float | None = None, peak_limit: float = 0.99, dither: bool = False):
+        if gap_ms and crossfade_ms:
+            raise ValueError("gap_ms and crossfade_ms are mutually exclusive")
+        self.trim_db = trim_db
+        self.min_silence_ms = min_silence_ms
+        self.gap_ms = gap_ms
+        self.crossfade_ms = crossfade_ms
+        self.sample_rate = sample_rate
+        self.target_dbfs = target_dbfs
+        self.peak_limit = peak_limit
+        self.dither = dither
+
+    def streamable(self, sample_rate: int) -> bool:
+        """
+        Czy fragmenty można obrabiać i dopisywać do pliku po kolei (stream_block) - bez
+        kroków wymagających całego nagrania: przenikania, resamplingu i wyrównania głośności.
+        """
+        return not self.crossfade_ms and self.sample_rate in (None, sample_rate) and self.target_dbfs is None
+
+    @property
+    def enabled(self) -> bool:
+        """Czy łańcuch zmienia coś poza przycięciem - wtedy obrabiane są też teksty jednoczęściowe."""
+        return bool(self.gap_ms or self.crossfade_ms or self.sample_rate or self.target_dbfs is not None
+                    or self.dither)
+
+    def trim(self, samples: np.ndarray, sample_rate: int) -> np.ndarray:
+        """
+        Obcina ciszę (ramki TRIM_FRAME_MS o RMS poniżej trim_db dBFS) na początku i końcu,
+        o ile trwa co najmniej min_silence_ms. Zwraca widok, bez kopii.
+        """
+        if self.trim_db is None:
+            return samples
+        frame = max(1, sample_rate * TRIM_FRAME_MS // 1000)
+        frames = len(samples) // frame
+        if frames == 0:
+            return samples
+        mono = samples if samples.ndim == 1 else samples.mean(axis=1)
+        power = np.mean(np.square(mono[:frames * frame].reshape(frames, frame), dtype=np.float32), axis=1)
+        loud = np.flatnonzero(power >= (10 ** (self.trim_db / 20)) ** 2)
+        if len(loud) == 0:
+            return samples
+        min_silence = sample_rate * self.min_silence_ms // 1000
+        start = loud[0] * frame
+        end = (loud[-1] + 1) * frame
+        start = start if start >= min_silence else 0
+        end = end if len(samples) - end >= min_silence else len(samples)
+        return samples[start:end]
+
+    def join(self, clips: list[np.ndarray], sample_rate: int) -> np.ndarray:
+        """Skleja fragmenty w jedną tablicę float32 (jedna alokacja) z przerwą lub przenikaniem."""
+        clips = [clip for clip in clips if len(clip)]
+        if not clips:
+            return np.zeros(0, dtype=np.float32)
+        gap = sample_rate * self.gap_ms // 1000
+        fade = sample_rate * self.crossfade_ms // 1000
+        overlaps = [min(fade, len(previous), len(clip)) for previous, clip in zip(clips, clips[1:])]
+        total = sum(len(clip) for clip in clips) + gap * (len(clips) - 1) - sum(overlaps)
+        out = np.zeros((total,) + clips[0].shape[1:], dtype=np.float32)
+        position = 0
+        for i, clip in enumerate(clips):
+            overlap = overlaps[i - 1] if i > 0 else 0
+            if overlap:
+                ramp = np.linspace(0.0, 1.0, overlap, dtype=np.float32)
+                if clip.ndim > 1:
+                    ramp = ramp[:, None]
+                head = out[position:position + overlap]
+                head *= 1.0 - ramp
+                head += clip[:overlap] * ramp
+            out[position + overlap:position + len(clip)] = clip[overlap:]
+            position += len(clip) + gap - (overlaps[i] if i < len(overlaps) else 0)
+        return out
+
+    def stream_block(self, clip: np.ndarray, sample_rate: int, first: bool) -> np.ndarray:
+        """
+        Przycięty fragment jako kolejny blok pliku: z przerwą gap_ms przed nim (poza pierwszym
+        niepustym) i ditherem. Kolejne bloki dają to samo co process() dla streamable().
+        """
+        if len(clip) == 0:
+            return clip.astype(np.float32, copy=False)
+        gap = 0 if first else sample_rate * self.gap_ms // 1000
+        if gap == 0 and not self.dither:
+            return clip.astype(np.float32, copy=False)
+        block = np.zeros((gap + len(clip),) + clip.shape[1:], dtype=np.float32)
+        block[gap:] = clip
+        if self.dither:
+            self._dither(block)
+        return block
+
+    def process(self, clips: list[np.ndarray], sample_rate: int, trimmed: bool = False) -> tuple[np.ndarray, int]:
+        """Cały łańcuch dla fragmentów jednego nagrania. Zwraca (próbki float32, sample_rate)."""
+        if not trimmed:
+            clips = [self.trim(clip, sample_rate) for clip in clips]
+        samples = self.join(clips, sample_rate)
+        if self.sample_rate and self.sample_rate != sample_rate:
+            samples = resample(samples, sample_rate, self.sample_rate)
+            sample_rate = self.sample_rate
+        if self.target_dbfs is not None and len(samples):
+            samples *= loudness_gain(samples, self.target_dbfs, self.peak_limit)
+        if self.dither and len(samples):
+            self._dither(samples)
+        return samples, sample_rate
+
+    @staticmethod
+    def _dither(samples: np.ndarray) -> None:
+        # TPDF o amplitudzie 1 LSB dla PCM_16 - zamienia zniekształcenia kwantyzacji w szum
+        rng = np.random.default_rng()
+        noise = rng.random(samples.shape, dtype=np.float32)
+        noise -= rng.random(samples.shape, dtype=np.float32)
+        noise *= 1.0 / 32768
+        samples += noise
+        np.clip(samples, -1.0, 1.0, out=samples)
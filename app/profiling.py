@@ -0,0 +1,185 @@
+import cProfile
+import io
+import os
+import pstats
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+
+# Rodzaje śladu, które można zebrać dla profilowanego żądania
+TRACE_KINDS = ("cprofile", "torch")
+
+_local = threading.local()
+# Profilery (cProfile / torch) nie mogą działać równolegle - jedno żądanie ze śladem naraz
+_trace_lock = threading.Lock()
+
+
+class RequestProfile:
+    """
+    Rozkład czasu jednego żądania na etapy (model_init, split, inference, save,
+    trim, merge, move, verify). Czasy etapu wykonywanego wielokrotnie (np. inferencja
+    kolejnych fragmentów) są sumowane. Opcjonalnie zbiera ślad cProfile lub
+    torch.profiler z wywołań inferencji.
+    """
+
+    def __init__(self, label: str, trace: str | None = None):
+        if trace is not None and trace not in TRACE_KINDS:
+            raise ValueError(f"Unknown trace kind '{trace}', expected one of {TRACE_KINDS}")
+        self.profile_id = uuid.uuid4().hex[:12]
+        self.label = label
+        self.trace = trace
+        self.trace_path: str | None = None
+        self.created_at = time.time()
+        self.total_s: float | None = None
+        self.stages: OrderedDict[str, list[float]] = OrderedDict()
+        self._started = time.perf_counter()
+        self._stats: pstats.Stats | None = None
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            entry = self.stages.setdefault(name, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+
+    def finish(self) -> None:
+        self.total_s = time.perf_counter() - self._started
+
+    def traced(self, fn):
+        """Opakowuje wywołanie inferencji tak, by zebrać ślad w wątku, który je wykonuje."""
+        if self.trace is None:
+            return fn
+
+        def run(*args, **kwargs):
+            with _trace_lock:
+                if self.trace == "torch":
+                    return self._run_torch(fn, args, kwargs)
+                return self._run_cprofile(fn, args, kwargs)
+
+        return run
+
+    def _run_cprofile(self, fn, args, kwargs):
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(fn, *args, **kwargs)
+        finally:
+            with self._lock:
+                if self._stats is None:
+                    self._stats = pstats.Stats(profiler, stream=io.StringIO())
+                else:
+                    self._stats.add(profiler)
+
+    def _run_torch(self, fn, args, kwargs):
+        import torch
+        from torch.profiler import profile, ProfilerActivity
+
+        activities = [ProfilerActivity.CPU]
+        if torch.cuda.is_available():
+            activities.append(ProfilerActivity.CUDA)
+        with profile(activities=activities, record_shapes=True) as prof:
+            result = fn(*args, **kwargs)
+        # Ślad Chrome (chrome://tracing / ui.perfetto.dev); przy wielu fragmentach zostaje ostatni
+        path = os.path.join(_trace_dir(), f"{self.profile_id}.torch.json")
+        prof.export_chrome_trace(path)
+        self.trace_path = path
+        return result
+
+    def save_trace(self) -> None:
+        if self._stats is not None:
+            path = os.path.join(_trace_dir(), f"{self.profile_id}.prof")
+            self._stats.dump_stats(path)
+            self.trace_path = path
+
+    def top_functions(self, limit: int = 30) -> str | None:
+        """Najdroższe funkcje (cumulative) ze śladu cProfile jako tekst."""
+        if self._stats is None:
+            return None
+        stream = io.StringIO()
+        self._stats.stream = stream
+        self._stats.sort_stats("cumulative").print_stats(limit)
+        return stream.getvalue()
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            stages = {name: {"ms": round(total * 1000, 1), "calls": calls}
+                      for name, (total, calls) in self.stages.items()}
+        return {
+            "profile_id": self.profile_id,
+            "label": self.label,
+            "created_at": self.created_at,
+            "total_ms": round(self.total_s * 1000, 1) if self.total_s is not None else None,
+            "stages": stages,
+            "trace": self.trace,
+            "trace_file": self.trace_path,
+        }
+
+
+class ProfileStore:
+    """Ostatnie max_profiles profili żądań; najstarsze są usuwane razem z plikami śladów."""
+
+    def __init__(self, max_profiles: int = 100):
+        self.max_profiles = max_profiles
+        self._profiles: OrderedDict[str, RequestProfile] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, profile: RequestProfile) -> None:
+        with self._lock:
+            self._profiles[profile.profile_id] = profile
+            while len(self._profiles) > self.max_profiles:
+                _, old = self._profiles.popitem(last=False)
+                if old.trace_path and os.path.exists(old.trace_path):
+                    os.remove(old.trace_path)
+
+    def get(self, profile_id: str) -> RequestProfile | None:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def summaries(self) -> list[dict]:
+        with self._lock:
+            profiles = list(self._profiles.values())
+        return [p.to_dict() for p in reversed(profiles)]
+
+
+def _trace_dir() -> str:
+    path = Path(tempfile.gettempdir()) / "tts_profiles"
+    path.mkdir(exist_ok=True)
+    return str(path)
+
+
+def current_profile() -> RequestProfile | None:
+    return getattr(_local, "profile", None)
+
+
+@contextmanager
+def activate(profile: RequestProfile | None):
+    """Ustawia profil bieżącego wątku; etapy mierzone przez stage() trafiają do niego."""
+    previous = current_profile()
+    _local.profile = profile
+    try:
+        yield profile
+    finally:
+        _local.profile = previous
+        if profile is not None:
+            profile.finish()
+            profile.save_trace()
+
+
+@contextmanager
+def stage(name: str, profile: RequestProfile | None = None):
+    """
+    Mierzy etap żądania. W wątkach pomocniczych profil trzeba przekazać jawnie
+    (current_profile() jest lokalny dla wątku). Bez aktywnego profilu nic nie robi.
+    """
+    profile = profile or current_profile()
+    if profile is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add(name, time.perf_counter() - started)
@@ -0,0 +1,216 @@
+import atexit
+import csv
+import io
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from app.manifest import output_unchanged
+
+PROJECT_INDEX_NAME = ".tts_project.json"
+PROJECT_INDEX_VERSION = 1
+# Zapis indeksu jest odkładany - seria linii projektu to jeden zapis JSON, nie zapis na linię
+SAVE_DELAY = 2.0
+# Ile indeksów projektów trzymać otwartych (najdawniej używany jest zapisywany i zamykany)
+MAX_OPEN_PROJECTS = 32
+
+_SRT_TIMING_RE = re.compile(r"^\d{1,2}:\d{2}:\d{2}[,.]\d{1,3}\s*-->\s*\d{1,2}:\d{2}:\d{2}[,.]\d{1,3}")
+_SRT_MARKUP_RE = re.compile(r"<[^>]+>|\{[^}]*\}")
+_SPEAKER_PREFIX_RE = re.compile(r"^\s*(?:\[([^\]]+)\]|([^:\[\]]{1,40}):)\s*")
+_UNSAFE_NAME_RE = re.compile(r"[^\w.-]+")
+
+
+def _split_speaker(text: str, speakers) -> tuple[str | None, str]:
+    """Odcina prefiks "[Mówca]" lub "Mówca:" - tylko dla znanych mówców (np. "Uwaga:" zostaje w tekście)."""
+    match = _SPEAKER_PREFIX_RE.match(text)
+    if match:
+        name = (match.group(1) or match.group(2)).strip()
+        if name in speakers:
+            return name, text[match.end():]
+    return None, text
+
+
+def parse_srt(content: str, speakers=()) -> list[dict]:
+    """Linie napisów SRT jako słowniki id / speaker / text (id = numer napisu)."""
+    lines = []
+    for block in re.split(r"\n\s*\n", content.replace("\r\n", "\n").strip()):
+        rows = [row.strip() for row in block.split("\n") if row.strip()]
+        timing = next((i for i, row in enumerate(rows) if _SRT_TIMING_RE.match(row)), None)
+        if timing is None:
+            continue
+        line_id = rows[timing - 1] if timing > 0 else str(len(lines) + 1)
+        text = " ".join(_SRT_MARKUP_RE.sub("", row) for row in rows[timing + 1:]).strip()
+        speaker, text = _split_speaker(text, speakers)
+        if text:
+            lines.append({"id": line_id, "speaker": speaker, "text": text})
+    return lines
+
+
+def parse_csv(content: str) -> list[dict]:
+    """
+    Skrypt CSV z kolumnami id, speaker, text (nagłówek opcjonalny; separator
+    przecinek, średnik lub tabulator). Bez nagłówka kolumny czytane są pozycyjnie.
+    """
+    content = content.lstrip("\ufeff")
+    try:
+        dialect = csv.Sniffer().sniff(content[:4096], delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    rows = list(csv.reader(io.StringIO(content), dialect))
+    if not rows:
+        return []
+    header = [cell.strip().lower() for cell in rows[0]]
+    if "text" in header:
+        columns = {name: header.index(name) for name in ("id", "speaker", "text") if name in header}
+        rows = rows[1:]
+    else:
+        columns = {"id": 0, "speaker": 1, "text": 2}
+
+    lines = []
+    for number, row in enumerate(rows, start=1):
+        cells = {name: row[index].strip() if index < len(row) else "" for name, index in columns.items()}
+        if not cells.get("text"):
+            continue
+        lines.append({
+            "id": cells.get("id") or str(number),
+            "speaker": cells.get("speaker") or None,
+            "text": cells["text"],
+        })
+    return lines
+
+
+def parse_script(content: str, script_format: str | None = None, speakers=()) -> list[dict]:
+    """Parsuje skrypt SRT lub CSV; bez podanego formatu rozpoznaje SRT po znacznikach czasu."""
+    if script_format is None:
+        script_format = "srt" if "-->" in content else "csv"
+    script_format = script_format.lower().lstrip(".")
+    if script_format == "srt":
+        return parse_srt(content, speakers)
+    if script_format == "csv":
+        return parse_csv(content)
+    raise ValueError(f"Unsupported script format '{script_format}'")
+
+
+def output_name(line_id: str, extension: str) -> str:
+    return f"{_UNSAFE_NAME_RE.sub('_', line_id).strip('._') or 'line'}{extension}"
+
+
+class ProjectIndex:
+    """
+    Indeks projektu w katalogu wynikowym (.tts_project.json): dla każdego id linii
+    odcisk (model, głos, tekst), jakość renderu i metadane pliku. Linia jest aktualna,
+    gdy odcisk się zgadza, plik nie zmienił się od zapisu, a jego jakość wystarcza
+    (wersja robocza nie zastępuje finalnej) - wtedy nie trzeba jej syntezować.
+    Jeden obiekt na katalog (for_directory), współdzielony przez żądania i rendery
+    finalne w tle; zapis na dysk jest odkładany o SAVE_DELAY sekund (flush() na końcu żądania).
+    """
+
+    _instances: "OrderedDict[Path, ProjectIndex]" = OrderedDict()
+    _instances_lock = threading.Lock()
+
+    def __init__(self, output_dir: str | Path):
+        self.path = Path(output_dir) / PROJECT_INDEX_NAME
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._save_timer: threading.Timer | None = None
+        self._lines: dict[str, dict] = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == PROJECT_INDEX_VERSION:
+                self._lines = data.get("lines", {})
+        except (OSError, ValueError):
+            pass
+
+    @classmethod
+    def for_directory(cls, output_dir: str | Path) -> "ProjectIndex":
+        output_dir = Path(output_dir)
+        evicted = None
+        with cls._instances_lock:
+            index = cls._instances.get(output_dir)
+            if index is None:
+                index = cls._instances[output_dir] = cls(output_dir)
+                if len(cls._instances) > MAX_OPEN_PROJECTS:
+                    _, evicted = cls._instances.popitem(last=False)
+            else:
+                cls._instances.move_to_end(output_dir)
+        if evicted is not None:
+            evicted.flush()
+        return index
+
+    def is_current(self, line_id: str, fingerprint: str, output_path: str | Path, quality: str = "final") -> bool:
+        with self._lock:
+            entry = self._lines.get(line_id)
+        return (
+            entry is not None
+            and entry["fingerprint"] == fingerprint
+            # Wpisy bez jakości mogły pochodzić z wersji roboczej - dla żądań finalnych nieaktualne
+            and (quality == "draft" or entry.get("quality", "draft") == "final")
+            and entry["output_file"] == str(output_path)
+            and output_unchanged(output_path, entry.get("output_hash"), entry.get("output_size"),
+                                 entry.get("output_mtime"))
+        )
+
+    def record(self, line_id: str, fingerprint: str, output_path: str | Path, output_hash: str,
+               quality: str = "final") -> None:
+        stat = os.stat(output_path)
+        with self._lock:
+            self._lines[line_id] = {
+                "fingerprint": fingerprint,
+                "quality": quality,
+                "output_file": str(output_path),
+                "output_hash": output_hash,
+                "output_size": stat.st_size,
+                "output_mtime": stat.st_mtime,
+                "updated_at": time.time(),
+            }
+            self._schedule_save()
+
+    def forget_missing(self, line_ids) -> list[str]:
+        """Usuwa z indeksu linie, których nie ma już w skrypcie (pliki zostają). Zwraca ich id."""
+        keep = set(line_ids)
+        with self._lock:
+            removed = [line_id for line_id in self._lines if line_id not in keep]
+            for line_id in removed:
+                del self._lines[line_id]
+            if removed:
+                self._schedule_save()
+        return removed
+
+    def _schedule_save(self) -> None:
+        # Wołane pod self._lock
+        if self._save_timer is None:
+            self._save_timer = threading.Timer(SAVE_DELAY, self.flush)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def flush(self) -> None:
+        # Stan pobierany pod blokadą zapisu - starszy stan nie nadpisze na dysku nowszego
+        with self._save_lock:
+            with self._lock:
+                if self._save_timer is None:
+                    return
+                self._save_timer.cancel()
+                self._save_timer = None
+                data = {"version": PROJECT_INDEX_VERSION, "lines": dict(self._lines)}
+            temp_path = self.path.with_suffix(".tmp")
+            try:
+                with open(temp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(temp_path, self.path)
+            except OSError as e:
+                print(f"[PROJECT] Cannot save {self.path}: {e}")
+
+    @classmethod
+    def flush_all(cls) -> None:
+        with cls._instances_lock:
+            indexes = list(cls._instances.values())
+        for index in indexes:
+            index.flush()
+
+
+atexit.register(ProjectIndex.flush_all)
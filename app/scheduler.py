@@ -0,0 +1,88 @@
+import itertools
+import queue
+import statistics
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+# Klasy priorytetu - mniejsza wartość jest obsługiwana wcześniej
+INTERACTIVE = 0  # podgląd na żywo (/stream)
+SINGLE = 1  # pojedyncze linie (/tts)
+BULK = 2  # zadania wsadowe (/batch, manifest)
+IDLE = 3  # odroczone rendery finalne po wersjach roboczych - tylko gdy nic innego nie czeka
+PRIORITY_NAMES = {INTERACTIVE: "interactive", SINGLE: "single", BULK: "bulk", IDLE: "idle"}
+
+
+class _ClassStats:
+    def __init__(self):
+        self.queued = 0
+        self.completed = 0
+        self.waits: deque[float] = deque(maxlen=1000)
+        self.runs: deque[float] = deque(maxlen=1000)
+
+    def to_dict(self) -> dict:
+        waits = sorted(self.waits)
+        return {
+            "queued": self.queued,
+            "completed": self.completed,
+            "wait_p50_ms": round(statistics.median(waits) * 1000, 1) if waits else None,
+            "wait_p95_ms": round(waits[int(0.95 * (len(waits) - 1))] * 1000, 1) if waits else None,
+            "wait_max_ms": round(waits[-1] * 1000, 1) if waits else None,
+            "run_avg_ms": round(statistics.mean(self.runs) * 1000, 1) if self.runs else None,
+        }
+
+
+class InferenceScheduler:
+    """
+    Kolejka priorytetowa przed modelem. Każde wywołanie inferencji (pojedynczy
+    fragment z split_text) jest osobnym zadaniem, więc podgląd interaktywny
+    wyprzedza długie renderowanie na granicy fragmentów, bez przerywania
+    trwającej inferencji. W obrębie klasy obowiązuje kolejność zgłoszeń.
+    """
+
+    def __init__(self, workers: int = 1):
+        self._queue: queue.PriorityQueue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._stats = {priority: _ClassStats() for priority in PRIORITY_NAMES}
+        self._lock = threading.Lock()
+        self.workers = workers
+        for index in range(workers):
+            threading.Thread(target=self._run, name=f"tts-inference-{index}", daemon=True).start()
+
+    def submit(self, priority: int, fn, *args, **kwargs) -> Future:
+        future: Future = Future()
+        with self._lock:
+            self._stats[priority].queued += 1
+        self._queue.put((priority, next(self._sequence), time.monotonic(), future, fn, args, kwargs))
+        return future
+
+    def run(self, priority: int, fn, *args, **kwargs):
+        """Wykonuje fn w wątku inferencji z danym priorytetem i czeka na wynik."""
+        return self.submit(priority, fn, *args, **kwargs).result()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "classes": {name: self._stats[priority].to_dict() for priority, name in PRIORITY_NAMES.items()},
+            }
+
+    def _run(self) -> None:
+        while True:
+            priority, _, queued_at, future, fn, args, kwargs = self._queue.get()
+            started_at = time.monotonic()
+            with self._lock:
+                stats = self._stats[priority]
+                stats.queued -= 1
+                stats.waits.append(started_at - queued_at)
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    stats.completed += 1
+                    stats.runs.append(time.monotonic() - started_at)
@@ -0,0 +1,183 @@
+import os
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+from generators.audio_io import pcm_info, read_pcm_into
+
+SHM_PREFIX = "tts_pcm_"
+
+
+class ShmLimitExceeded(RuntimeError):
+    """Łączny rozmiar aktywnych segmentów przekroczyłby max_bytes."""
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Proces istnieje, tylko należy do innego użytkownika
+        return True
+    except OSError:
+        return False
+    return True
+
+
+def _owner_pid(path: Path) -> int | None:
+    """Pid serwera z nazwy segmentu tts_pcm_<pid>_<uuid>.f32 (None dla innych nazw)."""
+    owner, _, _ = path.stem[len(SHM_PREFIX):].partition("_")
+    return int(owner) if owner.isdigit() else None
+
+
+def default_shm_dir() -> Path:
+    """/dev/shm (RAM dysk w Linux), a jeśli go nie ma - katalog tymczasowy."""
+    ram_disk = Path("/dev/shm")
+    return ram_disk if ram_disk.exists() and ram_disk.is_dir() else Path(tempfile.gettempdir())
+
+
+class ShmLease:
+    """Segment z surowym PCM (float32, przeplatane kanały) wypożyczony klientowi na czas ttl."""
+
+    def __init__(self, path: Path, frames: int, channels: int, sample_rate: int, ttl: float):
+        self.lease_id = path.stem[len(SHM_PREFIX):]
+        self.path = path
+        self.frames = frames
+        self.channels = channels
+        self.sample_rate = sample_rate
+        self.expires_at = time.time() + ttl
+
+    @property
+    def nbytes(self) -> int:
+        return self.frames * self.channels * 4
+
+    def to_dict(self) -> dict:
+        return {
+            "lease_id": self.lease_id,
+            "path": str(self.path),
+            "dtype": "float32",
+            "byte_order": "little",
+            "layout": "interleaved",
+            "offset": 0,
+            "frames": self.frames,
+            "channels": self.channels,
+            "sample_rate": self.sample_rate,
+            "byte_length": self.nbytes,
+            "expires_at": self.expires_at,
+        }
+
+
+class SharedPcmStore:
+    """
+    Przekazywanie PCM lokalnemu klientowi przez plik w /dev/shm. Klient mapuje
+    segment (np.memmap(path, dtype="<f4", mode="r").reshape(frames, channels))
+    zamiast czytać plik z dysku lub pobierać go w treści odpowiedzi HTTP.
+    Segment żyje do zwolnienia przez klienta albo do wygaśnięcia dzierżawy;
+    wygasłe segmenty usuwa wątek w tle.
+    """
+
+    def __init__(self, directory: str | Path | None = None, ttl: float = 60.0,
+                 max_bytes: int = 1 << 30, reap_interval: float = 5.0):
+        self.directory = Path(directory) if directory else default_shm_dir()
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._leases: dict[str, ShmLease] = {}
+        self._lock = threading.Lock()
+        # Nazwy segmentów zawierają pid serwera - kilka serwerów może dzielić /dev/shm.
+        # Usuwamy tylko segmenty serwerów, które już nie działają.
+        self._pid = os.getpid()
+        for stale in self.directory.glob(f"{SHM_PREFIX}*.f32"):
+            owner = _owner_pid(stale)
+            if owner is None or (owner != self._pid and not _pid_alive(owner)):
+                stale.unlink(missing_ok=True)
+        self._reap_interval = reap_interval
+        threading.Thread(target=self._reap_loop, name="tts-shm-reaper", daemon=True).start()
+
+    def create(self, audio_path: str | Path, ttl: float | None = None) -> ShmLease:
+        """Dekoduje plik audio prosto do nowego segmentu i zwraca jego dzierżawę."""
+        frames, channels, sample_rate = pcm_info(audio_path)
+        return self._fill(frames, channels, sample_rate, ttl, lambda segment: read_pcm_into(audio_path, segment))
+
+    def create_from_pcm(self, samples: np.ndarray, sample_rate: int, ttl: float | None = None) -> ShmLease:
+        """Kopiuje próbki float32 (np. z synthesize()) prosto do nowego segmentu - bez kodowania do pliku."""
+        samples = samples.reshape(len(samples), -1)
+        frames, channels = samples.shape
+
+        def write(segment: np.ndarray) -> None:
+            segment[:] = samples
+
+        return self._fill(frames, channels, sample_rate, ttl, write)
+
+    def _fill(self, frames: int, channels: int, sample_rate: int, ttl: float | None, write) -> ShmLease:
+        nbytes = frames * channels * 4
+        with self._lock:
+            used = sum(lease.nbytes for lease in self._leases.values())
+            if used + nbytes > self.max_bytes:
+                raise ShmLimitExceeded(f"Shared memory limit exceeded ({used + nbytes} > {self.max_bytes} bytes)")
+            path = self.directory / f"{SHM_PREFIX}{self._pid}_{uuid.uuid4().hex}.f32"
+            lease = ShmLease(path, frames, channels, sample_rate, ttl or self.ttl)
+            self._leases[lease.lease_id] = lease
+        try:
+            if frames:
+                segment = np.memmap(path, dtype="<f4", mode="w+", shape=(frames, channels))
+                write(segment)
+                segment.flush()
+                del segment
+            else:
+                path.touch()
+        except BaseException:
+            self.release(lease.lease_id)
+            raise
+        return lease
+
+    def renew(self, lease_id: str, ttl: float | None = None) -> ShmLease | None:
+        with self._lock:
+            lease = self._leases.get(lease_id)
+            if lease is not None:
+                lease.expires_at = time.time() + (ttl or self.ttl)
+            return lease
+
+    def release(self, lease_id: str) -> bool:
+        with self._lock:
+            lease = self._leases.pop(lease_id, None)
+        if lease is None:
+            return False
+        # Klient, który ma jeszcze zmapowany segment, zachowuje dostęp do danych po unlink
+        lease.path.unlink(missing_ok=True)
+        return True
+
+    def reap(self) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [lease_id for lease_id, lease in self._leases.items() if lease.expires_at <= now]
+        for lease_id in expired:
+            self.release(lease_id)
+        return len(expired)
+
+    def close(self) -> None:
+        with self._lock:
+            lease_ids = list(self._leases)
+        for lease_id in lease_ids:
+            self.release(lease_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "directory": str(self.directory),
+                "leases": len(self._leases),
+                "bytes": sum(lease.nbytes for lease in self._leases.values()),
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+            }
+
+    def _reap_loop(self) -> None:
+        while True:
+            time.sleep(self._reap_interval)
+            expired = self.reap()
+            if expired:
+                print(f"[SHM] Usunięto {expired} wygasłych segmentów.")
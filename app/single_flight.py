@@ -0,0 +1,52 @@
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+
+
+class Flight:
+    """Jedna trwająca synteza i lista plików docelowych wszystkich czekających na nią żądań."""
+
+    def __init__(self, destinations: list[Path]):
+        self.destinations = list(destinations)
+        self.future: Future = Future()
+        self.closed = False
+
+
+class SingleFlight:
+    """
+    Łączy identyczne, równoległe żądania syntezy (ten sam model, głos, tekst
+    i parametry) w jedną inferencję. Pierwsze żądanie (lider) syntezuje; kolejne
+    dopisują swoje pliki docelowe i czekają na wynik. Lider po syntezie zamyka lot
+    (close) - od tej chwili nowe żądania startują własną syntezę - i dostarcza
+    plik do wszystkich zebranych ścieżek.
+    """
+
+    def __init__(self):
+        self._flights: dict[tuple, Flight] = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def join(self, key: tuple, destinations: list[Path]) -> tuple[Flight, bool]:
+        """Dołącza do trwającego lotu albo zaczyna nowy. Zwraca (lot, czy_lider)."""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None and not flight.closed:
+                # Ponowienie z tym samym plikiem docelowym nie wymaga osobnej kopii
+                flight.destinations.extend([d for d in destinations if d not in flight.destinations])
+                self.coalesced += 1
+                return flight, False
+            flight = Flight(destinations)
+            self._flights[key] = flight
+            return flight, True
+
+    def close(self, key: tuple, flight: Flight) -> list[Path]:
+        """Kończy zbieranie czekających; zwraca wszystkie pliki docelowe lotu."""
+        with self._lock:
+            flight.closed = True
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            return list(flight.destinations)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"in_flight": len(self._flights), "coalesced": self.coalesced}
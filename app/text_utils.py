@@ -0,0 +1,204 @@
+import re
+import unicodedata
+
+# --- Wzorce kompilowane raz, na poziomie modułu ---
+_WHITESPACE_RE = re.compile(r"\s+")
+# Znak interpunkcyjny (z ewentualnym cudzysłowem/nawiasem) przed spacją lub końcem tekstu
+_BOUNDARY_RE = re.compile(r"(?<=\S)([.?!…]+|[,;:]+)[\"'»”)\]]*(?= |$)| [-–—]+(?= )")
+_ORDINAL_RE = re.compile(r"\d+")
+_INITIAL_RE = re.compile(r"[A-ZĄĆĘŁŃÓŚŹŻ]")
+
+# --- Normalizacja tekstu ---
+_QUOTES_RE = re.compile(r"[„”“«»]")
+_APOSTROPHES_RE = re.compile(r"[‘’‚`]")
+_DASHES_RE = re.compile(r"\s*[–—]\s*|\s+-\s+")
+_ELLIPSIS_RE = re.compile(r"\.{2,}|…")
+_REPEATED_PUNCT_RE = re.compile(r"([!?.,;:])\1+")
+_SPACE_BEFORE_PUNCT_RE = re.compile(r"\s+([.,!?;:])")
+# "10 000" / "1 250 000" -> "10000" / "1250000" (separator tysięcy rozbija liczbę na dwie).
+# Tylko twarde spacje - zwykła spacja częściej oddziela dwie liczby ("3 100 zł" to też "3 x 100 zł")
+_THOUSANDS_RE = re.compile(r"(?<![\d,.])(\d{1,3})((?:[\u00a0\u202f]\d{3})+)(?!\d)")
+
+# Skróty rozwijane przed syntezą (jednoznaczne, bez odmiany przez przypadki)
+POLISH_ABBREVIATION_EXPANSIONS = {
+    "np.": "na przykład",
+    "tzn.": "to znaczy",
+    "tj.": "to jest",
+    "m.in.": "między innymi",
+    "itd.": "i tak dalej",
+    "itp.": "i tym podobne",
+    "wg": "według",
+}
+# Skróty, które zwykle zamykają wyliczenie - ich kropka przed wielką literą kończy zdanie
+_SENTENCE_FINAL_ABBREVIATIONS = frozenset({"itd.", "itp."})
+# Kropka skrótu ("wg" bywa pisane bez niej) jest opcjonalną grupą 2
+_ABBREVIATION_RE = re.compile(
+    r"(?<![\w.])(" + "|".join(re.escape(a) for a in sorted(POLISH_ABBREVIATION_EXPANSIONS, key=len, reverse=True)) + r")(\.)?(?!\w)",
+    re.IGNORECASE,
+)
+_TEXT_END_RE = re.compile(r"[\"')\]]*\s*$")
+_NEXT_SENTENCE_RE = re.compile(r"\s+[\"'(]*[A-ZĄĆĘŁŃÓŚŹŻ]")
+
+
+def _expand_abbreviation(match: re.Match) -> str:
+    abbreviation = match.group(1).lower()
+    expansion = POLISH_ABBREVIATION_EXPANSIONS[abbreviation]
+    if match.group(1)[0].isupper():
+        expansion = expansion[0].upper() + expansion[1:]
+    # Kropka skrótu bywa zarazem końcem zdania - wtedy zostaje po rozwinięciu
+    if abbreviation.endswith(".") or match.group(2):
+        if _TEXT_END_RE.match(match.string, match.end()) or (
+                abbreviation in _SENTENCE_FINAL_ABBREVIATIONS and _NEXT_SENTENCE_RE.match(match.string, match.end())):
+            expansion += "."
+    return expansion
+
+
+def normalize_text(text: str) -> str:
+    """
+    Kanonizuje tekst przed syntezą (wspólne dla wszystkich silników):
+    cudzysłowy, myślniki, wielokropki, powtórzona interpunkcja, białe znaki,
+    separatory tysięcy i jednoznaczne polskie skróty.
+    Funkcja jest idempotentna - wynik służy też jako klucz deduplikacji.
+    """
+    text = unicodedata.normalize("NFC", text)
+    text = _QUOTES_RE.sub('"', text)
+    text = _APOSTROPHES_RE.sub("'", text)
+    text = _DASHES_RE.sub(" - ", text)
+    text = _ELLIPSIS_RE.sub(".", text)
+    text = _ABBREVIATION_RE.sub(_expand_abbreviation, text)
+    text = _REPEATED_PUNCT_RE.sub(r"\1", text)
+    text = _THOUSANDS_RE.sub(lambda m: m.group(1) + re.sub(r"\D", "", m.group(2)), text)
+    text = _WHITESPACE_RE.sub(" ", text)
+    text = _SPACE_BEFORE_PUNCT_RE.sub(r"\1", text)
+    return text.strip()
+
+
+# Skróty, po których kropka nie kończy zdania ("itd." i "itp." często kończą zdanie, więc ich tu nie ma)
+POLISH_ABBREVIATIONS = frozenset({
+    "al", "c.d", "dr", "ds", "gen", "godz", "gr", "hab", "im", "inż", "jw", "kol", "kpt", "ks",
+    "m.in", "mgr", "mjr", "mln", "mld", "nr", "np", "ok", "pkt", "płk", "pn", "por", "prof",
+    "r", "red", "sp", "st", "str", "św", "tel", "tj", "tys", "tzn", "tzw", "ul", "w", "wg",
+    "ww", "zł", "zob",
+})
+
+# Kary za miejsce podziału: koniec zdania < koniec frazy < zwykła spacja
+_BOUNDARY_PENALTY = (0.0, 10.0, 100.0)
+# Koszt każdego dodatkowego fragmentu (wywołania syntezy)
+_CHUNK_COST = 150.0
+# Waga odchylenia długości fragmentu od średniej
+_VARIANCE_WEIGHT = 50.0
+
+
+def _boundary_level(text: str, match: re.Match) -> int:
+    """0 = koniec zdania, 1 = koniec frazy, 2 = brak granicy (skrót, inicjał, liczebnik)."""
+    punct = match.group(1)
+    if punct is None or punct[0] in ",;:":
+        return 1
+    if punct != ".":
+        return 0
+    word_start = text.rfind(" ", 0, match.start(1)) + 1
+    word = text[word_start:match.start(1)]
+    if word.lower() in POLISH_ABBREVIATIONS or _INITIAL_RE.fullmatch(word):
+        return 2
+    # "5. rocznica" - liczebnik porządkowy, a nie koniec zdania
+    if _ORDINAL_RE.fullmatch(word):
+        next_char = text[match.end() + 1:match.end() + 2]
+        if next_char.islower():
+            return 2
+    return 0
+
+
+def _append_unit(units: list[tuple[int, int, int]], text: str, start: int, end: int,
+                 level: int, max_len: int) -> None:
+    """
+    Dodaje jednostkę (start, end, poziom granicy). Zbyt długie jednostki są dzielone
+    na spacjach na kawałki o zbliżonej długości; słowo dłuższe niż max_len jest
+    jedynym przypadkiem cięcia w środku słowa.
+    """
+    while start < end and text[start] == " ":
+        start += 1
+    if start >= end:
+        return
+    while end - start > max_len:
+        remaining = end - start
+        pieces = -(-remaining // max_len)
+        cut = text.rfind(" ", start, start + remaining // pieces + 1)
+        if cut <= start:
+            cut = text.rfind(" ", start, start + max_len + 1)
+        if cut <= start:
+            units.append((start, start + max_len, 2))
+            start += max_len
+            continue
+        units.append((start, cut, 2))
+        start = cut + 1
+    units.append((start, end, level))
+
+
+def split_text(text: str, max_len: int = 200) -> list[str]:
+    """
+    Dzieli tekst na fragmenty <= max_len.
+
+    Podział odbywa się tylko na granicach słów, preferując końce zdań, potem
+    końce fraz. Liczba fragmentów jest minimalizowana, a ich długości
+    wyrównywane, żeby nie zostawał krótki "ogon", który XTTS czyta źle.
+    """
+    if len(text) <= max_len:
+        return [text]
+
+    text = _WHITESPACE_RE.sub(" ", text).strip()
+
+    # Jedno przejście regexem: jednostki między granicami zdań/fraz
+    units: list[tuple[int, int, int]] = []
+    start = 0
+    for match in _BOUNDARY_RE.finditer(text):
+        level = _boundary_level(text, match)
+        if level == 2:
+            continue
+        _append_unit(units, text, start, match.end(), level, max_len)
+        start = match.end()
+    _append_unit(units, text, start, len(text), 0, max_len)
+
+    n = len(units)
+    if n == 0:
+        return []
+    starts = [unit[0] for unit in units]
+    ends = [unit[1] for unit in units]
+    levels = [unit[2] for unit in units]
+
+    # Zachłanne pakowanie daje minimalną liczbę fragmentów - z niej liczymy docelową długość
+    greedy_count = 1
+    chunk_start = starts[0]
+    for i in range(n):
+        if ends[i] - chunk_start > max_len:
+            greedy_count += 1
+            chunk_start = starts[i]
+    target = (ends[-1] - starts[0]) / greedy_count
+
+    # Programowanie dynamiczne: best[i] = minimalny koszt podziału jednostek od i do końca
+    inf = float("inf")
+    best = [inf] * (n + 1)
+    cut = [n] * (n + 1)
+    best[n] = 0.0
+    for i in range(n - 1, -1, -1):
+        limit = starts[i] + max_len
+        j = i
+        while j < n and ends[j] <= limit:
+            deviation = (ends[j] - starts[i] - target) / max_len
+            cost = (
+                _CHUNK_COST
+                + (_BOUNDARY_PENALTY[levels[j]] if j + 1 < n else 0.0)
+                + _VARIANCE_WEIGHT * deviation * deviation
+                + best[j + 1]
+            )
+            if cost < best[i]:
+                best[i] = cost
+                cut[i] = j + 1
+            j += 1
+
+    chunks = []
+    i = 0
+    while i < n:
+        j = cut[i]
+        chunks.append(text[starts[i]:ends[j - 1]])
+        i = j
+    return chunks
@@ -1,18 +1,21 @@
 # from difflib import SequenceMatcher
 import os
 import sys
-import shutil
+import atexit
 from pathlib import Path
 import time
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, after_this_request, g, has_request_context, request, jsonify, send_file, make_response
 from flask_cors import CORS
 import argparse
-import re
+import functools
+import json
+import queue
+from collections import deque
+import threading
 import uuid
 import io
 import tempfile
-from pydub import AudioSegment
-from pydub.silence import detect_nonsilent
+import numpy as np
 
 # Ensure local imports work
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -22,18 +25,87 @@ from generators.tts_base import TTSBase
 from generators.xtts import XTTSPolishTTS
 from generators.piper_tts import PiperTTS
 from generators.teamsp_tts import TeamSPTTS
+from generators.async_tts import RateLimitedTTS
+from generators.audio_io import encode_pcm, open_pcm_writer, pcm_info, read_pcm
 from app.audio_verify import check_audio_quality, analyze_audio
+from app.text_utils import normalize_text, split_text
+from app.file_writer import BackgroundWriter, DirectoryCache, deliver_file
+from app.manifest import FAILED, GENERATED, JobManifest, file_sha256, text_fingerprint
+from app.project import ProjectIndex, output_name, parse_script
+from app.worker_pool import ProcessBackedTTS, WorkerProcessPool
+from app.admission import AdmissionController, AdmissionRejected
+from app.single_flight import SingleFlight
+from app.deferred import DeferredRenderer
+from app.postprocess import PostProcessor
+from app.audio_index import AudioMetadataIndex, PcmLevels, describe_file, describe_pcm
+from app.scheduler import BULK, IDLE, INTERACTIVE, SINGLE, InferenceScheduler
+from app.shm_handoff import SharedPcmStore, ShmLimitExceeded
+from app.profiling import TRACE_KINDS, ProfileStore, RequestProfile, activate, current_profile, stage
+# Dodatkowe opcje XTTS ustawiane z linii poleceń (np. tryb wydajności CPU)
+XTTS_OPTIONS: dict = {}
+# Opcje sesji ONNX Runtime dla Piper (--piper-profile, --piper-io-binding ...)
+PIPER_OPTIONS: dict = {}
+
 # --- Rejestr modeli ---
 MODEL_REGISTRY = {
-    "xtts": lambda voice: XTTSPolishTTS(voice_path=voice),
-    "piper": lambda  model: PiperTTS(model_path=model),
-    "teamsp": lambda voice: TeamSPTTS(voice=str(voice)) if voice else TeamSPTTS()
+    "xtts": lambda voice: XTTSPolishTTS(voice_path=voice, **XTTS_OPTIONS),
+    "piper": lambda model: PiperTTS(model_path=model, **PIPER_OPTIONS),
+    "teamsp": lambda voice: RateLimitedTTS(TeamSPTTS(voice=str(voice)) if voice else TeamSPTTS())
 }
 
+# Modele lokalne, które w trybie --worker-processes działają w procesach potomnych
+PROCESS_MODELS = {"xtts", "piper"}
+
+# Silnik wersji roboczych (quality=draft): Piper z --draft-piper-model (głos XTTS jest wtedy
+# ignorowany). XTTS nie ma tańszego ustawienia - koszt to autoregresyjny GPT, którego liczby
+# kroków nie zmienia ani dekodowanie zachłanne, ani próbkowanie - więc bez modelu Piper
+# quality=draft renderuje od razu finalnie.
+DRAFT_OPTIONS: dict = {}
+_MAX_CACHED_MODELS = 8
+
+
+def build_model(model_name: str, voice: Path | None, xtts_options: dict, piper_options: dict | None = None) -> TTSBase:
+    """Fabryka modeli dla procesów potomnych (spawn nie dziedziczy opcji z linii poleceń)."""
+    XTTS_OPTIONS.update(xtts_options)
+    PIPER_OPTIONS.update(piper_options or {})
+    return MODEL_REGISTRY[model_name](voice)
+
+
 # --- Globals ---
 tts_model: TTSBase | None = None
 current_model_name: str | None = None
 current_voice_path: Path | None = None
+# Kolejka priorytetowa przed modelem (tworzona w create_app)
+scheduler: InferenceScheduler | None = None
+# Pula procesów inferencji (tylko z --worker-processes)
+worker_pool: WorkerProcessPool | None = None
+# Ile wygenerowanych fragmentów może czekać na przycięcie i sklejenie
+CHUNK_PIPELINE_DEPTH = 2
+# Modele online: limit znaków jednego zapytania i ile fragmentów pobierać naraz
+# (współbieżność i tak ogranicza RateLimitedTTS; okno ogranicza pliki czekające na dysku)
+ONLINE_MAX_CHARS = 2000
+ONLINE_FETCH_WINDOW = 4
+# Modele wersji roboczych, trzymane obok tts_model, żeby podgląd nie wyładowywał modelu finalnego
+draft_models: dict[tuple[str, str | None], TTSBase] = {}
+_draft_lock = threading.Lock()
+# Modele renderów finalnych w tle (DeferredRenderer) - render w tle nie przełącza tts_model,
+# którego w tym czasie mogą używać żądania interaktywne
+final_models: dict[tuple[str, str | None], TTSBase] = {}
+_final_lock = threading.Lock()
+# Obróbka wyniku przed zapisem (przycięcie, sklejenie, resampling, głośność, dither);
+# opcje z linii poleceń, domyślnie tylko przycięcie i sklejenie fragmentów
+postprocessor = PostProcessor()
+
+
+def run_inference(priority: int, fn, *args):
+    """Wywołuje inferencję przez scheduler (jeśli jest) z daną klasą priorytetu."""
+    profile = current_profile()
+    if profile is not None:
+        fn = profile.traced(fn)
+    with stage("inference"):
+        if scheduler is None:
+            return fn(*args)
+        return scheduler.run(priority, fn, *args)
 
 
 def _get_rss_mb() -> float | None:
@@ -48,6 +120,25 @@ def _get_rss_mb() -> float | None:
         return None
 
 
+def _memory_usage() -> tuple[float | None, float | None]:
+    """(RSS w MB, zarezerwowana pamięć CUDA w MB) serwera razem z procesami inferencji."""
+    rss = _get_rss_mb()
+    vram = None
+    try:
+        torch = sys.modules.get("torch")
+        if torch is not None and torch.cuda.is_available():
+            vram = torch.cuda.memory_reserved() / 1024.0 / 1024.0
+    except Exception:
+        pass
+    if worker_pool is not None:
+        for worker in worker_pool.stats():
+            if worker.get("rss_mb") is not None:
+                rss = (rss or 0.0) + worker["rss_mb"]
+            if worker.get("vram_mb") is not None:
+                vram = (vram or 0.0) + worker["vram_mb"]
+    return rss, vram
+
+
 def _log_mem(stage: str) -> None:
     mb = _get_rss_mb()
     if mb is None:
@@ -56,89 +147,6 @@ def _log_mem(stage: str) -> None:
         print(f"[MEM] {stage}: {mb:.1f} MB")
 
 
-def split_text(text: str, max_len: int = 200) -> list[str]:
-    """
-    Dzieli tekst na fragmenty <= max_len.
-    """
-    if len(text) <= max_len:
-        return [text]
-
-    p1_delims = re.compile(r'([.?!…])')
-    p2_delims = re.compile(r'([,-])')
-    p3_delims = re.compile(r'( )')
-    
-    base_units = []
-    if p1_delims.search(text):
-        parts = p1_delims.split(text)
-    elif p2_delims.search(text):
-        parts = p2_delims.split(text)
-    else:
-        parts = p3_delims.split(text)
-
-    temp_units = []
-    for i in range(0, len(parts) - 1, 2):
-        unit = (parts[i] + parts[i+1]).strip()
-        if unit:
-            temp_units.append(unit)
-    if len(parts) % 2 == 1 and parts[-1].strip():
-        temp_units.append(parts[-1].strip())
-
-    final_base_units = []
-    for unit in temp_units:
-        if len(unit) > max_len:
-            if p1_delims.search(text) and p2_delims.search(unit):
-                sub_parts = p2_delims.split(unit)
-                temp_sub_units = []
-                for i in range(0, len(sub_parts) - 1, 2):
-                    sub_unit = (sub_parts[i] + sub_parts[i+1]).strip()
-                    if sub_unit:
-                        temp_sub_units.append(sub_unit)
-                if len(sub_parts) % 2 == 1 and sub_parts[-1].strip():
-                    temp_sub_units.append(sub_parts[-1].strip())
-
-                for su in temp_sub_units:
-                    if len(su) > max_len:
-                        final_base_units.extend([su[i:i + max_len] for i in range(0, len(su), max_len)])
-                    else:
-                        final_base_units.append(su)
-            else:
-                final_base_units.extend([unit[i:i + max_len] for i in range(0, len(unit), max_len)])
-        else:
-            final_base_units.append(unit)
-
-    grouped_chunks = []
-    current_chunk = ""
-    for unit in final_base_units:
-        if not current_chunk:
-            current_chunk = unit
-        elif len(current_chunk) + 1 + len(unit) <= max_len:
-            current_chunk += " " + unit
-        else:
-            grouped_chunks.append(current_chunk)
-            current_chunk = unit
-    
-    if current_chunk:
-        grouped_chunks.append(current_chunk)
-
-    return grouped_chunks
-
-
-def trim_silence(audio: AudioSegment, silence_thresh_db: int = -40, min_silence_ms: int = 1350) -> AudioSegment:
-    nonsilent_parts = detect_nonsilent(
-        audio,
-        min_silence_len=min_silence_ms,
-        silence_thresh=silence_thresh_db
-    )
-    
-    if not nonsilent_parts:
-        return audio
-
-    start_trim = nonsilent_parts[0][0]
-    end_trim = nonsilent_parts[-1][1]
-    
-    return audio[start_trim:end_trim] # type: ignore
-
-
 def initialize_model(model_name: str, voice_file: str | None):
     global tts_model, current_model_name, current_voice_path
 
@@ -153,7 +161,10 @@ def initialize_model(model_name: str, voice_file: str | None):
     ):
         try:
             print(f"Loading model '{model_name}' with voice {requested_voice_path or 'default'}...")
-            tts_model = MODEL_REGISTRY[model_name](requested_voice_path)
+            if worker_pool is not None and model_name in PROCESS_MODELS:
+                tts_model = ProcessBackedTTS(worker_pool, model_name, requested_voice_path)
+            else:
+                tts_model = MODEL_REGISTRY[model_name](requested_voice_path)
             current_model_name = model_name
             current_voice_path = requested_voice_path
             return True, f"Model '{model_name}' loaded successfully."
@@ -164,15 +175,452 @@ def initialize_model(model_name: str, voice_file: str | None):
     return True, f"Model '{model_name}' already loaded."
 
 
-def create_app(path_converter, staging_dir: Path | None = None):
+def draft_target(model_name: str, voice_file: str | None) -> tuple[str, str | None] | None:
+    """Model i głos wersji roboczej; None, gdy model nie ma tańszego wariantu (render od razu finalny)."""
+    if model_name != "xtts" or not DRAFT_OPTIONS.get("piper_model"):
+        return None
+    return "piper", DRAFT_OPTIONS["piper_model"]
+
+
+def draft_model_for(model_name: str, voice_file: str | None) -> tuple[str, TTSBase] | None:
+    """Zwraca (nazwa modelu roboczego, model) albo None; modele są ładowane raz i trzymane w draft_models."""
+    target = draft_target(model_name, voice_file)
+    if target is None:
+        return None
+    draft_name, draft_voice = target
+    return draft_name, _cached_model(draft_models, _draft_lock, draft_name, draft_voice, "draft")
+
+
+def final_model_for(model_name: str, voice_file: str | None) -> TTSBase:
+    """Model renderów finalnych w tle, ładowany raz i trzymany w final_models (niezależnie od tts_model)."""
+    if model_name not in MODEL_REGISTRY:
+        raise RuntimeError(f"Unknown model '{model_name}'")
+    return _cached_model(final_models, _final_lock, model_name, voice_file, "final")
+
+
+def _cached_model(cache: dict, lock: threading.Lock, model_name: str, voice_file: str | None,
+                  kind: str) -> TTSBase:
+    target = (model_name, voice_file)
+    with lock:
+        model = cache.get(target)
+        if model is None:
+            print(f"Loading {kind} model '{model_name}' with voice {voice_file or 'default'}...")
+            voice_path = Path(voice_file) if voice_file else None
+            if worker_pool is not None and model_name in PROCESS_MODELS:
+                model = ProcessBackedTTS(worker_pool, model_name, voice_path)
+            else:
+                model = MODEL_REGISTRY[model_name](voice_path)
+            while len(cache) >= _MAX_CACHED_MODELS:
+                cache.pop(next(iter(cache)))
+            cache[target] = model
+        return model
+
+
+def max_chars_for(model_name: str) -> int:
+    """Limit znaków jednego wywołania modelu; dłuższe teksty są dzielone przez split_text."""
+    return 200 if model_name.lower() != "teamsp" else ONLINE_MAX_CHARS
+
+
+def split_chunks(model_name: str, text: str) -> list[str]:
+    """
+    Podział znormalizowanego tekstu na fragmenty modelu. W obrębie żądania HTTP wynik
+    jest zapamiętywany (flask.g), więc podział policzony przy kontroli przyjęć trafia
+    do generate_audio bez ponownego split_text. Czas podziału trafia do etapu "split"
+    profilu żądania (kontrola przyjęć działa już wewnątrz profilu).
+    """
+    max_chars = max_chars_for(model_name)
+    if len(text) <= max_chars:
+        return [text]
+    if not has_request_context():
+        with stage("split"):
+            return split_text(text, max_chars)
+    cache = g.setdefault("text_chunks", {})
+    key = (max_chars, text)
+    if key not in cache:
+        with stage("split"):
+            cache[key] = split_text(text, max_chars)
+    return cache[key]
+
+
+def request_chunks(model_name: str, data: dict) -> int | None:
+    """Łączna liczba fragmentów tekstu żądania ("text" albo wszystkie "items"); None bez tekstu."""
+    texts = [data.get("text")]
+    items = data.get("items")
+    if isinstance(items, list):
+        texts += [item.get("text") for item in items if isinstance(item, dict)]
+    texts = [normalize_text(text) for text in texts if isinstance(text, str) and text]
+    texts = [text for text in texts if text]
+    if not texts:
+        return None
+    return sum(len(split_chunks(model_name, text)) for text in texts)
+
+
+def file_duration(path: Path) -> float | None:
+    """Czas trwania z nagłówka pliku, bez dekodowania próbek (None, gdy pliku nie ma)."""
+    try:
+        frames, _, sample_rate = pcm_info(path)
+    except (OSError, RuntimeError):
+        return None
+    return frames / sample_rate if sample_rate else None
+
+
+def render_postprocessed(model: TTSBase, text: str, working_path: Path, priority: int,
+                         metadata: dict | None = None, pcm_out: list | None = None) -> Path:
+    """
+    Tekst jednoczęściowy przez pełny łańcuch postprocessor: modele z synthesize()
+    oddają próbki bez pliku pośredniego, więc na dysk trafia tylko wynik końcowy
+    (albo, z pcm_out, nic - próbki zostają w pamięci).
+    """
+    if hasattr(model, "synthesize"):
+        samples = run_inference(priority, model.synthesize, text)
+        sample_rate = model.sample_rate
+    else:
+        # Modele online i procesy potomne zapisują plik - czytamy go i usuwamy
+        raw_path = working_path.with_name(f"raw_{uuid.uuid4().hex[:8]}.wav")
+        try:
+            run_inference(priority, model.tts, text, str(raw_path))
+            if not raw_path.exists():
+                return working_path
+            samples, sample_rate = read_pcm(raw_path)
+        finally:
+            raw_path.unlink(missing_ok=True)
+    if len(samples) == 0:
+        return working_path
+    if postprocessor.enabled:
+        with stage("postprocess"):
+            samples, sample_rate = postprocessor.process([samples], sample_rate)
+    if pcm_out is not None:
+        pcm_out[:] = [(samples, sample_rate)]
+    else:
+        with stage("save"):
+            encode_pcm(samples, sample_rate, working_path)
+    if metadata is not None:
+        metadata.update(describe_pcm(samples, sample_rate))
+    return working_path
+
+
+def generate_audio(model: TTSBase, model_name: str, text: str, working_path: Path,
+                   priority: int = SINGLE, metadata: dict | None = None,
+                   pcm_out: list | None = None, text_chunks: list[str] | None = None) -> Path | None:
+    """
+    Generuje audio do working_path. Teksty dłuższe niż limit modelu są dzielone
+    przez split_text, a fragmenty sklejane po przycięciu ciszy (postprocessor).
+    Z włączonym łańcuchem postprocessor (resampling, głośność...) obrabiane są też
+    teksty jednoczęściowe - zawsze przed jedynym zapisem pliku. Każdy fragment
+    to osobne zadanie schedulera, więc zadania o wyższym priorytecie mogą
+    wejść pomiędzy fragmenty. Przycinanie i sklejanie fragmentu i odbywa się
+    w osobnym wątku, równolegle z inferencją fragmentu i+1; bez kroków wymagających
+    całego nagrania (przenikanie, resampling, głośność) fragmenty są od razu dopisywane
+    do pliku, więc pamięć nie rośnie z długością tekstu. Modele online
+    (RateLimitedTTS) pobierają do ONLINE_FETCH_WINDOW fragmentów naraz.
+    Jeśli podano słownik metadata, trafiają do niego czas trwania, format i poziomy
+    wyniku (dla dzielonych tekstów liczone z zapisywanych próbek, bez odczytu pliku).
+    Jeśli podano listę pcm_out, wynik (próbki float32, sample_rate) trafia do niej
+    zamiast do pliku - working_path nie powstaje (np. przekazanie PCM przez /dev/shm).
+    text_chunks: gotowy podział tekstu (split_chunks) - bez ponownego split_text.
+    Zwraca ścieżkę wygenerowanego pliku lub None, jeśli nie powstał żaden fragment.
+    """
+    MAX_CHARS = max_chars_for(model_name)
+
+    if len(text) <= MAX_CHARS:
+        print(f"[{model_name}] Generating single TTS → {working_path}")
+
+        def render_single() -> tuple[Path, float | None]:
+            """(ścieżka, czas trwania) - czas znany z próbek albo z nagłówka, bez dekodowania."""
+            if postprocessor.enabled or pcm_out is not None:
+                info = metadata if metadata is not None else {}
+                path = render_postprocessed(model, text, working_path, priority, info, pcm_out)
+                return path, info.get("duration_s")
+            path = Path(run_inference(priority, model.tts, text, str(working_path)))
+            return path, file_duration(path)
+
+        generated_path, duration = render_single()
+        with stage("verify"):
+            quality_ok = check_audio_quality(str(generated_path), text, duration)
+        if not quality_ok:
+            print(f"[{model_name}] Generated audio length looks wrong. Regenerating...")
+            generated_path, _ = render_single()
+        if metadata is not None and not postprocessor.enabled and pcm_out is None and generated_path.exists():
+            # Plik jest jeszcze lokalnie (staging) - odczyt tu jest tańszy niż później z miejsca docelowego
+            with stage("describe"):
+                metadata.update(describe_file(generated_path))
+        _log_mem("after_generation")
+        return generated_path
+
+    print(f"[{model_name}] Text > {MAX_CHARS} chars. Splitting...")
+    if text_chunks is None:
+        with stage("split"):
+            text_chunks = split_text(text, MAX_CHARS)
+    print(f"[{model_name}] Split into {len(text_chunks)} chunks.")
+    temp_dir = working_path.parent / f"temp_{uuid.uuid4().hex[:8]}"
+    temp_dir.mkdir(exist_ok=True)
+
+    # Potok: ten wątek zleca kolejne fragmenty do inferencji, a wątek CPU w tym
+    # czasie dekoduje, przycina i dokleja poprzednie. Ograniczona kolejka trzyma
+    # w pamięci/na dysku najwyżej CHUNK_PIPELINE_DEPTH fragmentów czekających na obróbkę.
+    ready_chunks: queue.Queue = queue.Queue(maxsize=CHUNK_PIPELINE_DEPTH)
+    pcm_clips: list[np.ndarray] = []
+    frame_rate: list[int] = []
+    errors: list[BaseException] = []
+    profile = current_profile()
+    # Gdy łańcuch nie potrzebuje całego nagrania (postprocessor.streamable), przycięte fragmenty
+    # są dopisywane do working_path od razu - sklejone nagranie nie rośnie w pamięci.
+    # Z pcm_out wynik i tak ma zostać w pamięci, więc fragmenty są sklejane jak dotąd.
+    output = None
+    levels: PcmLevels | None = None
+
+    def postprocess_chunks() -> None:
+        nonlocal output, levels
+        while True:
+            item = ready_chunks.get()
+            if item is None:
+                return
+            i, chunk_path = item
+            try:
+                with stage("trim", profile):
+                    samples, sample_rate = read_pcm(chunk_path)
+                    clip = postprocessor.trim(samples, sample_rate)
+                if not frame_rate:
+                    frame_rate.append(sample_rate)
+                    if pcm_out is None and postprocessor.streamable(sample_rate):
+                        output = open_pcm_writer(working_path, sample_rate, 1 if clip.ndim == 1 else clip.shape[1])
+                        levels = PcmLevels(sample_rate)
+                if output is None:
+                    pcm_clips.append(clip)
+                else:
+                    with stage("save", profile):
+                        block = postprocessor.stream_block(clip, sample_rate, first=levels.frames == 0)
+                        output.write(block)
+                        levels.add(block)
+                    del block
+                del clip
+                _log_mem(f"after_chunk_{i}")
+                del samples
+            except BaseException as e:
+                errors.append(e)
+            finally:
+                chunk_path.unlink(missing_ok=True)
+
+    consumer = threading.Thread(target=postprocess_chunks, name="tts-chunk-postprocess", daemon=True)
+    consumer.start()
+    # Fragmenty zawsze jako WAV - soundfile czyta je bez uruchamiania ffmpeg
+    chunk_paths = [temp_dir / f"part_{i:03d}_{uuid.uuid4().hex[:6]}.wav" for i in range(len(text_chunks))]
+
+    def generated_chunks():
+        """(i, fragment, ścieżka, wynik) w kolejności tekstu."""
+        if not (model.is_online and hasattr(model, "submit")):
+            for i, chunk in enumerate(text_chunks):
+                print(f"Chunk: {chunk}")
+                yield i, chunk, chunk_paths[i], run_inference(priority, model.tts, chunk, str(chunk_paths[i]))
+            return
+        # Model online: kilka zapytań naraz (bez schedulera - nie zajmują GPU), odbiór po kolei
+        in_flight: deque = deque()
+        try:
+            for i, chunk in enumerate(text_chunks):
+                if errors:
+                    break
+                in_flight.append((i, chunk, model.submit(chunk, str(chunk_paths[i]))))
+                if len(in_flight) >= ONLINE_FETCH_WINDOW:
+                    index, text_chunk, future = in_flight.popleft()
+                    with stage("inference"):
+                        result = future.result()
+                    yield index, text_chunk, chunk_paths[index], result
+            while in_flight and not errors:
+                index, text_chunk, future = in_flight.popleft()
+                with stage("inference"):
+                    result = future.result()
+                yield index, text_chunk, chunk_paths[index], result
+        finally:
+            # Przerwane pobieranie - czekamy na resztę, żeby nie pisała do usuwanego katalogu
+            for _, _, future in in_flight:
+                future.cancel()
+                try:
+                    future.result()
+                except BaseException:
+                    pass
+
+    chunk_results = generated_chunks()
+    try:
+        try:
+            for i, chunk, temp_file_path, chunk_path_str in chunk_results:
+                if errors:
+                    break
+                with stage("verify"):
+                    quality_ok = check_audio_quality(str(chunk_path_str), chunk, file_duration(Path(chunk_path_str)))
+                if not quality_ok:
+                    print(f"[{model_name}] Generated audio length looks wrong. Regenerating...")
+                    chunk_path_str = run_inference(priority, model.tts, chunk, str(temp_file_path))
+                generated_chunk_path = Path(chunk_path_str)
+                if generated_chunk_path.exists():
+                    # Blokuje, gdy obróbka nie nadąża - ogranicza zużycie pamięci
+                    ready_chunks.put((i, generated_chunk_path))
+                else:
+                    print(f"[{model_name}] WARNING: Chunk {i+1} failed.")
+        finally:
+            chunk_results.close()
+            ready_chunks.put(None)
+            consumer.join()
+            if output is not None:
+                output.close()
+        if errors:
+            if output is not None:
+                working_path.unlink(missing_ok=True)
+            raise errors[0]
+        if not frame_rate:
+            print(f"[{model_name}] ERROR: No audio chunks were generated.")
+            return None
+        if output is not None:
+            print(f"[{model_name}] Chunks streamed → {working_path}")
+            if metadata is not None:
+                metadata.update(levels.to_dict())
+            _log_mem("after_generation")
+            return working_path
+        print(f"[{model_name}] Merging {len(pcm_clips)} chunks → {working_path}")
+        with stage("postprocess"):
+            merged, sample_rate = postprocessor.process(pcm_clips, frame_rate[0], trimmed=True)
+        if metadata is not None:
+            with stage("describe"):
+                metadata.update(describe_pcm(merged, sample_rate))
+        if pcm_out is not None:
+            pcm_out[:] = [(merged, sample_rate)]
+            return working_path
+        with stage("save"):
+            encode_pcm(merged, sample_rate, working_path)
+        _log_mem("after_generation")
+        return working_path
+    finally:
+        if temp_dir.exists():
+            for f in temp_dir.glob('*'):
+                os.remove(f)
+            temp_dir.rmdir()
+
+
+def create_app(path_converter, staging_dir: Path | None = None, writer_queue_size: int = 256,
+               manifest_path: str | Path | None = None, inference_workers: int = 1,
+               profile_all: bool = False, max_profiles: int = 100, shm_ttl: float = 60.0,
+               max_pending: int = 16, max_chunks: int = 100, max_rss_mb: float | None = None,
+               max_vram_mb: float | None = None, draft_settle_seconds: float = 10.0):
     """
     path_converter: funkcja do zmiany ścieżek (Windows -> WSL)
     staging_dir: opcjonalna ścieżka do katalogu szybkiego zapisu (Linux native). 
                  Jeśli None, zapisuje bezpośrednio do celu.
+    writer_queue_size: maksymalna liczba plików czekających na przeniesienie ze stagingu
+                       w trybie async_write (po przekroczeniu żądania czekają).
+    manifest_path: opcjonalna ścieżka bazy SQLite z manifestem zadań wsadowych.
+                   Jeśli podana, zadania /batch są trwałe i wznawiane po restarcie.
+    inference_workers: liczba wątków wykonujących inferencję (np. liczba replik XTTS).
+    profile_all: mierzy etapy każdego żądania (bez tego tylko przy ?profile=1).
+    max_profiles: ile ostatnich profili trzymać pod /admin/profiles.
+    shm_ttl: czas dzierżawy (s) segmentów PCM w /dev/shm zwracanych przy ?return_pcm=shm.
+    max_pending: maks. liczba jednoczesnych żądań na model (kolejne dostają 429 z Retry-After).
+    max_chunks: maks. liczba fragmentów split_text w jednym tekście (dłuższe dostają 413).
+    max_rss_mb / max_vram_mb: progi pamięci, powyżej których nowe żądania dostają 503.
+    draft_settle_seconds: ile sekund linia z quality=draft musi pozostać niezmieniona,
+                          zanim ruszy jej odroczony render finalny.
     """
+    global scheduler
     app = Flask(__name__)
     CORS(app)
 
+    scheduler = InferenceScheduler(workers=inference_workers)
+
+    directories = DirectoryCache()
+    writer = BackgroundWriter(directories, max_queue=writer_queue_size)
+    atexit.register(writer.flush)
+    profiles = ProfileStore(max_profiles=max_profiles)
+    flights = SingleFlight()
+    admission = AdmissionController(max_pending=max_pending, max_chunks=max_chunks, max_rss_mb=max_rss_mb,
+                                    max_vram_mb=max_vram_mb, memory_probe=_memory_usage)
+    shm_store = SharedPcmStore(ttl=shm_ttl)
+    atexit.register(shm_store.close)
+
+    def render_final(entry) -> Path:
+        """Render finalny linii z wersji roboczej - każdy fragment z priorytetem IDLE."""
+        model = final_model_for(entry.model_name, entry.voice_file)
+        name = f"final_{uuid.uuid4().hex[:8]}_{entry.output_path.name}"
+        # Bez stagingu obok pliku roboczego (nie na jego miejscu) - podmiana nastąpi dopiero po renderze
+        working_path = staging_dir / name if staging_dir else entry.output_path.with_name(f".{name}")
+        generated_path = generate_audio(model, entry.model_name, entry.text, working_path, priority=IDLE,
+                                        metadata=entry.metadata)
+        if generated_path is None or not generated_path.exists():
+            raise RuntimeError("Final audio file was not created.")
+        return generated_path
+
+    def record_metadata(destinations: list[Path], metadata: dict, text: str, voice_file: str | None,
+                        model_name: str) -> None:
+        """Zapisuje metadane dostarczonych plików w indeksach ich katalogów (.tts_audio.json)."""
+        if not metadata:
+            return
+        for destination in destinations:
+            try:
+                AudioMetadataIndex.for_directory(destination.parent).record(
+                    destination, metadata, text=text, voice=voice_file, model=model_name)
+            except OSError as e:
+                print(f"[AUDIO INDEX] Cannot index {destination}: {e}")
+
+    def record_final_metadata(entry) -> None:
+        record_metadata([entry.output_path], entry.metadata, entry.text, entry.voice_file, entry.model_name)
+
+    deferred = DeferredRenderer(render_final, settle_seconds=draft_settle_seconds, on_swap=record_final_metadata)
+
+    def start_profile(label: str) -> RequestProfile | None:
+        # ?profile=1 - czasy etapów; ?profile=cprofile / ?profile=torch - dodatkowo ślad inferencji
+        value = request.args.get("profile", "").lower()
+        if value in TRACE_KINDS:
+            return RequestProfile(label, trace=value)
+        if value in ("1", "true") or profile_all:
+            return RequestProfile(label)
+        return None
+
+    def profiled(endpoint):
+        """Profiluje żądanie; wynik trafia do /admin/profiles i do odpowiedzi (JSON / X-Profile-Id)."""
+        @functools.wraps(endpoint)
+        def wrapper(model_name: str):
+            profile = start_profile(f"{model_name}/{endpoint.__name__}")
+            if profile is None:
+                return endpoint(model_name)
+            with activate(profile):
+                response = make_response(endpoint(model_name))
+            profiles.add(profile)
+            print(f"[PROFILE] {profile.label} {profile.profile_id}: {profile.to_dict()['stages']}")
+            response.headers["X-Profile-Id"] = profile.profile_id
+            payload = response.get_json(silent=True) if response.is_json else None
+            if isinstance(payload, dict):
+                payload["profile"] = profile.to_dict()
+                response.set_data(json.dumps(payload))
+            return response
+        return wrapper
+
+    def wants_async_write() -> bool:
+        # Bez stagingu plik powstaje od razu w miejscu docelowym - nie ma czego odkładać
+        return staging_dir is not None and request.args.get("async_write", "false").lower() == "true"
+
+    def rejected(model_name: str, e: AdmissionRejected):
+        print(f"[ADMISSION] {model_name}: {e}")
+        response = make_response(jsonify({"error": str(e)}), e.status)
+        if e.retry_after is not None:
+            response.headers["Retry-After"] = str(e.retry_after)
+        return response
+
+    def admitted(endpoint):
+        """Kontrola przyjęć: miejsce w limicie modelu, rozmiar tekstu i próg pamięci."""
+        @functools.wraps(endpoint)
+        def wrapper(model_name: str):
+            data = request.get_json(silent=True)
+            chunks = request_chunks(model_name.lower(), data) if isinstance(data, dict) else None
+            try:
+                ticket = admission.acquire(model_name.lower(), chunks)
+            except AdmissionRejected as e:
+                return rejected(model_name, e)
+            try:
+                return endpoint(model_name)
+            except AdmissionRejected as e:
+                # Rozmiar sprawdzany w endpoincie (np. linie skryptu projektu do syntezy)
+                return rejected(model_name, e)
+            finally:
+                admission.release(ticket)
+        return wrapper
+
     @app.route("/", methods=["GET", "OPTIONS"])
     def index():
         return jsonify({"status": "running", "message": "TTS API Server is up"}), 200
@@ -227,16 +675,22 @@ def create_app(path_converter, staging_dir: Path | None = None):
         try:
             rss = _get_rss_mb()
             latents = None
+            replicas = None
             try:
                 from generators.xtts import XTTSPolishTTS
                 latents = len(XTTSPolishTTS._latents_cache)
+                replicas = XTTSPolishTTS.replica_stats()
             except Exception:
                 latents = None
             info = {
                 'rss_mb': rss,
                 'latents_cache_size': latents,
+                'xtts_replicas': replicas,
                 'tts_model_loaded': current_model_name is not None,
                 'current_model_name': current_model_name,
+                'writer_pending': writer.pending,
+                'single_flight': flights.stats(),
+                'worker_processes': worker_pool.stats() if worker_pool is not None else None,
             }
             try:
                 import torch
@@ -249,14 +703,87 @@ def create_app(path_converter, staging_dir: Path | None = None):
         except Exception as e:
             return jsonify({'error': str(e)}), 500
 
+    def working_path_for(real_output_path: Path) -> Path:
+        if staging_dir:
+            return staging_dir / f"{uuid.uuid4().hex[:8]}_{real_output_path.name}"
+        return real_output_path
+
+    @app.route("/jobs/<job_id>", methods=["GET"])
+    def job_status(job_id: str):
+        if manifest is not None:
+            include_lines = request.args.get("lines", "false").lower() == "true"
+            progress = manifest.job_progress(job_id, include_lines=include_lines)
+            if progress is not None:
+                return jsonify(progress), 200
+        status = writer.status(job_id)
+        if status is None:
+            return jsonify({"error": f"Unknown job '{job_id}'"}), 404
+        return jsonify(status), 200
+
+    @app.route('/admin/admission', methods=['GET'])
+    def admin_admission():
+        return jsonify(admission.stats()), 200
+
+    @app.route('/admin/drafts', methods=['GET'])
+    def admin_drafts():
+        return jsonify(deferred.stats()), 200
+
+    @app.route('/admin/scheduler', methods=['GET'])
+    def admin_scheduler():
+        return jsonify(scheduler.stats()), 200
+
+    @app.route("/shm/<lease_id>/release", methods=["POST"])
+    def shm_release(lease_id: str):
+        if not shm_store.release(lease_id):
+            return jsonify({"error": f"Unknown lease '{lease_id}'"}), 404
+        return jsonify({"message": "Lease released"}), 200
+
+    @app.route("/shm/<lease_id>/renew", methods=["POST"])
+    def shm_renew(lease_id: str):
+        data = request.get_json(silent=True) or {}
+        ttl = data.get("ttl")
+        if ttl is not None and (isinstance(ttl, bool) or not isinstance(ttl, (int, float)) or ttl <= 0):
+            return jsonify({"error": "'ttl' must be a positive number of seconds"}), 400
+        lease = shm_store.renew(lease_id, ttl=ttl)
+        if lease is None:
+            return jsonify({"error": f"Unknown lease '{lease_id}'"}), 404
+        return jsonify(lease.to_dict()), 200
+
+    @app.route('/admin/shm', methods=['GET'])
+    def admin_shm():
+        return jsonify(shm_store.stats()), 200
+
+    @app.route('/admin/profiles', methods=['GET'])
+    def admin_profiles():
+        return jsonify(profiles.summaries()), 200
+
+    @app.route('/admin/profiles/<profile_id>', methods=['GET'])
+    def admin_profile(profile_id: str):
+        profile = profiles.get(profile_id)
+        if profile is None:
+            return jsonify({"error": f"Unknown profile '{profile_id}'"}), 404
+        info = profile.to_dict()
+        info["top_functions"] = profile.top_functions()
+        return jsonify(info), 200
+
+    @app.route('/admin/profiles/<profile_id>/trace', methods=['GET'])
+    def admin_profile_trace(profile_id: str):
+        """Plik śladu: .prof (snakeviz / flameprof) lub .torch.json (ui.perfetto.dev)."""
+        profile = profiles.get(profile_id)
+        if profile is None or not profile.trace_path or not os.path.exists(profile.trace_path):
+            return jsonify({"error": f"No trace for profile '{profile_id}'"}), 404
+        return send_file(profile.trace_path, as_attachment=True, download_name=os.path.basename(profile.trace_path))
+
     @app.route("/<model_name>/tts", methods=["POST"])
+    @profiled
+    @admitted
     def tts_endpoint(model_name: str):
         if not request.is_json:
             print("Received non-JSON request.")
             return jsonify({"error": "Request must be JSON"}), 400
 
         data = request.get_json()
-        text = data.get("text")
+        text = normalize_text(data.get("text") or "")
         
         # 1. Ustalanie docelowej ścieżki (po konwersji /mnt/d/...)
         output_file_raw = data.get("output_file")
@@ -265,124 +792,216 @@ def create_app(path_converter, staging_dir: Path | None = None):
         voice_file_raw = data.get("voice_file")
         voice_file = path_converter(voice_file_raw) if voice_file_raw else None
 
-        if not text or not real_output_file:
+        return_audio = request.args.get("return_audio", "false").lower() == "true"
+        # ?return_pcm=shm - PCM w segmencie /dev/shm opisanym w odpowiedzi (klient lokalny);
+        # output_file jest wtedy opcjonalny
+        return_pcm = request.args.get("return_pcm", "").lower() == "shm" and not return_audio
+        # quality=draft - szybka wersja robocza, finalny render podmieni plik w tle
+        quality = (data.get("quality") or "final").lower()
+        if quality not in ("draft", "final"):
+            return jsonify({"error": f"Unknown quality '{quality}' (expected 'draft' or 'final')"}), 400
+        # Wersja robocza musi leżeć na miejscu przed rejestracją renderu finalnego
+        async_write = wants_async_write() and not return_audio and quality == "final"
+
+        if not text or not (real_output_file or return_pcm):
             print("Missing 'text' or 'output_file'")
             return jsonify({"error": "Missing 'text' or 'output_file'"}), 400
 
-        real_output_path = Path(real_output_file)
-        
-        try:
-            real_output_path.parent.mkdir(parents=True, exist_ok=True)
-        except OSError as e:
-            print(f"Cannot create destination directory: {e}")
-            return jsonify({"error": f"Cannot create destination directory: {e}"}), 500
+        real_output_path = Path(real_output_file) if real_output_file else None
+        if real_output_path is not None and not async_write:
+            try:
+                directories.ensure(real_output_path.parent)
+            except OSError as e:
+                print(f"Cannot create destination directory: {e}")
+                return jsonify({"error": f"Cannot create destination directory: {e}"}), 500
 
-        if staging_dir:
-            staging_filename = f"{uuid.uuid4().hex[:8]}_{real_output_path.name}"
-            working_path = staging_dir / staging_filename
+        if real_output_path is None:
+            # Sam PCM dla klienta - bez pliku wyniku; katalog w RAM tylko na pliki pośrednie
+            # (fragmenty dzielonych tekstów, wyniki procesów potomnych)
+            working_path = shm_store.directory / f"shm_{uuid.uuid4().hex[:8]}.wav"
         else:
-            working_path = real_output_path
+            working_path = working_path_for(real_output_path)
 
         _log_mem("before_model_init")
-        success, msg = initialize_model(model_name.lower(), voice_file)
-        if not success:
-            print(f"Model initialization error: {msg}")
-            return jsonify({"error": msg}), 500
-        if tts_model is None:
+        with stage("model_init"):
+            try:
+                draft = draft_model_for(model_name.lower(), voice_file) if quality == "draft" else None
+            except Exception as e:
+                print(f"Draft model initialization error: {e}")
+                return jsonify({"error": f"Failed to load draft model: {e}"}), 500
+            if draft is not None:
+                render_model_name, model = draft
+                msg = f"Draft model '{render_model_name}' loaded."
+            else:
+                success, msg = initialize_model(model_name.lower(), voice_file)
+                if not success:
+                    print(f"Model initialization error: {msg}")
+                    return jsonify({"error": msg}), 500
+                render_model_name, model = model_name, tts_model
+        if model is None:
             print("Critical Error: tts_model is None after initialization.")
             return jsonify({"error": "TTS model is not initialized."}), 500
         _log_mem("after_model_init")
-        
+
+        # Identyczne równoległe żądanie (np. ponowienie po timeoucie) czeka na trwającą syntezę
+        flight = flight_key = None
+        if real_output_path is not None and not return_pcm:
+            flight_key = (model_name.lower(), str(voice_file or ""), text, real_output_path.suffix.lower(),
+                          async_write, draft is not None)
+            flight, leader = flights.join(flight_key, [real_output_path])
+            if not leader:
+                print(f"[{model_name}] Coalesced with in-flight synthesis: {text[:50]}")
+                try:
+                    shared = flight.future.result()
+                except Exception as e:
+                    return jsonify({"error": f"Error during TTS generation: {e}"}), 500
+                if return_audio:
+                    return send_file(real_output_path, as_attachment=True, download_name=real_output_path.name)
+                return jsonify({"message": msg, "output_file": str(real_output_path), "coalesced": True,
+                                **shared}), 202 if "job_id" in shared else 200
 
         import gc
         try:
-            MAX_CHARS = 200 if model_name != "teamsp" else 10000000
-            generated_path: Path | None = None
             start_t = time.time()
-            audio_clips = None
-            combined_audio = None
-            temp_dir = None
-
-            if len(text) <= MAX_CHARS:
-                print(f"[{model_name}] Generating single TTS → {working_path}")
-                generated_path = Path(tts_model.tts(text, str(working_path)))
-                if not check_audio_quality(str(generated_path), text):
-                    print(f"[{model_name}] Generated audio length looks wrong. Regenerating...")
-                    generated_path = Path(tts_model.tts(text, str(working_path)))
-                _log_mem("after_generation")
-            else:
-                print(f"[{model_name}] Text > {MAX_CHARS} chars. Splitting...")
-                text_chunks = split_text(text, MAX_CHARS)
-                print(f"[{model_name}] Split into {len(text_chunks)} chunks.")
-                audio_clips = []
-                temp_dir = working_path.parent / f"temp_{uuid.uuid4().hex[:8]}"
-                temp_dir.mkdir(exist_ok=True)
-                file_format = working_path.suffix.lstrip('.')
-                if not file_format:
-                    file_format = "wav"
-                try:
-                    for i, chunk in enumerate(text_chunks):
-                        temp_file_name = f"part_{i:03d}_{uuid.uuid4().hex[:6]}.{file_format}"
-                        temp_file_path = temp_dir / temp_file_name
-                        print(f"Chunk: {chunk}")
-                        chunk_path_str = tts_model.tts(chunk, str(temp_file_path))
-                        if not check_audio_quality(str(chunk_path_str), chunk):
-                            print(f"[{model_name}] Generated audio length looks wrong. Regenerating...")
-                            chunk_path_str = Path(tts_model.tts(chunk, str(temp_file_path)))
-                        generated_chunk_path = Path(chunk_path_str)
-                        if generated_chunk_path.exists():
-                            audio_chunk = AudioSegment.from_file(generated_chunk_path, format=file_format)
-                            trimmed_chunk = trim_silence(audio_chunk)
-                            audio_clips.append(trimmed_chunk)
-                            _log_mem(f"after_chunk_{i}")
-                            del audio_chunk
-                            del trimmed_chunk
-                        else:
-                            print(f"[{model_name}] WARNING: Chunk {i+1} failed.")
-                    if not audio_clips:
-                        print(f"[{model_name}] ERROR: No audio chunks were generated.")
-                        return jsonify({"error": "Failed to generate any audio chunks."}), 500
-                    print(f"[{model_name}] Merging {len(audio_clips)} chunks → {working_path}")
-                    combined_audio = AudioSegment.empty()
-                    for clip in audio_clips:
-                        combined_audio += clip
-                        del clip
-                    combined_audio.export(working_path, format=file_format)
-                    generated_path = working_path
-                    _log_mem("after_generation")
-                finally:
-                    if temp_dir and temp_dir.exists():
-                        for f in temp_dir.glob('*'):
-                            os.remove(f)
-                        temp_dir.rmdir()
-            final_file_ready = False
-            if generated_path and generated_path.exists():
-                if staging_dir:
-                    print(f"📦 Moving from staging to final dest: {real_output_path}")
-                    shutil.move(str(generated_path), str(real_output_path))
-                    final_file_ready = True
-                else:
-                    final_file_ready = True
-            if not final_file_ready:
+            metadata: dict = {}
+            # Z return_pcm próbki trafiają prosto do segmentu, bez kodowania i dekodowania pliku
+            pcm_out: list | None = [] if return_pcm else None
+            generated_path = generate_audio(model, render_model_name, text, working_path, metadata=metadata,
+                                            pcm_out=pcm_out, text_chunks=split_chunks(render_model_name, text))
+            if generated_path is None or pcm_out == []:
+                return jsonify({"error": "Failed to generate any audio chunks."}), 500
+            extra = {"quality": "draft", "final_pending": real_output_path is not None} if draft is not None else {}
+            if pcm_out:
+                samples, sample_rate = pcm_out.pop()
+                with stage("shm"):
+                    extra["shm"] = shm_store.create_from_pcm(samples, sample_rate).to_dict()
+                if real_output_path is None:
+                    print(f"{time.time() - start_t:.2f} (shm): {text}")
+                    return jsonify({"message": msg, **extra}), 200
+                with stage("save"):
+                    encode_pcm(samples, sample_rate, generated_path)
+                del samples
+            if not generated_path.exists():
                 print("ERROR: Final audio file was not created.")
                 return jsonify({"error": "Final audio file was not created."}), 500
-            return_audio = request.args.get("return_audio", "false").lower() == "true"
+            destinations = flights.close(flight_key, flight) if flight is not None else [real_output_path]
+            if draft is None:
+                # Render finalny zastępuje oczekującą wersję roboczą tego pliku
+                for destination in destinations:
+                    deferred.cancel(destination)
+            on_written = functools.partial(record_metadata, metadata=metadata, text=text, voice_file=voice_file,
+                                           model_name=render_model_name)
+            if async_write:
+                with stage("move"):
+                    job_id = writer.submit(generated_path, destinations, on_done=on_written)
+                if flight is not None:
+                    flight.future.set_result({"job_id": job_id, "status": "staged"})
+                print(f"{time.time() - start_t:.2f} (staged, job {job_id}): {text}")
+                return jsonify({
+                    "message": msg,
+                    "output_file": str(real_output_path),
+                    "job_id": job_id,
+                    "status": "staged",
+                    **extra,
+                }), 202
+            with stage("move"):
+                deliver_file(generated_path, destinations, directories)
+            on_written(destinations)
+            if draft is not None:
+                for destination in destinations:
+                    deferred.register(model_name.lower(), voice_file, text, destination)
+            if flight is not None:
+                flight.future.set_result(extra)
             if return_audio:
                 return send_file(real_output_path, as_attachment=True, download_name=real_output_path.name)
             print(f"{time.time() - start_t:.2f}: {text}")
-            return jsonify({"message": msg, "output_file": str(real_output_path)}), 200
+            return jsonify({"message": msg, "output_file": str(real_output_path), **extra}), 200
+        except ShmLimitExceeded as e:
+            print(f"Shared memory handoff rejected: {e}")
+            # Plik w stagingu nie zostanie dostarczony - także gdy podano output_file
+            working_path.unlink(missing_ok=True)
+            return jsonify({"error": str(e)}), 507
         except Exception as e:
             import traceback
             print(traceback.format_exc())
             return jsonify({"error": f"Error during TTS generation: {e}", "trace": traceback.format_exc()}), 500
         finally:
-            # Jawne czyszczenie dużych obiektów i pamięci
-            if audio_clips is not None:
-                del audio_clips
-            if combined_audio is not None:
-                del combined_audio
-            if temp_dir is not None:
-                del temp_dir
+            if flight is not None and not flight.future.done():
+                # Lider nie dostarczył pliku - czekający dostają błąd zamiast wisieć
+                flights.close(flight_key, flight)
+                flight.future.set_exception(RuntimeError("Coalesced synthesis failed"))
+            # Jawne czyszczenie pamięci (z --worker-processes modele są w procesach potomnych,
+            # a ich pamięć odzyskuje recykling procesów)
+            if worker_pool is None:
+                gc.collect()
+                try:
+                    import torch
+                    if torch.cuda.is_available():
+                        torch.cuda.empty_cache()
+                except ImportError:
+                    pass
+            _log_mem("after_cleanup")
+
+    def run_batch(model_name: str, lines: list[dict], async_write: bool = False,
+                  hash_outputs: bool = False, on_result=None, draft: bool = False, on_final=None) -> int:
+        """
+        Syntezuje linie wsadu. lines: słowniki z kluczami text (znormalizowany),
+        voice_file i output_path. Identyczne pary (głos, tekst) są syntezowane raz,
+        a wynik kopiowany do wszystkich plików. on_result(line, result) jest
+        wołane dla każdej linii. Zwraca liczbę wykonanych syntez.
+        draft: wersje robocze (bez async_write) z odroczonym renderem finalnym;
+               on_final(entry) jest wołane po podmianie pliku na finalny.
+        """
+        groups: dict[tuple[str | None, str], list[dict]] = {}
+        for line in lines:
+            groups.setdefault((line["voice_file"], line["text"]), []).append(line)
+
+        print(f"[{model_name}] Batch: {len(lines)} items -> {len(groups)} unique lines.")
+        import gc
+        # Sortowanie po głosie ogranicza liczbę przeładowań modelu
+        for (voice_file, text), targets in sorted(groups.items(), key=lambda g: (g[0][0] or "", g[0][1])):
+            try:
+                with stage("model_init"):
+                    draft_model = draft_model_for(model_name.lower(), voice_file) if draft else None
+                    if draft_model is not None:
+                        render_model_name, model = draft_model
+                    else:
+                        success, msg = initialize_model(model_name.lower(), voice_file)
+                        render_model_name, model = model_name, tts_model
+                        if not success or model is None:
+                            raise RuntimeError(msg)
+                destinations = [line["output_path"] for line in targets]
+                metadata: dict = {}
+                generated_path = generate_audio(model, render_model_name, text, working_path_for(destinations[0]),
+                                                priority=BULK, metadata=metadata,
+                                                text_chunks=split_chunks(render_model_name, text))
+                if generated_path is None or not generated_path.exists():
+                    raise RuntimeError("Final audio file was not created.")
+                result = {"status": "ok"}
+                if hash_outputs:
+                    result["output_hash"] = file_sha256(generated_path)
+                on_written = functools.partial(record_metadata, metadata=metadata, text=text,
+                                               voice_file=voice_file, model_name=render_model_name)
+                with stage("move"):
+                    if async_write:
+                        result["job_id"] = writer.submit(generated_path, destinations, on_done=on_written)
+                    else:
+                        deliver_file(generated_path, destinations, directories)
+                        on_written(destinations)
+                for destination in destinations:
+                    if draft_model is not None:
+                        deferred.register(model_name.lower(), voice_file, text, destination, on_done=on_final)
+                    else:
+                        deferred.cancel(destination)
+                if draft_model is not None:
+                    result["quality"] = "draft"
+            except Exception as e:
+                print(f"[{model_name}] Batch line failed: {e}")
+                result = {"status": "error", "error": str(e)}
+            if on_result is not None:
+                for line in targets:
+                    on_result(line, dict(result, output_file=str(line["output_path"])))
+        if worker_pool is None:
             gc.collect()
             try:
                 import torch
@@ -390,16 +1009,284 @@ def create_app(path_converter, staging_dir: Path | None = None):
                     torch.cuda.empty_cache()
             except ImportError:
                 pass
-            _log_mem("after_cleanup")
+        _log_mem("after_batch")
+        return len(groups)
+
+    def run_manifest_job(job_id: str, model_name: str) -> None:
+        """Wykonuje (lub wznawia) trwałe zadanie: pomija linie gotowe i niezmienione."""
+        lines = []
+        for row in manifest.pending_lines(job_id):
+            output_path = Path(row["output_file"])
+            try:
+                directories.ensure(output_path.parent)
+            except OSError as e:
+                manifest.update_line(job_id, row["idx"], FAILED, error=f"Cannot create destination directory: {e}")
+                continue
+            lines.append({"idx": row["idx"], "text": row["text"], "voice_file": row["voice_file"],
+                          "output_path": output_path})
+
+        def on_result(line: dict, result: dict) -> None:
+            if result["status"] != "ok":
+                manifest.update_line(job_id, line["idx"], FAILED, error=result.get("error"))
+                return
+            # Stan "verified" zarezerwowany dla prawdziwej weryfikacji (ASR) - check_audio_quality
+            # jest wyłączony i zawsze zwraca True
+            manifest.update_line(job_id, line["idx"], GENERATED, output_path=line["output_path"],
+                                 output_hash=result.get("output_hash"))
+
+        if lines:
+            run_batch(model_name, lines, hash_outputs=True, on_result=on_result)
+        manifest.finish_job(job_id)
+        print(f"[{model_name}] Job {job_id} finished: {manifest.job_progress(job_id)}")
+
+    def manifest_runner() -> None:
+        while True:
+            job_id, model_name = manifest_queue.get()
+            try:
+                run_manifest_job(job_id, model_name)
+            except Exception as e:
+                import traceback
+                print(f"[MANIFEST] Job {job_id} crashed: {e}")
+                print(traceback.format_exc())
+
+    manifest = JobManifest(manifest_path) if manifest_path else None
+    manifest_queue: queue.Queue = queue.Queue()
+    if manifest is not None:
+        threading.Thread(target=manifest_runner, name="tts-manifest-runner", daemon=True).start()
+        for job_id, job_model in manifest.incomplete_jobs():
+            print(f"[MANIFEST] Resuming job {job_id} ({job_model}): {manifest.job_progress(job_id)}")
+            manifest_queue.put((job_id, job_model))
+
+    @app.route("/<model_name>/batch", methods=["POST"])
+    @profiled
+    @admitted
+    def batch_endpoint(model_name: str):
+        """
+        Generuje wiele linii w jednym żądaniu:
+        {"voice_file": "...", "items": [{"text": "...", "output_file": "...", "voice_file": "..."}]}
+        Identyczne pary (głos, znormalizowany tekst) są syntezowane raz,
+        a wynik kopiowany do wszystkich żądanych plików.
+        Z włączonym manifestem (--manifest) zadanie jest zapisywane trwale,
+        wykonywane w tle i wznawiane po restarcie serwera; odpowiedź zawiera job_id.
+        """
+        if not request.is_json:
+            print("Received non-JSON batch request.")
+            return jsonify({"error": "Request must be JSON"}), 400
+
+        data = request.get_json()
+        items = data.get("items")
+        if not isinstance(items, list) or not items:
+            return jsonify({"error": "Missing 'items'"}), 400
+        default_voice_raw = data.get("voice_file")
+        async_write = wants_async_write() and manifest is None
+
+        results: list[dict] = [{} for _ in items]
+        lines = []
+        for index, item in enumerate(items):
+            text = normalize_text(item.get("text") or "")
+            output_file_raw = item.get("output_file")
+            voice_file_raw = item.get("voice_file") or default_voice_raw
+            results[index] = {"output_file": output_file_raw, "status": "error"}
+            if not text or not output_file_raw:
+                results[index]["error"] = "Missing 'text' or 'output_file'"
+                continue
+            voice_file = path_converter(voice_file_raw) if voice_file_raw else None
+            real_output_path = Path(path_converter(output_file_raw))
+            if not async_write and manifest is None:
+                try:
+                    directories.ensure(real_output_path.parent)
+                except OSError as e:
+                    results[index]["error"] = f"Cannot create destination directory: {e}"
+                    continue
+            lines.append({"index": index, "text": text, "voice_file": voice_file, "output_path": real_output_path})
+
+        if manifest is not None:
+            if not lines:
+                return jsonify({"error": "No valid items", "results": results}), 400
+            job_id, skipped = manifest.create_job(model_name.lower(), [
+                {"text": line["text"], "voice_file": line["voice_file"], "output_file": str(line["output_path"])}
+                for line in lines
+            ])
+            manifest_queue.put((job_id, model_name.lower()))
+            print(f"[{model_name}] Job {job_id}: {len(lines)} lines queued, {skipped} unchanged skipped.")
+            return jsonify({
+                "job_id": job_id,
+                "items": len(items),
+                "queued": len(lines) - skipped,
+                "skipped": skipped,
+                "invalid": len(items) - len(lines),
+            }), 202
+
+        def on_result(line: dict, result: dict) -> None:
+            results[line["index"]] = result
+
+        synthesized = run_batch(model_name, lines, async_write=async_write, on_result=on_result)
+
+        failed = sum(1 for r in results if r.get("status") != "ok")
+        return jsonify({
+            "items": len(items),
+            "synthesized": synthesized,
+            "failed": failed,
+            "results": results,
+        }), 200 if failed == 0 else 207
+
+    @app.route("/<model_name>/project", methods=["POST"])
+    @profiled
+    @admitted
+    def project_endpoint(model_name: str):
+        """
+        Tryb projektu: skrypt SRT lub CSV (id, speaker, text) renderowany do output_dir
+        jako <id>.<rozszerzenie>. {"script": "..." lub "script_file": "...", "format": "srt"|"csv",
+        "output_dir": "...", "voice_file": "...", "voices": {"Mówca": "głos"}, "extension": ".wav",
+        "quality": "final"|"draft"}
+        Indeks odcisków linii w output_dir sprawia, że przy ponownym wysłaniu skryptu
+        syntezowane są tylko linie dodane lub zmienione; pozostałe pliki zostają.
+        Przy quality=draft zmienione linie dostają szybkie wersje robocze, a rendery
+        finalne wykonują się w tle i podmieniają pliki (indeks jest wtedy aktualizowany).
+        """
+        if not request.is_json:
+            print("Received non-JSON project request.")
+            return jsonify({"error": "Request must be JSON"}), 400
+
+        data = request.get_json()
+        output_dir_raw = data.get("output_dir")
+        if not output_dir_raw:
+            return jsonify({"error": "Missing 'output_dir'"}), 400
+        script = data.get("script")
+        script_format = data.get("format")
+        script_file_raw = data.get("script_file")
+        if script is None and script_file_raw:
+            script_file = Path(path_converter(script_file_raw))
+            try:
+                script = script_file.read_text(encoding="utf-8-sig")
+            except OSError as e:
+                return jsonify({"error": f"Cannot read script file: {e}"}), 400
+            script_format = script_format or script_file.suffix
+        if not script:
+            return jsonify({"error": "Missing 'script' or 'script_file'"}), 400
+
+        quality = (data.get("quality") or "final").lower()
+        if quality not in ("draft", "final"):
+            return jsonify({"error": f"Unknown quality '{quality}' (expected 'draft' or 'final')"}), 400
+        voices = data.get("voices") or {}
+        default_voice_raw = data.get("voice_file")
+        extension = data.get("extension") or ".wav"
+        extension = extension if extension.startswith(".") else f".{extension}"
+        try:
+            script_lines = parse_script(script, script_format, speakers=voices.keys())
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if not script_lines:
+            return jsonify({"error": "No lines found in script"}), 400
+
+        output_dir = Path(path_converter(output_dir_raw))
+        try:
+            directories.ensure(output_dir)
+        except OSError as e:
+            return jsonify({"error": f"Cannot create destination directory: {e}"}), 500
+
+        # Wspólny indeks katalogu - ten sam obiekt aktualizują rendery finalne w tle i inne żądania
+        index = ProjectIndex.for_directory(output_dir)
+
+        @after_this_request
+        def flush_index(response):
+            index.flush()
+            return response
+
+        model_key = model_name.lower()
+        seen: set[str] = set()
+        lines, duplicates, line_paths = [], [], []
+        reused = 0
+        for script_line in script_lines:
+            line_id = script_line["id"]
+            if line_id in seen:
+                duplicates.append(line_id)
+                continue
+            seen.add(line_id)
+            text = normalize_text(script_line["text"])
+            voice_file_raw = voices.get(script_line["speaker"]) or default_voice_raw
+            voice_file = path_converter(voice_file_raw) if voice_file_raw else None
+            output_path = output_dir / output_name(line_id, extension)
+            line_paths.append(output_path)
+            fingerprint = text_fingerprint(model_key, voice_file, text)
+            if index.is_current(line_id, fingerprint, output_path, quality):
+                reused += 1
+                continue
+            if manifest is not None:
+                # Linia mogła zostać wyrenderowana przez wcześniejsze zadanie manifestu
+                previous = manifest.find_completed(str(output_path), fingerprint)
+                if previous is not None and JobManifest.is_output_unchanged(previous):
+                    index.record(line_id, fingerprint, output_path, previous["output_hash"])
+                    reused += 1
+                    continue
+            lines.append({"id": line_id, "text": text, "voice_file": voice_file,
+                          "output_path": output_path, "fingerprint": fingerprint})
+        # Kontrola przyjęć liczy fragmenty wszystkich linii, które trzeba zsyntezować
+        admission.check_size(sum(len(split_chunks(model_key, line["text"])) for line in lines))
+        removed = index.forget_missing(seen)
+
+        summary = {
+            "lines": len(script_lines),
+            "changed": len(lines),
+            "reused": reused,
+            "removed": removed,
+            "duplicate_ids": duplicates,
+        }
+        print(f"[{model_name}] Project {output_dir}: {len(lines)} changed, {reused} reused, "
+              f"{len(removed)} removed.")
+        def audio_report() -> dict:
+            # Z indeksu metadanych katalogu - bez dekodowania plików
+            audio_index = AudioMetadataIndex.for_directory(output_dir)
+            durations = [m["duration_s"] for m in map(audio_index.get, line_paths) if m is not None]
+            return {"indexed_lines": len(durations), "duration_s": round(sum(durations), 3)}
+
+        if not lines:
+            summary["audio"] = audio_report()
+            return jsonify(summary), 200
+
+        # Wersje robocze są szybkie i jednorazowe - bez trwałego zadania manifestu
+        if manifest is not None and quality == "final":
+            job_id, _ = manifest.create_job(model_key, [
+                {"text": line["text"], "voice_file": line["voice_file"], "output_file": str(line["output_path"])}
+                for line in lines
+            ])
+            manifest_queue.put((job_id, model_key))
+            return jsonify(dict(summary, job_id=job_id)), 202
+
+        results = []
+
+        def on_result(line: dict, result: dict) -> None:
+            if result["status"] == "ok":
+                index.record(line["id"], line["fingerprint"], line["output_path"], result["output_hash"],
+                             result.get("quality", "final"))
+            results.append(dict(result, id=line["id"]))
+
+        lines_by_path = {line["output_path"]: line for line in lines}
+
+        def on_final(entry) -> None:
+            # Po zakończeniu żądania - zapis odłożony (SAVE_DELAY) w indeksie współdzielonym z żądaniami
+            line = lines_by_path[entry.output_path]
+            ProjectIndex.for_directory(output_dir).record(line["id"], line["fingerprint"], entry.output_path,
+                                                          file_sha256(entry.output_path), "final")
+
+        synthesized = run_batch(model_name, lines, hash_outputs=True, on_result=on_result,
+                                draft=quality == "draft", on_final=on_final)
+        summary["quality"] = quality
+        summary["audio"] = audio_report()
+        failed = sum(1 for r in results if r.get("status") != "ok")
+        summary.update(synthesized=synthesized, failed=failed, results=results)
+        return jsonify(summary), 200 if failed == 0 else 207
 
     @app.route("/<model_name>/stream", methods=["POST"])
+    @profiled
+    @admitted
     def stream_endpoint(model_name: str):
         if not request.is_json:
             print("Received non-JSON request for stream.")
             return jsonify({"error": "Request must be JSON"}), 400
 
         data = request.get_json()
-        text = data.get("text")
+        text = normalize_text(data.get("text") or "")
         
         voice_file_raw = data.get("voice_file")
         voice_file = path_converter(voice_file_raw) if voice_file_raw else None
@@ -410,12 +1297,14 @@ def create_app(path_converter, staging_dir: Path | None = None):
 
         try:
             _log_mem("before_model_init_stream")
-            success, msg = initialize_model(model_name.lower(), voice_file)
+            with stage("model_init"):
+                success, msg = initialize_model(model_name.lower(), voice_file)
             if not success:
                 print(f"Model initialization error: {msg}")
                 return jsonify({"error": msg}), 500
             
-            if tts_model is None:
+            model = tts_model
+            if model is None:
                 print("Critical Error: tts_model is None after initialization.")
                 return jsonify({"error": "TTS model is not initialized."}), 500
             
@@ -429,8 +1318,8 @@ def create_app(path_converter, staging_dir: Path | None = None):
 
             print(f"[{model_name}] Generowanie strumieniowe (RAM) -> {temp_file_path}")
             
-            # Generowanie audio używając metody modelu TTS do pliku w RAM
-            tts_model.tts(text, str(temp_file_path))
+            # Generowanie audio używając metody modelu TTS do pliku w RAM (najwyższy priorytet)
+            run_inference(INTERACTIVE, model.tts, text, str(temp_file_path))
 
             if not temp_file_path.exists():
                 return jsonify({"error": "Model failed to generate audio file."}), 500
@@ -457,8 +1346,111 @@ def run_server(path_converter, staging_path: str | None = None):
     parser = argparse.ArgumentParser(description="Multi-Model TTS API Server")
     parser.add_argument("--host", default="127.0.0.1")
     parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--writer-queue", type=int, default=256,
+                        help="Max. liczba plików czekających na przeniesienie ze stagingu (tryb async_write)")
+    parser.add_argument("--xtts-cpu-perf", action="store_true",
+                        help="XTTS na CPU: kwantyzacja int8 GPT i strojenie wątków")
+    parser.add_argument("--xtts-threads", type=int, default=None,
+                        help="Liczba wątków intra-op torch w trybie --xtts-cpu-perf (domyślnie wszystkie rdzenie)")
+    parser.add_argument("--xtts-interop-threads", type=int, default=None,
+                        help="Liczba wątków inter-op torch w trybie --xtts-cpu-perf")
+    parser.add_argument("--xtts-compile", action="store_true",
+                        help="W trybie --xtts-cpu-perf kompiluje dekoder torch.compile")
+    parser.add_argument("--xtts-prefix-cache", action="store_true",
+                        help="XTTS: ponowne użycie stanu KV GPT dla latentów mówcy (szybsze krótkie linie)")
+    parser.add_argument("--xtts-devices", default=None,
+                        help="Lista urządzeń XTTS, po jednej replice na wpis, np. 'cuda:0,cuda:1' lub 'cpu,cpu'")
+    parser.add_argument("--manifest", default=None,
+                        help="Plik SQLite z manifestem zadań wsadowych (wznawianie po restarcie)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Mierzy czasy etapów każdego żądania (wyniki pod /admin/profiles)")
+    parser.add_argument("--shm-ttl", type=float, default=60.0,
+                        help="Czas dzierżawy (s) segmentów PCM w /dev/shm dla ?return_pcm=shm")
+    parser.add_argument("--worker-processes", type=int, default=0,
+                        help="Liczba procesów potomnych do inferencji XTTS/Piper (0 = w procesie serwera)")
+    parser.add_argument("--recycle-requests", type=int, default=500,
+                        help="Recykling procesu inferencji po tylu żądaniach (0 = bez limitu)")
+    parser.add_argument("--recycle-rss-mb", type=float, default=None,
+                        help="Recykling procesu inferencji po przekroczeniu RSS (MB)")
+    parser.add_argument("--recycle-vram-mb", type=float, default=None,
+                        help="Recykling procesu inferencji po przekroczeniu zarezerwowanej pamięci CUDA (MB)")
+    parser.add_argument("--max-pending", type=int, default=16,
+                        help="Maks. liczba jednoczesnych żądań na model; kolejne dostają 429 z Retry-After")
+    parser.add_argument("--max-chunks", type=int, default=100,
+                        help="Maks. liczba fragmentów (split_text) jednego żądania - tekstu albo wszystkich "
+                             "linii /batch i /project; większe dostają 413")
+    parser.add_argument("--max-rss-mb", type=float, default=None,
+                        help="Powyżej tego RSS (serwer + procesy inferencji) nowe żądania dostają 503")
+    parser.add_argument("--max-vram-mb", type=float, default=None,
+                        help="Powyżej tej zarezerwowanej pamięci CUDA nowe żądania dostają 503")
+    parser.add_argument("--piper-profile", choices=["default", "latency", "throughput"], default="default",
+                        help="Profil sesji ONNX Runtime dla Piper (latency: wszystkie rdzenie na żądanie, "
+                             "throughput: mało wątków na żądanie przy kilku --inference-workers)")
+    parser.add_argument("--piper-threads", type=int, default=None,
+                        help="Liczba wątków intra-op ORT dla Piper (nadpisuje profil)")
+    parser.add_argument("--piper-io-binding", action="store_true",
+                        help="Inferencja Piper przez IO binding ONNX Runtime (zysk głównie na CUDA)")
+    parser.add_argument("--piper-cpu", action="store_true", help="Wymuś CPU dla Piper nawet z onnxruntime-gpu")
+    parser.add_argument("--draft-piper-model", default=None,
+                        help="Model Piper (.onnx) dla quality=draft; bez niego quality=draft "
+                             "renderuje od razu finalnie (XTTS nie ma tańszego wariantu)")
+    parser.add_argument("--draft-settle", type=float, default=10.0,
+                        help="Ile sekund wersja robocza musi być niezmieniona przed renderem finalnym w tle")
+    parser.add_argument("--output-sample-rate", type=int, default=None,
+                        help="Resampling wyniku do tej częstotliwości (np. 48000) przed zapisem")
+    parser.add_argument("--loudness-dbfs", type=float, default=None,
+                        help="Wyrównanie głośności wyniku do RMS w dBFS (np. -20)")
+    parser.add_argument("--peak-limit", type=float, default=0.99,
+                        help="Maks. szczyt po wyrównaniu głośności (liniowo, 0-1)")
+    parser.add_argument("--chunk-gap-ms", type=int, default=0,
+                        help="Cisza (ms) między fragmentami długich tekstów")
+    parser.add_argument("--chunk-crossfade-ms", type=int, default=0,
+                        help="Przenikanie (ms) fragmentów długich tekstów (zamiast --chunk-gap-ms)")
+    parser.add_argument("--dither", action="store_true", help="Dither TPDF przed zapisem 16-bit")
+    parser.add_argument("--inference-workers", type=int, default=None,
+                        help="Liczba równoległych wątków inferencji (domyślnie liczba urządzeń XTTS lub 1)")
     args = parser.parse_args()
 
+    global worker_pool, postprocessor
+    if args.xtts_devices:
+        XTTS_OPTIONS["devices"] = [d.strip() for d in args.xtts_devices.split(",") if d.strip()]
+    inference_workers = (args.inference_workers or args.worker_processes
+                         or len(XTTS_OPTIONS.get("devices") or [None]))
+
+    postprocessor = PostProcessor(gap_ms=args.chunk_gap_ms, crossfade_ms=args.chunk_crossfade_ms,
+                                  sample_rate=args.output_sample_rate, target_dbfs=args.loudness_dbfs,
+                                  peak_limit=args.peak_limit, dither=args.dither)
+    if args.draft_piper_model:
+        DRAFT_OPTIONS["piper_model"] = args.draft_piper_model
+    else:
+        print("[DRAFT] Brak --draft-piper-model - quality=draft renderuje od razu w jakości finalnej.")
+    PIPER_OPTIONS.update(session_profile=args.piper_profile, io_binding=args.piper_io_binding,
+                         intra_op_threads=args.piper_threads, use_cuda=not args.piper_cpu)
+
+    if args.xtts_prefix_cache:
+        XTTS_OPTIONS["prefix_cache"] = True
+    if args.xtts_cpu_perf:
+        XTTS_OPTIONS.update(
+            cpu_perf=True,
+            num_threads=args.xtts_threads,
+            interop_threads=args.xtts_interop_threads,
+            compile_model=args.xtts_compile,
+        )
+
+    if args.worker_processes > 0:
+        # Każdy proces dostaje jedno urządzenie z --xtts-devices (po kolei)
+        devices = XTTS_OPTIONS.get("devices")
+        factories = []
+        for index in range(args.worker_processes):
+            options = dict(XTTS_OPTIONS, collect_garbage=False)
+            if devices:
+                options["devices"] = [devices[index % len(devices)]]
+            factories.append(functools.partial(build_model, xtts_options=options, piper_options=dict(PIPER_OPTIONS)))
+        print(f"⚙️ Starting {args.worker_processes} inference worker process(es)...")
+        worker_pool = WorkerProcessPool(factories, max_requests=args.recycle_requests,
+                                        max_rss_mb=args.recycle_rss_mb, max_vram_mb=args.recycle_vram_mb)
+        atexit.register(worker_pool.close)
+
     staging_dir_obj = Path(staging_path) if staging_path else None
     
     # Jeśli podano staging, upewnij się że istnieje
@@ -469,6 +1461,11 @@ def run_server(path_converter, staging_path: str | None = None):
         print(f"ℹ️ Staging disabled. Direct write mode.")
 
     print(f"🚀 Starting Multi-Model TTS API on http://{args.host}:{args.port}")
-    app = create_app(path_converter, staging_dir=staging_dir_obj)
+    manifest_path = os.path.expanduser(args.manifest) if args.manifest else None
+    app = create_app(path_converter, staging_dir=staging_dir_obj, writer_queue_size=args.writer_queue,
+                     manifest_path=manifest_path, inference_workers=inference_workers,
+                     profile_all=args.profile, shm_ttl=args.shm_ttl, max_pending=args.max_pending,
+                     max_chunks=args.max_chunks, max_rss_mb=args.max_rss_mb, max_vram_mb=args.max_vram_mb,
+                     draft_settle_seconds=args.draft_settle)
     app.run(host=args.host, port=args.port)
     
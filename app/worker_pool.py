@@ -0,0 +1,268 @@
+import gc
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+import traceback
+from pathlib import Path
+
+from generators.tts_base import TTSBase
+
+
+def _rss_mb() -> float | None:
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024.0
+    except Exception:
+        return None
+
+
+def _memory_stats() -> dict:
+    stats = {"rss_mb": _rss_mb(), "vram_mb": None}
+    # torch tylko jeśli model go już załadował (Piper działa bez niego)
+    torch = sys.modules.get("torch")
+    if torch is not None and torch.cuda.is_available():
+        stats["vram_mb"] = torch.cuda.memory_reserved() / 1024.0 / 1024.0
+    return stats
+
+
+def _child_main(conn, factory, warm) -> None:
+    """
+    Pętla procesu potomnego: ładuje model przez factory(model_name, voice)
+    i wykonuje kolejne żądania tts. Odpowiedź: (status, wynik, statystyki pamięci).
+    """
+    model = None
+    loaded = None
+
+    def ensure(model_name: str, voice: str | None):
+        nonlocal model, loaded
+        if loaded != (model_name, voice):
+            model = None
+            gc.collect()
+            model = factory(model_name, Path(voice) if voice else None)
+            loaded = (model_name, voice)
+        return model
+
+    if warm is not None:
+        try:
+            ensure(*warm)
+        except Exception as e:
+            print(f"[WORKER {os.getpid()}] Warm start failed: {e}")
+    conn.send(("ready", os.getpid(), _memory_stats()))
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        if message[0] == "stop":
+            return
+        _, model_name, voice, text, output_path = message
+        try:
+            result = ensure(model_name, voice).tts(text, output_path)
+            conn.send(("ok", str(result), _memory_stats()))
+        except Exception as e:
+            print(traceback.format_exc())
+            conn.send(("error", str(e), _memory_stats()))
+
+
+class ProcessWorker:
+    """Jeden nadzorowany proces inferencji; po przekroczeniu limitów jest zastępowany nowym."""
+
+    def __init__(self, index: int, factory, context):
+        self.index = index
+        self.factory = factory
+        self.context = context
+        self.process = None
+        self.conn = None
+        self.requests = 0
+        self.recycles = 0
+        self.loaded: tuple[str, str | None] | None = None
+        self.last_stats: dict = {}
+        self.started_at: float | None = None
+
+    def start(self, warm: tuple[str, str | None] | None = None) -> None:
+        parent_conn, child_conn = self.context.Pipe()
+        process = self.context.Process(target=_child_main, args=(child_conn, self.factory, warm),
+                                       name=f"tts-worker-{self.index}", daemon=True)
+        process.start()
+        child_conn.close()
+        _, pid, stats = parent_conn.recv()
+        self.process, self.conn = process, parent_conn
+        self.requests = 0
+        self.loaded = warm
+        self.last_stats = stats
+        self.started_at = time.time()
+        print(f"[WORKER {self.index}] Proces {pid} gotowy ({stats}).")
+
+    def stop(self) -> None:
+        if self.process is None:
+            return
+        try:
+            self.conn.send(("stop",))
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=30)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.conn.close()
+        self.process = self.conn = None
+
+    def recycle(self, reason: str) -> None:
+        """
+        Zastępuje proces nowym, rozgrzanym ostatnio używanym modelem i głosem
+        (latenty głosu wczytuje z rejestru głosów). Stary proces jest zatrzymywany
+        przed startem nowego, żeby dwa modele nie zajmowały naraz pamięci GPU.
+        """
+        print(f"[WORKER {self.index}] Recykling procesu ({reason}).")
+        warm = self.loaded
+        self.stop()
+        self.start(warm=warm)
+        self.recycles += 1
+
+    def call(self, model_name: str, voice: str | None, text: str, output_path: str) -> str:
+        if self.process is None:
+            # Poprzedni recykling się nie udał - próbujemy uruchomić proces jeszcze raz
+            self.start(warm=self.loaded)
+        for attempt in range(2):
+            try:
+                self.conn.send(("tts", model_name, voice, text, output_path))
+                status, payload, stats = self.conn.recv()
+                break
+            except (EOFError, BrokenPipeError, ConnectionResetError, OSError) as e:
+                # Proces padł (np. OOM) - nowy proces i jedna ponowna próba
+                print(f"[WORKER {self.index}] Proces przerwał pracę ({e!r}), uruchamiam ponownie...")
+                self.stop()
+                self.start(warm=self.loaded)
+                if attempt == 1:
+                    raise RuntimeError(f"Inference worker {self.index} crashed twice") from e
+        self.requests += 1
+        self.last_stats = stats
+        if status != "ok":
+            raise RuntimeError(payload)
+        self.loaded = (model_name, voice)
+        return payload
+
+    def to_dict(self) -> dict:
+        return {
+            "index": self.index,
+            "pid": self.process.pid if self.process is not None else None,
+            "requests": self.requests,
+            "recycles": self.recycles,
+            "loaded": list(self.loaded) if self.loaded else None,
+            "started_at": self.started_at,
+            **self.last_stats,
+        }
+
+
+class WorkerProcessPool:
+    """
+    Inferencja w nadzorowanych procesach potomnych (po jednym na fabrykę modeli).
+    Proces jest recyklingowany po max_requests żądaniach albo gdy jego RSS / pamięć
+    CUDA przekroczy próg - zawsze między żądaniami, w wątku w tle. Żądanie, które
+    wyzwoliło recykling, wraca od razu; proces wraca do puli wolnych dopiero
+    gotowy, więc kolejne żądania trafiają do innych procesów albo na niego czekają.
+    """
+
+    def __init__(self, factories: list, max_requests: int = 0, max_rss_mb: float | None = None,
+                 max_vram_mb: float | None = None):
+        # spawn - CUDA nie działa w procesach utworzonych przez fork
+        context = multiprocessing.get_context("spawn")
+        self.max_requests = max_requests
+        self.max_rss_mb = max_rss_mb
+        self.max_vram_mb = max_vram_mb
+        self.workers = [ProcessWorker(index, factory, context) for index, factory in enumerate(factories)]
+        self._idle: queue.Queue = queue.Queue()
+        self._recycling: set[threading.Thread] = set()
+        self._recycling_lock = threading.Lock()
+        self._closed = False  # po close() nie startują już recyklingi (chroni przed osieroconymi procesami)
+        for worker in self.workers:
+            worker.start()
+            self._idle.put(worker)
+
+    def _recycle_reason(self, worker: ProcessWorker) -> str | None:
+        rss, vram = worker.last_stats.get("rss_mb"), worker.last_stats.get("vram_mb")
+        if self.max_requests and worker.requests >= self.max_requests:
+            return f"{worker.requests} requests"
+        if self.max_rss_mb and rss is not None and rss > self.max_rss_mb:
+            return f"RSS {rss:.0f} MB > {self.max_rss_mb:.0f} MB"
+        if self.max_vram_mb and vram is not None and vram > self.max_vram_mb:
+            return f"VRAM {vram:.0f} MB > {self.max_vram_mb:.0f} MB"
+        return None
+
+    def call(self, model_name: str, voice: str | None, text: str, output_path: str) -> str:
+        if self._closed:
+            raise RuntimeError("Worker pool is closed")
+        worker = self._idle.get()
+        try:
+            return worker.call(model_name, voice, text, output_path)
+        finally:
+            reason = self._recycle_reason(worker)
+            with self._recycling_lock:
+                closed = self._closed
+                if not closed and reason is not None:
+                    thread = threading.Thread(target=self._recycle, args=(worker, reason),
+                                              name=f"tts-worker-{worker.index}-recycle", daemon=True)
+                    self._recycling.add(thread)
+                    thread.start()
+            if closed:
+                # Żądanie skończyło się po close() - proces nie wraca do puli ani do recyklingu
+                worker.stop()
+            elif reason is None:
+                self._idle.put(worker)
+
+    def _recycle(self, worker: ProcessWorker, reason: str) -> None:
+        try:
+            worker.recycle(reason)
+        except Exception as e:
+            # Bez procesu - następne wywołanie call() spróbuje go uruchomić
+            print(f"[WORKER {worker.index}] Recykling nie powiódł się: {e}")
+            worker.stop()
+        finally:
+            with self._recycling_lock:
+                self._recycling.discard(threading.current_thread())
+            self._idle.put(worker)
+
+    def stats(self) -> list[dict]:
+        return [worker.to_dict() for worker in self.workers]
+
+    def close(self) -> None:
+        # Trwający recykling uruchamia nowy proces - czekamy, żeby go nie zostawić;
+        # po ustawieniu _closed żaden nowy recykling już nie wystartuje
+        with self._recycling_lock:
+            self._closed = True
+            recycling = list(self._recycling)
+        for thread in recycling:
+            thread.join()
+        # Procesy zajęte żądaniem zatrzymuje call() po jego zakończeniu - tu tylko wolne
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            worker.stop()
+
+
+class ProcessBackedTTS(TTSBase):
+    """Pośrednik modelu: każde wywołanie tts trafia do procesu z puli WorkerProcessPool."""
+
+    def __init__(self, pool: WorkerProcessPool, model_name: str, voice: str | Path | None = None):
+        self.pool = pool
+        self.model_name = model_name
+        self.voice = str(voice) if voice else None
+
+    def tts(self, text: str, output_path: str) -> str:
+        return self.pool.call(self.model_name, self.voice, text, str(output_path))
+
+    @property
+    def name(self) -> str:
+        return f"{self.model_name} (process)"
+
+    @property
+    def is_online(self) -> bool:
+        return False
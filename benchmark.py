@@ -1,6 +1,8 @@
+import argparse
 import time
 import os
 import shutil
+import statistics
 from pathlib import Path
 
 # Dodajemy katalog bieżący do ścieżki, żeby importy działały
@@ -77,5 +79,240 @@ def run_benchmark():
     print("=" * 50)
 
 
+def _run_pass(tts_engine, label: str, repeats: int) -> dict:
+    """Generuje TEST_SENTENCES `repeats` razy i zwraca czasy oraz ścieżki ostatnich plików."""
+    timings = {name: [] for name, _ in TEST_SENTENCES}
+    outputs = {}
+    tts_engine.tts("Rozgrzewka silnika.", str(OUTPUT_DIR / f"warmup_{label}.wav"))
+    for _ in range(repeats):
+        for name, text in TEST_SENTENCES:
+            output_file = OUTPUT_DIR / f"{label}_{name}.wav"
+            start_gen = time.time()
+            tts_engine.tts(text, str(output_file))
+            timings[name].append(time.time() - start_gen)
+            outputs[name] = output_file
+    return {"timings": timings, "outputs": outputs}
+
+
+def run_cpu_perf_benchmark(repeats: int, num_threads: int | None, compile_model: bool):
+    """
+    Porównuje FP32 na CPU z trybem wydajności (int8 GPT + wątki) na tych samych zdaniach.
+    Jakość mierzona jest wynikiem dopasowania transkrypcji Whisper (analyze_audio).
+    """
+    from app.audio_verify import analyze_audio
+
+    print("=" * 50)
+    print("BENCHMARK XTTS v2 CPU: FP32 vs tryb wydajności")
+    print("=" * 50)
+
+    tts_engine = XTTSPolishTTS(voice_path=None, device="cpu")
+    results = {"fp32": _run_pass(tts_engine, "fp32", repeats)}
+
+    XTTSPolishTTS.enable_cpu_perf_mode(num_threads=num_threads, compile_model=compile_model)
+    results["perf"] = _run_pass(tts_engine, "perf", repeats)
+
+    print(f"{'Zdanie':<10}{'Tryb':<6}{'Mediana [s]':>13}{'Znaki/s':>10}{'Wynik ASR':>11}")
+    for name, text in TEST_SENTENCES:
+        for label, result in results.items():
+            median = statistics.median(result["timings"][name])
+            score = analyze_audio(str(result["outputs"][name]), text).get("score")
+            print(f"{name:<10}{label:<6}{median:>13.3f}{len(text) / median:>10.1f}{score!s:>11}")
+
+    fp32_total = sum(sum(t) for t in results["fp32"]["timings"].values())
+    perf_total = sum(sum(t) for t in results["perf"]["timings"].values())
+    print("=" * 50)
+    print(f"Przyspieszenie: {fp32_total / perf_total:.2f}x")
+    print("=" * 50)
+
+
+def run_alloc_benchmark(repeats: int):
+    """
+    Latencja na linię i alokacje pamięci (tracemalloc: liczba bloków i szczyt)
+    dla ścieżki PCM (synthesize) oraz pełnej ścieżki z zapisem (tts).
+    """
+    import tracemalloc
+
+    print("=" * 50)
+    print("BENCHMARK XTTS v2: alokacje i latencja na linię")
+    print("=" * 50)
+
+    tts_engine = XTTSPolishTTS(voice_path=None)
+    tts_engine.tts("Rozgrzewka silnika.", str(OUTPUT_DIR / "warmup.wav"))
+
+    print(f"{'Zdanie':<10}{'Ścieżka':<12}{'Mediana [s]':>13}{'Bloki':>8}{'Szczyt [KB]':>13}")
+    for name, text in TEST_SENTENCES:
+        for label in ("synthesize", "tts"):
+            timings, blocks, peaks = [], [], []
+            for _ in range(repeats):
+                tracemalloc.start()
+                before = tracemalloc.take_snapshot()
+                start_gen = time.time()
+                if label == "synthesize":
+                    pcm = tts_engine.synthesize(text)
+                    del pcm
+                else:
+                    tts_engine.tts(text, str(OUTPUT_DIR / f"alloc_{name}.wav"))
+                timings.append(time.time() - start_gen)
+                diff = tracemalloc.take_snapshot().compare_to(before, "lineno")
+                blocks.append(sum(stat.count_diff for stat in diff if stat.count_diff > 0))
+                peaks.append(tracemalloc.get_traced_memory()[1] / 1024.0)
+                tracemalloc.stop()
+            print(f"{name:<10}{label:<12}{statistics.median(timings):>13.3f}"
+                  f"{int(statistics.median(blocks)):>8}{statistics.median(peaks):>13.1f}")
+    print("=" * 50)
+
+
+def run_prefix_cache_benchmark(repeats: int):
+    """
+    Latencja krótkich linii bez i z cache'em stanu KV prefiksu mówcy w GPT.
+    Ziarno losowania jest ustawiane przed każdą linią, więc obie ścieżki
+    powinny dawać nagrania tej samej długości.
+    """
+    import torch
+
+    short_lines = [
+        "Tak.",
+        "Nie wiem.",
+        "Chodź tutaj, szybko!",
+        "To nie jest dobry pomysł.",
+        "Widziałeś go wczoraj wieczorem?",
+    ]
+    print("=" * 50)
+    print("BENCHMARK XTTS v2: cache prefiksu mówcy (KV)")
+    print("=" * 50)
+
+    tts_engine = XTTSPolishTTS(voice_path=None)
+    tts_engine.synthesize("Rozgrzewka silnika.")
+
+    results = {}
+    for label in ("bez cache", "z cache"):
+        if label == "z cache":
+            XTTSPolishTTS.enable_prefix_cache()
+            tts_engine.synthesize("Rozgrzewka silnika.")
+        timings, lengths = [], []
+        for _ in range(repeats):
+            for text in short_lines:
+                torch.manual_seed(0)
+                start_gen = time.time()
+                pcm = tts_engine.synthesize(text)
+                timings.append(time.time() - start_gen)
+                lengths.append(len(pcm))
+        results[label] = (timings, lengths)
+        print(f"{label:<10} mediana: {statistics.median(timings):.3f} s | średnia: {statistics.mean(timings):.3f} s")
+
+    base, cached = results["bez cache"], results["z cache"]
+    print(f"Przyspieszenie (mediana): {statistics.median(base[0]) / statistics.median(cached[0]):.2f}x")
+    print(f"Identyczne długości nagrań: {base[1] == cached[1]}")
+    print("=" * 50)
+
+
+def run_long_benchmark(repeats: int):
+    """
+    Narracja ~2000 znaków przez ścieżkę serwera (generate_audio): potok
+    inferencja / przycinanie w porównaniu z przetwarzaniem fragment po fragmencie.
+    Obie strony wykonują te same kroki: scheduler, check_audio_quality, przycięcie,
+    sklejenie i jeden zapis wyniku - różni je tylko nakładanie się inferencji z obróbką.
+    """
+    from app import tts_server
+    from app.audio_verify import check_audio_quality
+    from app.scheduler import SINGLE, InferenceScheduler
+    from app.text_utils import split_text
+    from generators.audio_io import encode_pcm, read_pcm
+
+    text = " ".join(text for _, text in TEST_SENTENCES * 6)
+    print("=" * 50)
+    print(f"BENCHMARK XTTS v2: długa narracja ({len(text)} znaków)")
+    print("=" * 50)
+
+    # Jak w serwerze: każda inferencja przechodzi przez scheduler
+    tts_server.scheduler = InferenceScheduler(workers=1)
+    tts_engine = XTTSPolishTTS(voice_path=None)
+    tts_engine.tts("Rozgrzewka silnika.", str(OUTPUT_DIR / "warmup.wav"))
+
+    def run_sequential() -> None:
+        clips, sample_rate = [], None
+        for i, chunk in enumerate(split_text(text, tts_server.max_chars_for("xtts"))):
+            chunk_path = OUTPUT_DIR / f"seq_{i:03d}.wav"
+            tts_server.run_inference(SINGLE, tts_engine.tts, chunk, str(chunk_path))
+            if not check_audio_quality(str(chunk_path), chunk, tts_server.file_duration(chunk_path)):
+                tts_server.run_inference(SINGLE, tts_engine.tts, chunk, str(chunk_path))
+            samples, sample_rate = read_pcm(chunk_path)
+            clips.append(tts_server.postprocessor.trim(samples, sample_rate))
+            chunk_path.unlink()
+        merged, sample_rate = tts_server.postprocessor.process(clips, sample_rate, trimmed=True)
+        encode_pcm(merged, sample_rate, OUTPUT_DIR / "long_seq.wav")
+
+    sequential, pipelined = [], []
+    for _ in range(repeats):
+        start_gen = time.time()
+        run_sequential()
+        sequential.append(time.time() - start_gen)
+
+        start_gen = time.time()
+        tts_server.generate_audio(tts_engine, "xtts", text, OUTPUT_DIR / "long.wav")
+        pipelined.append(time.time() - start_gen)
+
+    print(f"Sekwencyjnie: {statistics.median(sequential):.3f} s")
+    print(f"Potok:        {statistics.median(pipelined):.3f} s")
+    print(f"Przyspieszenie: {statistics.median(sequential) / statistics.median(pipelined):.2f}x")
+    print("=" * 50)
+
+
+def run_draft_benchmark(repeats: int, piper_model: str):
+    """
+    Koszt wersji roboczej (quality=draft w serwerze): Piper z --draft-piper-model
+    w porównaniu z finalnym renderem XTTS na tych samych zdaniach.
+    """
+    from generators.piper_tts import PiperTTS
+
+    print("=" * 50)
+    print("BENCHMARK: wersja robocza (Piper) vs render finalny (XTTS v2)")
+    print("=" * 50)
+
+    results = {
+        "xtts": _run_pass(XTTSPolishTTS(voice_path=None), "final", repeats),
+        "piper": _run_pass(PiperTTS(model_path=piper_model), "draft", repeats),
+    }
+
+    print(f"{'Zdanie':<10}{'Silnik':<7}{'Mediana [s]':>13}{'Znaki/s':>10}")
+    for name, text in TEST_SENTENCES:
+        for label, result in results.items():
+            median = statistics.median(result["timings"][name])
+            print(f"{name:<10}{label:<7}{median:>13.3f}{len(text) / median:>10.1f}")
+
+    final_total = sum(sum(t) for t in results["xtts"]["timings"].values())
+    draft_total = sum(sum(t) for t in results["piper"]["timings"].values())
+    print("=" * 50)
+    print(f"Przyspieszenie wersji roboczej: {final_total / draft_total:.2f}x")
+    print("=" * 50)
+
+
 if __name__ == "__main__":
-    run_benchmark()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Benchmark XTTS v2")
+    parser.add_argument("--cpu-perf", action="store_true",
+                        help="Porównanie FP32 na CPU z trybem wydajności CPU")
+    parser.add_argument("--alloc", action="store_true",
+                        help="Alokacje pamięci i latencja na linię dla ścieżki wyjściowej")
+    parser.add_argument("--prefix-cache", action="store_true",
+                        help="Krótkie linie: bez i z cache'em stanu KV prefiksu mówcy")
+    parser.add_argument("--long", action="store_true",
+                        help="Długa narracja: potok fragmentów vs przetwarzanie sekwencyjne")
+    parser.add_argument("--draft", metavar="PIPER_MODEL", default=None,
+                        help="Wersja robocza: Piper z podanym modelem (.onnx) vs render finalny XTTS")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--compile", action="store_true")
+    args = parser.parse_args()
+
+    if args.cpu_perf:
+        run_cpu_perf_benchmark(args.repeats, args.threads, args.compile)
+    elif args.alloc:
+        run_alloc_benchmark(args.repeats)
+    elif args.long:
+        run_long_benchmark(args.repeats)
+    elif args.prefix_cache:
+        run_prefix_cache_benchmark(args.repeats)
+    elif args.draft:
+        run_draft_benchmark(args.repeats, args.draft)
+    else:
+        run_benchmark()
\ No newline at end of file
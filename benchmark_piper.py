@@ -0,0 +1,86 @@
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Dodajemy katalog bieżący do ścieżki, żeby importy działały
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from generators.piper_tts import SESSION_PROFILES, PiperTTS
+
+# Konfiguracja testu
+REPEATS = 10
+CONCURRENCY = 4
+
+TEST_SENTENCES = [
+    "To jest krótki test.",
+    "To jest nieco dłuższe zdanie, które ma na celu sprawdzenie jak model radzi sobie ze średnią ilością tekstu.",
+    "Wczoraj, spacerując po lesie, zauważyłem dziwne ślady, które prowadziły w głąb gęstwiny, ale postanowiłem "
+    "zawrócić, bo robiło się już ciemno i zaczął padać ulewny deszcz, który przemoczył mnie do suchej nitki.",
+]
+
+
+def measure(engine: PiperTTS, repeats: int, concurrency: int) -> dict:
+    """Opóźnienie pojedynczych żądań (po kolei) i przepustowość przy concurrency równoległych wątkach."""
+    engine.synthesize("Rozgrzewka silnika.")
+
+    latencies = []
+    audio_seconds = 0.0
+    for _ in range(repeats):
+        for text in TEST_SENTENCES:
+            start = time.perf_counter()
+            samples = engine.synthesize(text)
+            latencies.append(time.perf_counter() - start)
+            audio_seconds += len(samples) / engine.sample_rate
+
+    texts = TEST_SENTENCES * repeats
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(engine.synthesize, texts))
+    parallel_time = time.perf_counter() - start
+
+    return {
+        "median_ms": statistics.median(latencies) * 1000,
+        "p95_ms": sorted(latencies)[int(len(latencies) * 0.95) - 1] * 1000,
+        "rtf": sum(latencies) / audio_seconds,
+        "lines_per_s": len(texts) / parallel_time,
+    }
+
+
+def run_benchmark():
+    parser = argparse.ArgumentParser(description="Benchmark profili sesji ONNX Runtime dla Piper")
+    parser.add_argument("model", help="Ścieżka do modelu Piper (.onnx)")
+    parser.add_argument("--cpu", action="store_true", help="Wymuś CPU nawet z onnxruntime-gpu")
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY,
+                        help="Liczba równoległych wątków w pomiarze przepustowości")
+    args = parser.parse_args()
+
+    print("=" * 50)
+    print("BENCHMARK Piper (ONNX Runtime)")
+    print("=" * 50)
+
+    results = []
+    for profile in SESSION_PROFILES:
+        for io_binding in (False, True):
+            start_init = time.time()
+            engine = PiperTTS(args.model, use_cuda=not args.cpu, session_profile=profile, io_binding=io_binding)
+            init_time = time.time() - start_init
+            stats = measure(engine, args.repeats, args.concurrency)
+            results.append((profile, io_binding, engine.provider, init_time, stats))
+            del engine
+
+    print("-" * 50)
+    print(f"{'Profil':<12}{'IO bind':<9}{'Dostawca':<26}{'Init s':>8}{'Med. ms':>9}{'p95 ms':>9}"
+          f"{'RTF':>7}{'Linie/s':>9}")
+    for profile, io_binding, provider, init_time, stats in results:
+        print(f"{profile:<12}{'tak' if io_binding else 'nie':<9}{provider:<26}{init_time:>8.2f}"
+              f"{stats['median_ms']:>9.1f}{stats['p95_ms']:>9.1f}{stats['rtf']:>7.3f}{stats['lines_per_s']:>9.2f}")
+    print(f"(Linie/s: {args.concurrency} równoległe wątki na jednej sesji)")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,145 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Dodajemy katalog bieżący do ścieżki, żeby importy działały
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.postprocess import PostProcessor
+from generators.audio_io import encode_pcm, read_pcm
+
+# Konfiguracja testu
+LINES = 50
+CHUNKS_PER_LINE = 4
+SOURCE_RATE = 22050  # wyjście XTTS
+TARGET_RATE = 48000
+TARGET_DBFS = -20.0
+SEED = 1234
+
+
+def synth_chunk(rng: np.random.Generator) -> np.ndarray:
+    """Fragment "mowy": cisza, 2-4 s modulowanego szumu i tonu, dłuższa cisza na końcu (jak z XTTS)."""
+    speech_len = int(SOURCE_RATE * rng.uniform(2.0, 4.0))
+    t = np.arange(speech_len, dtype=np.float32) / SOURCE_RATE
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 3.0 * t)
+    speech = (0.2 * np.sin(2 * np.pi * 180.0 * t) + 0.05 * rng.standard_normal(speech_len)) * envelope
+    lead = np.zeros(int(SOURCE_RATE * 0.2), dtype=np.float32)
+    tail = np.zeros(int(SOURCE_RATE * 1.6), dtype=np.float32)
+    return np.concatenate([lead, speech.astype(np.float32), tail])
+
+
+def prepare_chunks(work_dir: Path) -> list[list[Path]]:
+    rng = np.random.default_rng(SEED)
+    lines = []
+    for line in range(LINES):
+        paths = []
+        for chunk in range(CHUNKS_PER_LINE):
+            path = work_dir / f"line{line:03d}_part{chunk}.wav"
+            encode_pcm(synth_chunk(rng), SOURCE_RATE, path)
+            paths.append(path)
+        lines.append(paths)
+    return lines
+
+
+def run_legacy(lines: list[list[Path]], out_dir: Path) -> float:
+    """Dotychczasowa ścieżka: pydub (trim_silence + sklejanie), a potem osobny przebieg resamplingu."""
+    from pydub import AudioSegment
+    from pydub.silence import detect_nonsilent
+
+    audio_seconds = 0.0
+    for i, paths in enumerate(lines):
+        merged = AudioSegment.empty()
+        for path in paths:
+            segment = AudioSegment.from_file(path, format="wav")
+            parts = detect_nonsilent(segment, min_silence_len=1350, silence_thresh=-40)
+            if parts:
+                segment = segment[parts[0][0]:parts[-1][1]]
+            merged += segment
+        merged.export(out_dir / f"legacy_{i:03d}.wav", format="wav")
+        # Osobny przebieg po gotowym pliku (odpowiednik ffmpeg -ar 48000)
+        resampled = AudioSegment.from_file(out_dir / f"legacy_{i:03d}.wav", format="wav").set_frame_rate(TARGET_RATE)
+        resampled.export(out_dir / f"legacy_{i:03d}.wav", format="wav")
+        audio_seconds += len(resampled) / 1000.0
+    return audio_seconds
+
+
+def run_chain(lines: list[list[Path]], out_dir: Path, processor: PostProcessor) -> float:
+    """Nowa ścieżka: dekodowanie fragmentów, łańcuch NumPy i jeden zapis."""
+    audio_seconds = 0.0
+    for i, paths in enumerate(lines):
+        clips = []
+        for path in paths:
+            samples, sample_rate = read_pcm(path)
+            clips.append(processor.trim(samples, sample_rate))
+        samples, sample_rate = processor.process(clips, SOURCE_RATE, trimmed=True)
+        encode_pcm(samples, sample_rate, out_dir / f"chain_{i:03d}.wav")
+        audio_seconds += len(samples) / sample_rate
+    return audio_seconds
+
+
+def run_in_memory(clips: list[list[np.ndarray]], processor: PostProcessor) -> float:
+    """Sam łańcuch na tablicach (bez dekodowania i zapisu)."""
+    audio_seconds = 0.0
+    for line_clips in clips:
+        samples, sample_rate = processor.process(line_clips, SOURCE_RATE)
+        audio_seconds += len(samples) / sample_rate
+    return audio_seconds
+
+
+def report(label: str, elapsed: float, audio_seconds: float) -> None:
+    print(f"{label:<28}{elapsed:>8.3f} s{LINES / elapsed:>10.1f} linii/s{audio_seconds / elapsed:>10.0f}x RT")
+
+
+def run_benchmark():
+    parser = argparse.ArgumentParser(description="Benchmark obróbki audio (przycięcie, sklejenie, resampling...)")
+    parser.add_argument("--crossfade-ms", type=int, default=30)
+    parser.add_argument("--skip-legacy", action="store_true", help="Bez pomiaru ścieżki pydub")
+    args = parser.parse_args()
+
+    print("=" * 50)
+    print("BENCHMARK postprocess")
+    print("=" * 50)
+    print(f"Linie: {LINES} x {CHUNKS_PER_LINE} fragmenty | {SOURCE_RATE} Hz -> {TARGET_RATE} Hz")
+
+    work_dir = Path(tempfile.mkdtemp(prefix="tts_postprocess_"))
+    try:
+        lines = prepare_chunks(work_dir)
+        out_dir = work_dir / "out"
+        out_dir.mkdir()
+        trim_only = PostProcessor()
+        full_chain = PostProcessor(crossfade_ms=args.crossfade_ms, sample_rate=TARGET_RATE,
+                                   target_dbfs=TARGET_DBFS, dither=True)
+
+        if not args.skip_legacy:
+            try:
+                start = time.perf_counter()
+                audio_seconds = run_legacy(lines, out_dir)
+                report("pydub + resampling", time.perf_counter() - start, audio_seconds)
+            except ImportError as e:
+                print(f"Ścieżka pydub pominięta: {e}")
+
+        start = time.perf_counter()
+        audio_seconds = run_chain(lines, out_dir, trim_only)
+        report("NumPy: przycięcie", time.perf_counter() - start, audio_seconds)
+
+        start = time.perf_counter()
+        audio_seconds = run_chain(lines, out_dir, full_chain)
+        report("NumPy: pełny łańcuch", time.perf_counter() - start, audio_seconds)
+
+        clips = [[read_pcm(path)[0] for path in paths] for paths in lines]
+        start = time.perf_counter()
+        audio_seconds = run_in_memory(clips, full_chain)
+        report("NumPy: łańcuch w pamięci", time.perf_counter() - start, audio_seconds)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    run_benchmark()
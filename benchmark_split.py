@@ -0,0 +1,71 @@
+import os
+import random
+import statistics
+import sys
+import time
+
+# Dodajemy katalog bieżący do ścieżki, żeby importy działały
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.text_utils import split_text
+
+# Konfiguracja testu
+MAX_LEN = 200
+SCRIPT_LINES = 20000
+REPEATS = 3
+SEED = 1234
+
+SENTENCES = [
+    "To jest krótki test.",
+    "Tak.",
+    "Nie.",
+    "To jest nieco dłuższe zdanie, które ma na celu sprawdzenie jak model radzi sobie ze średnią ilością tekstu.",
+    "Wczoraj, spacerując po lesie, zauważyłem dziwne ślady, które prowadziły w głąb gęstwiny, ale postanowiłem zawrócić, "
+    "bo robiło się już ciemno i zaczął padać ulewny deszcz, który przemoczył mnie do suchej nitki.",
+    "Dr Nowak, tzn. mój sąsiad, przyszedł ok. godz. 17, m.in. po to, żeby oddać mi 2,5 tys. zł.",
+    "Był to 5. dzień wyprawy - nikt nie wiedział, co nas czeka... Ruszyliśmy dalej!",
+]
+
+
+def build_script(rng: random.Random) -> list[str]:
+    """Generuje linie skryptu o długości od jednego zdania do całego akapitu narracji."""
+    lines = []
+    for _ in range(SCRIPT_LINES):
+        count = rng.choice((1, 1, 1, 2, 3, 6, 12))
+        lines.append(" ".join(rng.choice(SENTENCES) for _ in range(count)))
+    return lines
+
+
+def run_benchmark():
+    print("=" * 50)
+    print("BENCHMARK split_text")
+    print("=" * 50)
+
+    lines = build_script(random.Random(SEED))
+    total_chars = sum(len(line) for line in lines)
+    print(f"Linie: {len(lines)} | Znaki: {total_chars} | max_len: {MAX_LEN}")
+
+    timings = []
+    chunks = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        chunks = [chunk for line in lines for chunk in split_text(line, MAX_LEN)]
+        timings.append(time.perf_counter() - start)
+
+    best = min(timings)
+    split_lines = [line for line in lines if len(line) > MAX_LEN]
+    split_chunks = [chunk for line in split_lines for chunk in split_text(line, MAX_LEN)]
+    lengths = [len(chunk) for chunk in split_chunks]
+
+    print(f"Najlepszy czas: {best:.4f} s ({total_chars / best / 1e6:.2f} M znaków/s)")
+    print(f"Wywołania syntezy: {len(chunks)}")
+    if lengths:
+        print(f"Linie dzielone: {len(split_lines)} -> {len(split_chunks)} fragmentów")
+        print(f"Długość fragmentu: średnia {statistics.mean(lengths):.1f}, "
+              f"odch. std. {statistics.pstdev(lengths):.1f}, min {min(lengths)}, max {max(lengths)}")
+        print(f"Krótkie ogony (< {MAX_LEN // 4} znaków): {sum(1 for n in lengths if n < MAX_LEN // 4)}")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,5 @@
+from app.coordinator import run_coordinator
+
+if __name__ == "__main__":
+    # Koordynator: węzły podajemy przez --worker http://host:port (serwery tts_api.py / wsl_api.py)
+    run_coordinator()
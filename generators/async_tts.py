@@ -0,0 +1,206 @@
+import asyncio
+import shutil
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import Future
+from pathlib import Path
+
+from .tts_base import TTSBase
+
+
+class AsyncTTSBase(ABC):
+    """
+    Async counterpart of TTSBase for engines that talk to a remote API.
+    Implementations must not block the event loop while waiting on the network.
+    """
+
+    @abstractmethod
+    async def atts(self, text: str, output_path: str) -> str:
+        """
+        Generates speech from text and saves it to a file.
+
+        Args:
+            text: The text to be synthesized.
+            output_path: The full path where the audio file should be saved.
+
+        Returns:
+            str: The path to the generated audio file (output_path).
+        """
+        pass
+
+    @property
+    @abstractmethod
+    def name(self) -> str:
+        pass
+
+    @property
+    @abstractmethod
+    def is_online(self) -> bool:
+        pass
+
+
+class TokenBucket:
+    """
+    Token bucket for asyncio code: refills `rate` tokens per second
+    up to `capacity` and makes `acquire()` wait until a token is available.
+    """
+
+    def __init__(self, rate: float, capacity: int | None = None):
+        if rate <= 0:
+            raise ValueError("rate must be > 0")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1, int(rate))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                await asyncio.sleep((1.0 - self._tokens) / self.rate)
+
+
+# --- Wspólna pętla zdarzeń dla wszystkich adapterów (jeden wątek na proces) ---
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_lock = threading.Lock()
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=_loop.run_forever, name="tts-async-loop", daemon=True)
+            thread.start()
+        return _loop
+
+
+class RateLimitedTTS(TTSBase, AsyncTTSBase):
+    """
+    Adapter for online engines: token-bucket rate limiting, a concurrency cap
+    and coalescing of identical texts that are in flight at the same time.
+
+    Limits are shared per engine name, so recreating the adapter (e.g. after
+    a voice change in initialize_model) does not reset the provider quota.
+    An adapter with different limits for an already limited engine name is
+    rejected with ValueError instead of silently using the first settings.
+    Sync engines are run in the default thread pool; AsyncTTSBase engines
+    are awaited directly on the shared loop.
+    """
+
+    _buckets: dict[str, TokenBucket] = {}
+    _semaphores: dict[str, asyncio.Semaphore] = {}
+    # (requests_per_second, burst, max_concurrency) per engine name
+    _limit_settings: dict[str, tuple[float, int | None, int]] = {}
+    _settings_lock = threading.Lock()
+
+    def __init__(self, engine: TTSBase | AsyncTTSBase, requests_per_second: float = 2.0,
+                 burst: int | None = None, max_concurrency: int = 4):
+        """
+        Args:
+            engine: The wrapped online engine.
+            requests_per_second: Sustained request rate allowed by the provider.
+            burst: Maximum number of requests sent back-to-back (defaults to the rate).
+            max_concurrency: Maximum number of requests in flight at once.
+
+        Raises:
+            ValueError: If the engine name is already limited with other settings.
+        """
+        limits = (requests_per_second, burst, max_concurrency)
+        with RateLimitedTTS._settings_lock:
+            registered = RateLimitedTTS._limit_settings.setdefault(engine.name, limits)
+        if registered != limits:
+            raise ValueError(f"Rate limits for '{engine.name}' are already set to "
+                             f"(requests_per_second, burst, max_concurrency)={registered}, got {limits}")
+        self.engine = engine
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self._loop = _get_loop()
+        # Klucz -> lista (ścieżka, future) żądań czekających na wynik trwającego zapytania
+        self._inflight: dict[tuple[str, str], list[tuple[str, asyncio.Future]]] = {}
+
+    @property
+    def name(self) -> str:
+        return self.engine.name
+
+    @property
+    def is_online(self) -> bool:
+        return self.engine.is_online
+
+    @property
+    def settings(self) -> dict:
+        settings = dict(getattr(self.engine, "settings", {}) or {})
+        settings.update({
+            "requests_per_second": self.requests_per_second,
+            "burst": self.burst,
+            "max_concurrency": self.max_concurrency,
+        })
+        return settings
+
+    def _limits(self) -> tuple[TokenBucket, asyncio.Semaphore]:
+        # Wywoływane tylko z wątku pętli, więc prymitywy asyncio są tworzone we właściwej pętli
+        key = self.engine.name
+        if key not in RateLimitedTTS._buckets:
+            RateLimitedTTS._buckets[key] = TokenBucket(self.requests_per_second, self.burst)
+            RateLimitedTTS._semaphores[key] = asyncio.Semaphore(self.max_concurrency)
+        return RateLimitedTTS._buckets[key], RateLimitedTTS._semaphores[key]
+
+    async def _run(self, text: str, output_path: str) -> str:
+        bucket, semaphore = self._limits()
+        async with semaphore:
+            await bucket.acquire()
+            if isinstance(self.engine, AsyncTTSBase):
+                return await self.engine.atts(text, output_path)
+            return await asyncio.to_thread(self.engine.tts, text, output_path)
+
+    async def _lead(self, key: tuple[str, str], text: str, output_path: str) -> str:
+        followers = self._inflight[key]
+        try:
+            source = await self._run(text, output_path)
+        except BaseException as e:
+            del self._inflight[key]
+            for _, future in followers:
+                if not future.done():
+                    future.set_exception(e)
+            raise
+        # Od tej chwili nikt nie dołączy; kopie powstają, zanim lider odda plik wołającemu
+        # (ten może go zaraz przenieść lub usunąć)
+        del self._inflight[key]
+        for target, future in followers:
+            try:
+                if Path(source).resolve() != Path(target).resolve():
+                    await asyncio.to_thread(shutil.copyfile, source, target)
+                future.set_result(target)
+            except Exception as e:
+                future.set_exception(e)
+        return source
+
+    async def atts(self, text: str, output_path: str) -> str:
+        # Ten sam tekst w tym samym formacie -> jedno zapytanie do API, wynik kopiowany
+        key = (text, Path(output_path).suffix.lower())
+        followers = self._inflight.get(key)
+        if followers is not None:
+            future = asyncio.get_running_loop().create_future()
+            followers.append((output_path, future))
+            return await asyncio.shield(future)
+
+        self._inflight[key] = []
+        return await asyncio.shield(asyncio.ensure_future(self._lead(key, text, output_path)))
+
+    def submit(self, text: str, output_path: str) -> Future:
+        """Schedules synthesis on the shared loop and returns a concurrent Future."""
+        return asyncio.run_coroutine_threadsafe(self.atts(text, output_path), self._loop)
+
+    def tts(self, text: str, output_path: str) -> str:
+        return self.submit(text, output_path).result()
@@ -0,0 +1,179 @@
+import io
+import os
+from pathlib import Path
+
+import numpy as np
+
+# Próba importu soundfile (libsndfile >= 1.1 obsługuje też MP3).
+# Użytkownik musi zainstalować: pip install soundfile
+try:
+    import soundfile as sf
+except ImportError:
+    sf = None
+
+# Próba importu scipy (dokładniejszy resampling polifazowy); bez niego interpolacja liniowa
+try:
+    from scipy.signal import resample_poly
+except ImportError:
+    resample_poly = None
+
+# Rozszerzenie pliku -> (format, podtyp) libsndfile
+SOUNDFILE_FORMATS = {
+    ".wav": ("WAV", "PCM_16"),
+    ".flac": ("FLAC", "PCM_16"),
+    ".ogg": ("OGG", "VORBIS"),
+    ".mp3": ("MP3", "MPEG_LAYER_III"),
+}
+
+
+def _require_soundfile():
+    if sf is None:
+        raise ImportError(
+            "Biblioteka 'soundfile' nie jest zainstalowana. Zainstaluj ją komendą: pip install soundfile")
+
+
+def format_for_path(path: str | Path) -> tuple[str, str]:
+    """Zwraca (format, podtyp) libsndfile dla rozszerzenia pliku; nieznane rozszerzenia -> WAV."""
+    return SOUNDFILE_FORMATS.get(Path(path).suffix.lower(), SOUNDFILE_FORMATS[".wav"])
+
+
+def detect_format(data: bytes) -> str | None:
+    """Rozpoznaje format skompresowanych/surowych danych audio po nagłówku. Zwraca rozszerzenie."""
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        return ".wav"
+    if data[:4] == b"OggS":
+        return ".ogg"
+    if data[:4] == b"fLaC":
+        return ".flac"
+    if data[:3] == b"ID3" or (len(data) > 1 and data[0] == 0xFF and (data[1] & 0xE0) == 0xE0):
+        return ".mp3"
+    return None
+
+
+def encode_pcm(samples, sample_rate: int, output_path: str | Path) -> str:
+    """
+    Koduje próbki float (mono [N] lub [N, kanały]) bezpośrednio do formatu
+    wynikającego z rozszerzenia output_path - w procesie, bez uruchamiania ffmpeg.
+    """
+    _require_soundfile()
+    file_format, subtype = format_for_path(output_path)
+    sf.write(str(output_path), np.asarray(samples), sample_rate, format=file_format, subtype=subtype)
+    return str(output_path)
+
+
+def open_pcm_writer(output_path: str | Path, sample_rate: int, channels: int = 1):
+    """
+    Otwiera plik audio (format z rozszerzenia) do zapisu próbek float blokami
+    (f.write(blok)) - całe nagranie nie musi leżeć w pamięci. Zamknąć przez close() / with.
+    """
+    _require_soundfile()
+    file_format, subtype = format_for_path(output_path)
+    return sf.SoundFile(str(output_path), "w", samplerate=sample_rate, channels=channels,
+                        format=file_format, subtype=subtype)
+
+
+def read_pcm(path: str | Path) -> tuple[np.ndarray, int]:
+    """Dekoduje plik audio do tablicy float32 (bez ffmpeg). Zwraca (próbki, sample_rate)."""
+    _require_soundfile()
+    samples, sample_rate = sf.read(str(path), dtype="float32", always_2d=False)
+    return samples, sample_rate
+
+
+def resample(samples: np.ndarray, sample_rate: int, target_rate: int) -> np.ndarray:
+    """Zmienia częstotliwość próbkowania próbek float ([N] lub [N, kanały]) na target_rate."""
+    if sample_rate == target_rate or len(samples) == 0:
+        return samples
+    if resample_poly is not None:
+        divisor = np.gcd(sample_rate, target_rate)
+        return resample_poly(samples, target_rate // divisor, sample_rate // divisor, axis=0).astype(np.float32)
+    target_len = int(round(len(samples) * target_rate / sample_rate))
+    positions = np.linspace(0, len(samples) - 1, num=target_len, dtype=np.float64)
+    source_positions = np.arange(len(samples))
+    if samples.ndim == 1:
+        return np.interp(positions, source_positions, samples).astype(np.float32)
+    return np.stack([np.interp(positions, source_positions, samples[:, channel])
+                     for channel in range(samples.shape[1])], axis=1).astype(np.float32)
+
+
+def loudness_gain(samples: np.ndarray, target_dbfs: float, peak_limit: float = 0.99) -> float:
+    """Wzmocnienie do docelowego RMS (dBFS), ograniczone tak, by szczyt nie przekroczył peak_limit."""
+    rms = float(np.sqrt(np.mean(np.square(samples, dtype=np.float64)))) if len(samples) else 0.0
+    if rms <= 0.0:
+        return 1.0
+    peak = float(np.abs(samples).max())
+    return min(10 ** (target_dbfs / 20) / rms, peak_limit / peak)
+
+
+def normalize_loudness(samples: np.ndarray, target_dbfs: float, peak_limit: float = 0.99) -> np.ndarray:
+    """Wyrównuje głośność do docelowego RMS (dBFS), nie przekraczając peak_limit."""
+    return (samples * loudness_gain(samples, target_dbfs, peak_limit)).astype(np.float32)
+
+
+def write_audio_bytes(data: bytes, output_path: str | Path) -> str:
+    """
+    Zapisuje audio zwrócone przez silnik jako bajty. Jeśli format danych zgadza
+    się z rozszerzeniem pliku (lub nie da się go ustalić), bajty trafiają na dysk
+    bez zmian; w przeciwnym razie są przekodowywane w procesie.
+    """
+    detected = detect_format(data)
+    target = Path(output_path).suffix.lower()
+    if detected is None or detected == target or target not in SOUNDFILE_FORMATS:
+        with open(output_path, "wb") as f:
+            f.write(data)
+        return str(output_path)
+
+    _require_soundfile()
+    samples, sample_rate = sf.read(io.BytesIO(data), dtype="float32", always_2d=False)
+    return encode_pcm(samples, sample_rate, output_path)
+
+
+def transcode_file(source_path: str | Path, output_path: str | Path, block_frames: int = 65536) -> str:
+    """Przekodowuje plik audio blokami - w pamięci jest najwyżej block_frames ramek naraz."""
+    _require_soundfile()
+    file_format, subtype = format_for_path(output_path)
+    with sf.SoundFile(str(source_path)) as source, sf.SoundFile(
+            str(output_path), "w", samplerate=source.samplerate, channels=source.channels,
+            format=file_format, subtype=subtype) as output:
+        for block in source.blocks(blocksize=block_frames, dtype="float32"):
+            output.write(block)
+    return str(output_path)
+
+
+def write_audio_stream(chunks, output_path: str | Path) -> str:
+    """
+    Jak write_audio_bytes, ale dla danych przychodzących fragmentami (np. iter_content):
+    bajty od razu trafiają na dysk, więc całe nagranie nigdy nie leży w pamięci.
+    Przy formacie innym niż rozszerzenie plik jest po pobraniu przekodowywany blokami.
+    """
+    output_path = Path(output_path)
+    temp_path = output_path.with_name(f".{output_path.name}.part")
+    header = b""
+    try:
+        with open(temp_path, "wb") as f:
+            for chunk in chunks:
+                if len(header) < 12:
+                    header += chunk[:12 - len(header)]
+                f.write(chunk)
+        detected = detect_format(header)
+        target = output_path.suffix.lower()
+        if detected is None or detected == target or target not in SOUNDFILE_FORMATS:
+            os.replace(temp_path, output_path)
+            return str(output_path)
+        return transcode_file(temp_path, output_path)
+    finally:
+        temp_path.unlink(missing_ok=True)
+
+
+def pcm_info(path: str | Path) -> tuple[int, int, int]:
+    """Zwraca (liczba ramek, kanały, sample_rate) pliku audio bez dekodowania próbek."""
+    _require_soundfile()
+    info = sf.info(str(path))
+    return info.frames, info.channels, info.samplerate
+
+
+def read_pcm_into(path: str | Path, out: np.ndarray) -> np.ndarray:
+    """Dekoduje plik audio jako float32 prosto do podanego bufora [ramki, kanały] (np. np.memmap)."""
+    _require_soundfile()
+    with sf.SoundFile(str(path)) as f:
+        f.read(frames=out.shape[0], dtype="float32", always_2d=True, out=out)
+    return out
@@ -1,16 +1,24 @@
+import json
 import os
 import wave
 import logging
 
+import numpy as np
+
 from piper import SynthesisConfig
 
 # Próba importu biblioteki piper.
 # Użytkownik musi zainstalować: pip install piper-tts
 try:
+    from piper.config import PiperConfig
     from piper.voice import PiperVoice
 except ImportError:
     PiperVoice = None
 
+import onnxruntime
+
+from .audio_io import encode_pcm
+
 # Import klasy bazowej (dostosuj, jeśli TTSBase jest w innym miejscu lub plik jest pusty)
 try:
     from .tts_base import TTSBase
@@ -20,11 +28,100 @@ except ImportError:
         pass
 
 
+# Profile sesji ONNX Runtime. "default" - ustawienia domyślne ORT (jak PiperVoice.load);
+# "latency" - wszystkie rdzenie dla jednego żądania; "throughput" - mało wątków na wywołanie,
+# żeby kilka żądań (np. --inference-workers) liczyło się równolegle bez walki o rdzenie.
+SESSION_PROFILES = {
+    "default": {},
+    "latency": {
+        "intra_op_threads": os.cpu_count() or 1,
+        "inter_op_threads": 1,
+        "execution_mode": "sequential",
+        "graph_optimization": "all",
+        "cpu_mem_arena": True,
+    },
+    "throughput": {
+        "intra_op_threads": 2,
+        "inter_op_threads": 1,
+        "execution_mode": "sequential",
+        "graph_optimization": "all",
+        "cpu_mem_arena": True,
+    },
+}
+
+
+def select_providers(use_cuda: bool) -> list:
+    """
+    Dostawcy wykonania ORT. CUDA tylko, jeśli jest dostępna w zainstalowanym
+    onnxruntime; w przeciwnym razie wyraźny komunikat i CPU.
+    """
+    if use_cuda and "CUDAExecutionProvider" in onnxruntime.get_available_providers():
+        return [("CUDAExecutionProvider", {"cudnn_conv_algo_search": "HEURISTIC"}), "CPUExecutionProvider"]
+    if use_cuda:
+        print("Piper: CUDAExecutionProvider niedostępny w onnxruntime - używam CPU.")
+    return ["CPUExecutionProvider"]
+
+
+def make_session_options(profile: str = "default", intra_op_threads: int | None = None):
+    if profile not in SESSION_PROFILES:
+        raise ValueError(f"Nieznany profil sesji Piper '{profile}', dostępne: {', '.join(SESSION_PROFILES)}")
+    settings = dict(SESSION_PROFILES[profile])
+    if intra_op_threads:
+        settings["intra_op_threads"] = intra_op_threads
+    options = onnxruntime.SessionOptions()
+    if "intra_op_threads" in settings:
+        options.intra_op_num_threads = settings["intra_op_threads"]
+    if "inter_op_threads" in settings:
+        options.inter_op_num_threads = settings["inter_op_threads"]
+    if "execution_mode" in settings:
+        options.execution_mode = (onnxruntime.ExecutionMode.ORT_PARALLEL if settings["execution_mode"] == "parallel"
+                                  else onnxruntime.ExecutionMode.ORT_SEQUENTIAL)
+    if "graph_optimization" in settings:
+        options.graph_optimization_level = {
+            "basic": onnxruntime.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+            "extended": onnxruntime.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+            "all": onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL,
+        }[settings["graph_optimization"]]
+    if "cpu_mem_arena" in settings:
+        options.enable_cpu_mem_arena = settings["cpu_mem_arena"]
+    return options
+
+
+class _IoBindingSession:
+    """
+    Zamiennik sesji dla PiperVoice: run() przez IO binding. Wejścia są kopiowane
+    na urządzenie sesji raz, a wyjście alokuje ORT bezpośrednio na tym urządzeniu
+    (długość audio zależy od przewidzianych czasów trwania fonemów, więc bufora
+    wyjścia nie da się zaalokować z góry). Binding jest tworzony na wywołanie -
+    sesję można wołać z wielu wątków.
+    """
+
+    def __init__(self, session, device: str):
+        self.session = session
+        self.device = device
+        self.output_names = [output.name for output in session.get_outputs()]
+
+    def run(self, output_names, input_feed, run_options=None):
+        binding = self.session.io_binding()
+        for name, value in input_feed.items():
+            binding.bind_cpu_input(name, value)
+        for name in output_names or self.output_names:
+            binding.bind_output(name, self.device)
+        self.session.run_with_iobinding(binding, run_options)
+        return binding.copy_outputs_to_cpu()
+
+    def __getattr__(self, name):
+        return getattr(self.session, name)
+
+
 class PiperTTS(TTSBase):
-    def __init__(self, model_path: str, config_path: str = None, use_cuda: bool = True):
+    def __init__(self, model_path: str, config_path: str = None, use_cuda: bool = True,
+                 session_profile: str = "default", io_binding: bool = False, intra_op_threads: int | None = None):
         """
         Inicjalizacja silnika Piper TTS.
         Model jest ładowany do pamięci przy starcie.
+        session_profile: profil sesji ONNX Runtime z SESSION_PROFILES (default / latency / throughput).
+        io_binding: inferencja przez IO binding (głównie zysk na CUDA).
         """
         if PiperVoice is None:
             raise ImportError(
@@ -40,21 +137,56 @@ class PiperTTS(TTSBase):
             raise FileNotFoundError(f"Nie znaleziono pliku konfiguracyjnego Piper: {self.config_path}")
 
         logging.info(f"Ładowanie modelu Piper z: {self.model_path}")
-        self.voice = PiperVoice.load(self.model_path, use_cuda=use_cuda)
+        with open(self.config_path, "r", encoding="utf-8") as config_file:
+            config = PiperConfig.from_dict(json.load(config_file))
+        # Własna sesja: jawny wybór dostawcy i profil ORT zamiast ustawień domyślnych PiperVoice.load
+        # (load zbudowałby własną sesję, którą i tak byśmy zastąpili - model ładowałby się dwa razy)
+        session = onnxruntime.InferenceSession(
+            str(self.model_path),
+            sess_options=make_session_options(session_profile, intra_op_threads),
+            providers=select_providers(use_cuda),
+        )
+        self.voice = PiperVoice(session=session, config=config)
+        # ORT po cichu przechodzi na CPU, gdy brakuje bibliotek CUDA/cuDNN - sprawdzamy faktycznego dostawcę
+        self.provider = self.voice.session.get_providers()[0]
+        if use_cuda and self.provider != "CUDAExecutionProvider":
+            print("Piper: nie udało się uruchomić CUDA (brak bibliotek CUDA/cuDNN?) - inferencja na CPU.")
+        self.session_profile = session_profile
+        if io_binding:
+            device = "cuda" if self.provider == "CUDAExecutionProvider" else "cpu"
+            self.voice.session = _IoBindingSession(self.voice.session, device)
+        self.io_binding = io_binding
+        print(f"Piper: {self.provider}, profil sesji '{session_profile}', IO binding: {io_binding}")
         logging.info("Model Piper załadowany pomyślnie.")
 
+    def synthesize(self, text: str) -> np.ndarray:
+        """Generuje mowę i zwraca próbki float32 (mono, self.sample_rate) bez zapisu na dysk."""
+        chunks = [chunk.audio_float_array for chunk in self.voice.synthesize(text, self._syn_config())]
+        return np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.float32)
+
+    @property
+    def sample_rate(self) -> int:
+        return self.voice.config.sample_rate
+
+    @staticmethod
+    def _syn_config():
+        return SynthesisConfig(
+            volume=1,
+            length_scale=1.0,
+            normalize_audio=False,
+        )
+
     def tts(self, text: str, output_path: str) -> str:
         """
         Generuje audio z tekstu i zapisuje do pliku output_path (format WAV).
         """
         # Upewnij się, że katalog wyjściowy istnieje
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        syn_config = SynthesisConfig(
-            volume=1,
-            length_scale=1.0,
-            normalize_audio=False,
-        )
         try:
+            if not output_path.lower().endswith(".wav"):
+                # Formaty skompresowane kodujemy w procesie z próbek float
+                encode_pcm(self.synthesize(text), self.sample_rate, output_path)
+                return output_path
 
             # Piper generuje audio bezpośrednio do obiektu wave
             with wave.open(output_path, "wb") as wav_file:
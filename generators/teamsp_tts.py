@@ -1,22 +1,29 @@
 import requests
 from typing import Optional
 from .tts_base import TTSBase
+from .audio_io import write_audio_stream
+
+# Rozmiar fragmentu przy strumieniowym pobieraniu odpowiedzi
+STREAM_CHUNK_SIZE = 64 * 1024
 
 class TeamSPTTS(TTSBase):
     """
     TTS implementation using the TeamSP API.
     """
 
-    def __init__(self, voice: str = "o2xdfKUpc1Bwq7RchZuW", key: str = "wqpwgoGhADAwIdb1JRNTAEBgg="):
+    def __init__(self, voice: str = "o2xdfKUpc1Bwq7RchZuW", key: str = "wqpwgoGhADAwIdb1JRNTAEBgg=",
+                 timeout: tuple[float, float] = (10.0, 300.0)):
         """
         Initializes the TeamSP TTS generator.
 
         Args:
             voice: The ID of the voice to use.
             key: API key or authorization token.
+            timeout: (connect, read) timeouts in seconds; the read timeout applies between received chunks.
         """
         self.voice = voice
         self.key = key
+        self.timeout = timeout
         self.url = "https://teamsp.org/xi/run6.php"
 
     @property
@@ -60,15 +67,10 @@ class TeamSPTTS(TTSBase):
             'key': (None, self.key),
         }
 
-        response = requests.post(self.url, headers=headers, files=files)
-        response.raise_for_status()
-
-        # It's returning an mp3 file based on the curl output test.mp3
-        # I'll save to output_path. If output_path is .wav, it might be expected
-        # that downstream parts convert it, or I can just write the bytes to output_path.
-        
-        # Save the audio data
-        with open(output_path, 'wb') as f:
-            f.write(response.content)
+        # The API returns MP3 bytes. They are streamed to disk as they arrive, kept as-is
+        # for .mp3 outputs and transcoded in-process when another format was requested.
+        with requests.post(self.url, headers=headers, files=files, stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            write_audio_stream(response.iter_content(chunk_size=STREAM_CHUNK_SIZE), output_path)
 
         return output_path
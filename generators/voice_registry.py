@@ -0,0 +1,228 @@
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from .audio_io import normalize_loudness, read_pcm, resample
+
+GENERATOR_DIR = Path(__file__).parent.resolve()
+VOICES_DIR = GENERATOR_DIR / "voices"
+DEFAULT_CACHE_DIR = Path.home() / ".local" / "share" / "tts" / "voice_registry"
+
+# Zmiana przetwarzania nagrań wymaga podbicia wersji - stary indeks zostanie przeliczony
+REGISTRY_VERSION = 1
+# Kolejność preferencji, gdy ten sam głos istnieje w kilku formatach
+VOICE_EXTENSIONS = (".wav", ".flac", ".ogg", ".mp3")
+REFERENCE_SAMPLE_RATE = 22050
+MAX_REFERENCE_SECONDS = 30
+TRIM_TOP_DB = 40.0
+TARGET_RMS_DBFS = -20.0
+PEAK_LIMIT = 0.99
+
+
+def _trim(samples: np.ndarray, sample_rate: int, top_db: float = TRIM_TOP_DB) -> np.ndarray:
+    """Obcina ciszę na początku i końcu (ramki 20 ms o energii top_db poniżej szczytu)."""
+    frame = max(1, sample_rate // 50)
+    frames = len(samples) // frame
+    if frames == 0:
+        return samples
+    rms = np.sqrt(np.mean(samples[:frames * frame].reshape(frames, frame) ** 2, axis=1))
+    db = 20 * np.log10(np.maximum(rms, 1e-10))
+    loud = np.flatnonzero(db > db.max() - top_db)
+    if len(loud) == 0:
+        return samples
+    return samples[loud[0] * frame:(loud[-1] + 1) * frame]
+
+
+def preprocess_reference(path: str | Path, sample_rate: int = REFERENCE_SAMPLE_RATE) -> np.ndarray:
+    """
+    Przygotowuje nagranie referencyjne głosu: mono, resampling do sample_rate,
+    obcięcie ciszy, maks. MAX_REFERENCE_SECONDS i wyrównanie głośności.
+    """
+    samples, source_rate = read_pcm(path)
+    if samples.ndim > 1:
+        samples = samples.mean(axis=1)
+    samples = resample(samples.astype(np.float32), source_rate, sample_rate)
+    samples = _trim(samples, sample_rate)[:sample_rate * MAX_REFERENCE_SECONDS]
+    return np.ascontiguousarray(normalize_loudness(samples, TARGET_RMS_DBFS, PEAK_LIMIT), dtype=np.float32)
+
+
+class VoiceRegistry:
+    """
+    Rejestr głosów: jednorazowo przetworzone nagrania referencyjne (.npy)
+    i policzone dla nich embeddingi modeli (.npz) w wersjonowanym indeksie.
+    Wpis jest ważny, dopóki nie zmieni się plik źródłowy (rozmiar, mtime).
+    Ten sam głos w kilku formatach (np. .mp3 i .wav) to jeden wpis - źródłem
+    jest wersja z najwyżej stojącym rozszerzeniem z VOICE_EXTENSIONS.
+    """
+
+    _default = None
+    _default_lock = threading.Lock()
+
+    def __init__(self, voices_dir: str | Path = VOICES_DIR, cache_dir: str | Path = DEFAULT_CACHE_DIR,
+                 sample_rate: int = REFERENCE_SAMPLE_RATE):
+        self.voices_dir = Path(voices_dir)
+        self.cache_dir = Path(cache_dir)
+        self.sample_rate = sample_rate
+        self.index_path = self.cache_dir / "index.json"
+        self._lock = threading.RLock()
+        self._index = self._load_index()
+
+    @classmethod
+    def default(cls) -> "VoiceRegistry":
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls()
+            return cls._default
+
+    # --- Indeks ---
+    def _empty_index(self) -> dict:
+        return {"version": REGISTRY_VERSION, "sample_rate": self.sample_rate, "voices": {}}
+
+    def _load_index(self) -> dict:
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return self._empty_index()
+        if index.get("version") != REGISTRY_VERSION or index.get("sample_rate") != self.sample_rate:
+            print("[VOICES] Indeks w nieaktualnej wersji - głosy zostaną przeliczone.")
+            return self._empty_index()
+        return index
+
+    def _save_index(self) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        temp_path = self.index_path.with_suffix(".tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self._index, f, indent=2, ensure_ascii=False)
+        os.replace(temp_path, self.index_path)
+
+    # --- Źródła ---
+    def scan(self) -> dict[str, Path]:
+        """Głosy z katalogu voices: nazwa -> preferowany plik źródłowy."""
+        voices: dict[str, Path] = {}
+        for path in sorted(self.voices_dir.iterdir()):
+            if path.suffix.lower() not in VOICE_EXTENSIONS:
+                continue
+            current = voices.get(path.stem)
+            if current is None or (VOICE_EXTENSIONS.index(path.suffix.lower())
+                                   < VOICE_EXTENSIONS.index(current.suffix.lower())):
+                voices[path.stem] = path
+        return voices
+
+    @staticmethod
+    def canonical_source(path: str | Path) -> Path:
+        """Preferowany plik tego samego głosu (np. .wav zamiast .mp3 obok)."""
+        path = Path(path).resolve()
+        for extension in VOICE_EXTENSIONS:
+            candidate = path.with_suffix(extension)
+            if candidate.exists():
+                return candidate
+        return path
+
+    def _entry(self, source: Path) -> dict | None:
+        entry = self._index["voices"].get(str(source))
+        if entry is None:
+            return None
+        stat = source.stat()
+        if entry["source_size"] != stat.st_size or entry["source_mtime"] != stat.st_mtime:
+            return None
+        return entry
+
+    # --- Dane głosu ---
+    def reference_pcm(self, path: str | Path) -> np.ndarray:
+        """Przetworzone nagranie referencyjne (float32, mono, sample_rate); liczone przy pierwszym użyciu."""
+        source = self.canonical_source(path)
+        with self._lock:
+            entry = self._entry(source)
+            if entry is not None and (self.cache_dir / entry["pcm"]).exists():
+                return np.load(self.cache_dir / entry["pcm"])
+
+            start_t = time.time()
+            pcm = preprocess_reference(source, self.sample_rate)
+            file_stem = f"{source.stem}_{hashlib.sha1(str(source).encode('utf-8')).hexdigest()[:10]}"
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            np.save(self.cache_dir / f"{file_stem}.npy", pcm)
+            stat = source.stat()
+            self._index["voices"][str(source)] = {
+                "name": source.stem,
+                "source_size": stat.st_size,
+                "source_mtime": stat.st_mtime,
+                "pcm": f"{file_stem}.npy",
+                "duration_s": round(len(pcm) / self.sample_rate, 2),
+                "embeddings": {},
+                "processed_at": time.time(),
+            }
+            self._save_index()
+            print(f"[VOICES] Przetworzono {source.name} w {time.time() - start_t:.2f}s.")
+            return pcm
+
+    def load_embedding(self, path: str | Path, model_key: str) -> dict[str, np.ndarray] | None:
+        source = self.canonical_source(path)
+        with self._lock:
+            entry = self._entry(source)
+            file_name = entry["embeddings"].get(model_key) if entry else None
+            if file_name is None or not (self.cache_dir / file_name).exists():
+                return None
+            with np.load(self.cache_dir / file_name) as data:
+                return {key: data[key] for key in data.files}
+
+    def store_embedding(self, path: str | Path, model_key: str, arrays: dict[str, np.ndarray]) -> None:
+        source = self.canonical_source(path)
+        with self._lock:
+            entry = self._entry(source)
+            if entry is None:
+                self.reference_pcm(source)
+                entry = self._entry(source)
+            safe_key = "".join(c if c.isalnum() else "_" for c in model_key)
+            file_name = f"{Path(entry['pcm']).stem}.{safe_key}.npz"
+            np.savez(self.cache_dir / file_name, **arrays)
+            entry["embeddings"][model_key] = file_name
+            self._save_index()
+
+    def entries(self) -> list[dict]:
+        with self._lock:
+            return [dict(entry, source=source) for source, entry in self._index["voices"].items()]
+
+    def precompute(self, model_key: str | None = None, compute_embedding=None) -> int:
+        """
+        Przetwarza wszystkie głosy z katalogu voices. Z compute_embedding(pcm, sample_rate) -> dict
+        liczy też brakujące embeddingi modelu model_key. Zwraca liczbę głosów.
+        """
+        voices = self.scan()
+        for name, source in voices.items():
+            pcm = self.reference_pcm(source)
+            if compute_embedding is not None and self.load_embedding(source, model_key) is None:
+                start_t = time.time()
+                self.store_embedding(source, model_key, compute_embedding(pcm, self.sample_rate))
+                print(f"[VOICES] {name}: embedding {model_key} w {time.time() - start_t:.2f}s.")
+        return len(voices)
+
+
+def run_precompute():
+    parser = argparse.ArgumentParser(description="Przetwarzanie głosów referencyjnych do rejestru")
+    parser.add_argument("--voices-dir", default=str(VOICES_DIR))
+    parser.add_argument("--cache-dir", default=str(DEFAULT_CACHE_DIR))
+    parser.add_argument("--xtts", action="store_true", help="Policz też latenty XTTS (ładuje model)")
+    parser.add_argument("--list", action="store_true", help="Tylko wypisz zawartość rejestru")
+    args = parser.parse_args()
+
+    registry = VoiceRegistry(args.voices_dir, args.cache_dir)
+    VoiceRegistry._default = registry
+    if not args.list:
+        if args.xtts:
+            import torch
+            from .xtts import XTTSPolishTTS, XTTS_EMBEDDING_KEY
+            model = XTTSPolishTTS._load_model("cuda" if torch.cuda.is_available() else "cpu")
+            count = registry.precompute(
+                XTTS_EMBEDDING_KEY, lambda pcm, sr: XTTSPolishTTS.compute_latents(model, pcm, sr))
+        else:
+            count = registry.precompute()
+        print(f"[VOICES] Gotowe: {count} głosów w {registry.cache_dir}")
+    for entry in registry.entries():
+        print(f"{entry['name']:<20}{entry['duration_s']:>8.2f}s  {', '.join(entry['embeddings']) or '-'}")
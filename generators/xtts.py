@@ -1,15 +1,20 @@
 import re
 
+import numpy as np
 import torch
-import torchaudio
 import os
+import threading
 import time
+from collections import OrderedDict
 from pathlib import Path
 
 from TTS.tts.configs.xtts_config import XttsConfig
 from TTS.tts.models.xtts import Xtts, XttsAudioConfig, XttsArgs
 from TTS.config.shared_configs import BaseDatasetConfig
 
+from .audio_io import encode_pcm
+from .voice_registry import VoiceRegistry
+
 GENERATOR_DIR = Path(__file__).parent.resolve()
 TRAINED_MODEL_PATH = (
     Path.home()
@@ -19,59 +24,172 @@ TRAINED_MODEL_PATH = (
     / "tts_models--multilingual--multi-dataset--exported_xtts_finet"
 )
 # TRAINED_MODEL_PATH = Path.home() / ".local" / "share" / "tts" / "tts_models--multilingual--multi-dataset--xtts_v2"
+OUTPUT_SAMPLE_RATE = 22050
+# Klucz embeddingów tego modelu w rejestrze głosów (inny model -> inne latenty)
+XTTS_EMBEDDING_KEY = f"xtts:{TRAINED_MODEL_PATH.name}"
+# Parametry jak w domyślnym get_conditioning_latents
+GPT_COND_LEN = 6
+GPT_COND_CHUNK_LEN = 6
+
+
+def _conv1d_to_linear(module: torch.nn.Module) -> int:
+    """
+    Zamienia warstwy Conv1D z transformers (GPT-2 trzyma w nich projekcje attention/MLP)
+    na nn.Linear, żeby quantize_dynamic mogło je objąć. Zwraca liczbę zamienionych warstw.
+    """
+    from transformers.pytorch_utils import Conv1D
+
+    replaced = 0
+    for name, child in module.named_children():
+        if isinstance(child, Conv1D):
+            in_features, out_features = child.weight.shape
+            linear = torch.nn.Linear(in_features, out_features)
+            linear.weight.data = child.weight.data.t().contiguous()
+            linear.bias.data = child.bias.data
+            setattr(module, name, linear)
+            replaced += 1
+        else:
+            replaced += _conv1d_to_linear(child)
+    return replaced
+
+
+def _is_empty_cache(past_key_values) -> bool:
+    if past_key_values is None:
+        return True
+    if hasattr(past_key_values, "get_seq_length"):
+        return past_key_values.get_seq_length() == 0
+    return len(past_key_values) == 0
+
+
+class _PrefixCachedTransformer(torch.nn.Module):
+    """
+    Opakowuje transformer GPT2InferenceModel. Pierwszy krok generowania liczy
+    cały prefiks [latenty mówcy | tekst]; transformer jest przyczynowy, więc
+    klucze/wartości pozycji latentów zależą tylko od głosu. Jeśli synthesize
+    ustawi `active` = (długość prefiksu, zapisany stan KV), pierwszy krok liczy
+    tylko pozycje tekstu na podstawie zapisanego stanu. Przy błędzie (np. inna
+    wersja transformers) wyłącza się i liczy wszystko jak wcześniej.
+    """
+
+    def __init__(self, inner: torch.nn.Module):
+        super().__init__()
+        self.inner = inner
+        self.active = None
+        self.enabled = True
+
+    def forward(self, input_ids=None, past_key_values=None, attention_mask=None, position_ids=None,
+                inputs_embeds=None, **kwargs):
+        if (
+            self.enabled
+            and self.active is not None
+            and inputs_embeds is not None
+            and _is_empty_cache(past_key_values)
+        ):
+            prefix_len, cached = self.active
+            if inputs_embeds.shape[0] == cached[0][0].shape[0] and inputs_embeds.shape[1] > prefix_len:
+                try:
+                    past = cached
+                    if past_key_values is not None:
+                        # Nowy obiekt Cache z tymi samymi tensorami - update() nie zmienia zapisanego stanu
+                        past = type(past_key_values).from_legacy_cache(cached)
+                    return self.inner(
+                        input_ids=input_ids,
+                        past_key_values=past,
+                        attention_mask=attention_mask,
+                        position_ids=position_ids[:, prefix_len:] if position_ids is not None else None,
+                        inputs_embeds=inputs_embeds[:, prefix_len:],
+                        **kwargs,
+                    )
+                except Exception as e:
+                    print(f"[XTTS] Cache prefiksu mówcy wyłączony ({e!r}).")
+                    self.enabled = False
+        return self.inner(input_ids=input_ids, past_key_values=past_key_values, attention_mask=attention_mask,
+                          position_ids=position_ids, inputs_embeds=inputs_embeds, **kwargs)
+
+
+def _as_pcm(wav) -> np.ndarray:
+    """
+    Zwraca wyjście modelu jako płaską tablicę float32 bez kopiowania, gdy to możliwe
+    (ndarray float32 lub tensor CPU). Kopia powstaje tylko przy transferze z GPU
+    lub konwersji typu.
+    """
+    if isinstance(wav, torch.Tensor):
+        wav = wav.detach()
+        if wav.device.type != "cpu":
+            wav = wav.cpu()
+        wav = wav.numpy()
+    return np.asarray(wav, dtype=np.float32).reshape(-1)
 
 
 class XTTSPolishTTS:
     """
     TTS implementation using XTTS v2 with locally trained model.
     Configuration: FP32 (Native) + Cached Latents + No Compilation overhead.
+    On CPU an opt-in performance mode (cpu_perf=True) switches the GPT to
+    dynamic int8 quantization with tuned torch threading; see enable_cpu_perf_mode.
+
+    With `devices` (e.g. ["cuda:0", "cuda:1"] or ["cpu", "cpu"]) one replica
+    is loaded per entry and each request goes to the least-loaded replica.
+    Voice latents are cached per replica.
     """
 
-    _shared_model = None
-    _latents_cache = {}
+    _shared_model = None  # Pierwsza replika (zgodność wsteczna)
+    _replicas: dict = {}  # id repliki -> model
+    _replica_devices: dict[str, str] = {}
+    _replica_locks: dict[str, threading.Lock] = {}
+    _replica_load: dict[str, int] = {}
+    _pool_lock = threading.Lock()
+    # Cache LRU - najwyżej _MAX_CACHED_VOICES głosów (ze wszystkimi replikami), patrz _cache_put
+    _latents_cache = OrderedDict()  # (id repliki, ścieżka głosu) -> (gpt_cond_latent, speaker_embedding)
+    _prefix_kv_cache = OrderedDict()  # (id repliki, ścieżka głosu) -> (długość prefiksu, stan KV GPT dla latentów)
+    _cache_lock = threading.Lock()
+    _prefix_cache_enabled = False
     _MAX_CACHED_VOICES = 5  # Limit cached voice latents to prevent VRAM leak
+    _cpu_perf_enabled = False
 
-    def __init__(self, voice_path: str | Path | None = None):
+    def __init__(
+        self,
+        voice_path: str | Path | None = None,
+        device: str | None = None,
+        cpu_perf: bool = False,
+        num_threads: int | None = None,
+        interop_threads: int | None = None,
+        compile_model: bool = False,
+        devices: list[str] | None = None,
+        prefix_cache: bool = False,
+        collect_garbage: bool = True,
+    ):
         torch.serialization.add_safe_globals(
             [XttsConfig, XttsArgs, XttsAudioConfig, BaseDatasetConfig]
         )
 
-        # 1. Ładujemy wytrenowany model - TYLKO RAZ
-        if XTTSPolishTTS._shared_model is None:
-            print("Inicjalizacja XTTS v2 - Ładowanie wytrenowanego modelu...")
-
-            # Sprawdzamy, czy katalog modelu istnieje
-            if not TRAINED_MODEL_PATH.exists():
-                raise FileNotFoundError(f"Model nie znaleziony w: {TRAINED_MODEL_PATH}")
-
-            print(f"Załadowanie modelu z: {TRAINED_MODEL_PATH}")
-
-            # Ładujemy konfigurację
-            config_path = TRAINED_MODEL_PATH / "config.json"
-            config = XttsConfig()
-            config.load_json(str(config_path))
+        # 1. Ładujemy wytrenowany model - TYLKO RAZ (po jednej replice na urządzenie)
+        with XTTSPolishTTS._pool_lock:
+            if not XTTSPolishTTS._replicas:
+                if not devices:
+                    if device is None:
+                        device = "cuda" if torch.cuda.is_available() else "cpu"
+                    devices = [device]
+                for index, replica_device in enumerate(devices):
+                    replica_id = f"{index}:{replica_device}"
+                    XTTSPolishTTS._replicas[replica_id] = XTTSPolishTTS._load_model(replica_device)
+                    XTTSPolishTTS._replica_devices[replica_id] = replica_device
+                    XTTSPolishTTS._replica_locks[replica_id] = threading.Lock()
+                    XTTSPolishTTS._replica_load[replica_id] = 0
+                XTTSPolishTTS._shared_model = next(iter(XTTSPolishTTS._replicas.values()))
+            else:
+                print("XTTS v2: Używam załadowanego modelu z cache.")
+        self.model = XTTSPolishTTS._shared_model  # type: ignore
+        # W procesach WorkerProcessPool pamięć odzyskuje recykling procesu - bez sprzątania po każdym żądaniu
+        self.collect_garbage = collect_garbage
+        self._primary_replica = next(iter(XTTSPolishTTS._replicas))
 
-            # Inicjalizujemy model z konfiguracji
-            self.model = Xtts.init_from_config(config)
-
-            # Ładujemy wytrenowane wagi
-            self.model.load_checkpoint(
-                config=config,
-                checkpoint_path=str(TRAINED_MODEL_PATH / "model.pth"),
-                vocab_path=str(TRAINED_MODEL_PATH / "vocab.json"),
-                speaker_file_path=str(TRAINED_MODEL_PATH / "speakers_xtts.pth"),
-                eval=True,
-                strict=False,
+        if cpu_perf:
+            XTTSPolishTTS.enable_cpu_perf_mode(
+                num_threads=num_threads, interop_threads=interop_threads, compile_model=compile_model
             )
-
-            device = "cuda" if torch.cuda.is_available() else "cpu"
-            print(f"Urządzenie: {device}")
-            self.model.to(device)  # Domyślnie float32
-
-            XTTSPolishTTS._shared_model = self.model
-        else:
-            print("XTTS v2: Używam załadowanego modelu z cache.")
-            self.model = XTTSPolishTTS._shared_model  # type: ignore
+        if prefix_cache:
+            XTTSPolishTTS.enable_prefix_cache()
 
         # 2. Ładujemy ścieżkę głosu
         if voice_path is None:
@@ -90,15 +208,16 @@ class XTTSPolishTTS:
 
         # 3. OPTYMALIZACJA: Cache Latentów
         # Sprawdzamy, czy mamy już policzone parametry dla tego pliku
-        voice_key = str(self.voice_path_obj.resolve())
+        # (ten sam głos jako .mp3 i .wav to jeden wpis)
+        self.voice_key = str(VoiceRegistry.canonical_source(self.voice_path_obj))
+        cache_key = (self._primary_replica, self.voice_key)
 
-        if voice_key in XTTSPolishTTS._latents_cache:
+        cached = XTTSPolishTTS._cache_get(XTTSPolishTTS._latents_cache, cache_key)
+        if cached is not None:
             print(
                 f"XTTS v2: Używam zagregowanych parametrów głosu z cache dla: {self.voice_path_obj.name}"
             )
-            self.gpt_cond_latent, self.speaker_embedding = XTTSPolishTTS._latents_cache[
-                voice_key
-            ]
+            self.gpt_cond_latent, self.speaker_embedding = cached
         else:
             # To jedyny element, który zostawiamy. Oszczędza ok. 0.5 - 1.0s na każdym pliku
             # poprzez uniknięcie ponownego czytania i analizowania pliku WAV.
@@ -107,17 +226,13 @@ class XTTSPolishTTS:
             )
             try:
                 start_t = time.time()
-                self.gpt_cond_latent, self.speaker_embedding = (
-                    self.model.get_conditioning_latents(  # type: ignore
-                        audio_path=[self.voice]
-                    )
-                )
+                self.gpt_cond_latent, self.speaker_embedding = self._load_voice_latents()
 
                 # Zapisujemy do cache
-                XTTSPolishTTS._latents_cache[voice_key] = (
+                XTTSPolishTTS._cache_put(XTTSPolishTTS._latents_cache, cache_key, (
                     self.gpt_cond_latent,
                     self.speaker_embedding,
-                )
+                ))
                 print(
                     f"Latenty gotowe w {time.time() - start_t:.2f}s i zapisane w cache."
                 )
@@ -125,6 +240,161 @@ class XTTSPolishTTS:
                 print(f"BŁĄD KRYTYCZNY: {e}")
                 raise e
 
+    def _load_voice_latents(self):
+        """
+        Latenty z rejestru głosów (policzone wcześniej, np. przez precompute_voices.py).
+        Przy braku liczy je z przetworzonego nagrania i zapisuje w rejestrze.
+        """
+        try:
+            registry = VoiceRegistry.default()
+            stored = registry.load_embedding(self.voice_key, XTTS_EMBEDDING_KEY)
+            if stored is not None:
+                print(f"XTTS v2: Latenty głosu {self.voice_path_obj.name} z rejestru głosów.")
+                return (
+                    torch.from_numpy(stored["gpt_cond_latent"]).to(self.model.device),  # type: ignore
+                    torch.from_numpy(stored["speaker_embedding"]).to(self.model.device),  # type: ignore
+                )
+            pcm = registry.reference_pcm(self.voice_key)
+            gpt_cond_latent, speaker_embedding = self.compute_latents(self.model, pcm, registry.sample_rate)
+            registry.store_embedding(self.voice_key, XTTS_EMBEDDING_KEY, {
+                "gpt_cond_latent": gpt_cond_latent.cpu().numpy(),
+                "speaker_embedding": speaker_embedding.cpu().numpy(),
+            })
+            return gpt_cond_latent, speaker_embedding
+        except Exception as e:
+            print(f"XTTS v2: Rejestr głosów niedostępny ({e}), liczę latenty z pliku.")
+            return self.model.get_conditioning_latents(audio_path=[self.voice])  # type: ignore
+
+    @staticmethod
+    @torch.inference_mode()
+    def compute_latents(model, pcm: np.ndarray, sample_rate: int):
+        """Latenty GPT i embedding mówcy z przetworzonego nagrania (mono float32)."""
+        audio = torch.from_numpy(np.ascontiguousarray(pcm, dtype=np.float32)).unsqueeze(0).to(model.device)
+        speaker_embedding = model.get_speaker_embedding(audio, sample_rate)
+        gpt_cond_latent = model.get_gpt_cond_latents(
+            audio, sample_rate, length=GPT_COND_LEN, chunk_length=GPT_COND_CHUNK_LEN
+        )
+        return gpt_cond_latent, speaker_embedding
+
+    @staticmethod
+    def _load_model(device: str):
+        print(f"Inicjalizacja XTTS v2 - Ładowanie wytrenowanego modelu ({device})...")
+
+        # Sprawdzamy, czy katalog modelu istnieje
+        if not TRAINED_MODEL_PATH.exists():
+            raise FileNotFoundError(f"Model nie znaleziony w: {TRAINED_MODEL_PATH}")
+
+        print(f"Załadowanie modelu z: {TRAINED_MODEL_PATH}")
+
+        # Ładujemy konfigurację
+        config_path = TRAINED_MODEL_PATH / "config.json"
+        config = XttsConfig()
+        config.load_json(str(config_path))
+
+        # Inicjalizujemy model z konfiguracji
+        model = Xtts.init_from_config(config)
+
+        # Ładujemy wytrenowane wagi
+        model.load_checkpoint(
+            config=config,
+            checkpoint_path=str(TRAINED_MODEL_PATH / "model.pth"),
+            vocab_path=str(TRAINED_MODEL_PATH / "vocab.json"),
+            speaker_file_path=str(TRAINED_MODEL_PATH / "speakers_xtts.pth"),
+            eval=True,
+            strict=False,
+        )
+
+        print(f"Urządzenie: {device}")
+        model.to(device)  # Domyślnie float32
+        return model
+
+    @classmethod
+    def _acquire_replica(cls) -> str:
+        """Wybiera replikę z najmniejszą liczbą zadań w toku i blokuje ją na czas inferencji."""
+        with cls._pool_lock:
+            replica_id = min(cls._replica_load, key=cls._replica_load.__getitem__)
+            cls._replica_load[replica_id] += 1
+        cls._replica_locks[replica_id].acquire()
+        return replica_id
+
+    @classmethod
+    def _release_replica(cls, replica_id: str) -> None:
+        cls._replica_locks[replica_id].release()
+        with cls._pool_lock:
+            cls._replica_load[replica_id] -= 1
+
+    @classmethod
+    def replica_stats(cls) -> list[dict]:
+        """Stan puli replik: urządzenie i liczba zadań w toku (oczekujących + wykonywanych)."""
+        with cls._pool_lock:
+            return [
+                {"replica": replica_id, "device": cls._replica_devices[replica_id], "in_flight": load}
+                for replica_id, load in cls._replica_load.items()
+            ]
+
+    def _latents_for(self, replica_id: str):
+        """Latenty głosu na urządzeniu repliki - przenoszone z repliki głównej, bez ponownego liczenia."""
+        cache_key = (replica_id, self.voice_key)
+        cached = XTTSPolishTTS._cache_get(XTTSPolishTTS._latents_cache, cache_key)
+        if cached is None:
+            device = XTTSPolishTTS._replica_devices[replica_id]
+            cached = (self.gpt_cond_latent.to(device), self.speaker_embedding.to(device))
+            XTTSPolishTTS._cache_put(XTTSPolishTTS._latents_cache, cache_key, cached)
+        return cached
+
+    @classmethod
+    def _cache_get(cls, cache: OrderedDict, key):
+        with cls._cache_lock:
+            value = cache.get(key)
+            if value is not None:
+                cache.move_to_end(key)
+            return value
+
+    @classmethod
+    def _cache_put(cls, cache: OrderedDict, key, value) -> None:
+        """
+        Zapisuje wpis (id repliki, głos) i usuwa wpisy najdawniej używanych głosów ponad
+        _MAX_CACHED_VOICES - głos znika ze wszystkich replik naraz. Instancje modelu
+        zachowują własne latenty, więc usunięty głos zostanie po prostu dodany ponownie.
+        """
+        with cls._cache_lock:
+            cache[key] = value
+            cache.move_to_end(key)
+            # Głosy od najświeższego
+            voices = list(dict.fromkeys(voice for _, voice in reversed(cache)))
+            for voice in voices[cls._MAX_CACHED_VOICES:]:
+                for stale in [k for k in cache if k[1] == voice]:
+                    del cache[stale]
+
+    def _prefix_kv_for(self, replica_id: str, model, gpt_cond_latent):
+        """Stan KV transformera GPT dla latentów mówcy (liczony raz na głos i replikę)."""
+        cache_key = (replica_id, self.voice_key)
+        cached = XTTSPolishTTS._cache_get(XTTSPolishTTS._prefix_kv_cache, cache_key)
+        if cached is None:
+            transformer = model.gpt.gpt_inference.transformer
+            with torch.inference_mode():
+                out = transformer.inner(inputs_embeds=gpt_cond_latent, use_cache=True, return_dict=True)
+            past = out.past_key_values
+            if hasattr(past, "to_legacy_cache"):
+                past = past.to_legacy_cache()
+            cached = (gpt_cond_latent.shape[1], past)
+            XTTSPolishTTS._cache_put(XTTSPolishTTS._prefix_kv_cache, cache_key, cached)
+        return cached
+
+    @classmethod
+    def enable_prefix_cache(cls) -> None:
+        """
+        Włącza ponowne użycie stanu KV prefiksu mówcy w GPT: krótkie linie liczą
+        w pierwszym kroku tylko własne tokeny tekstu zamiast latentów głosu.
+        """
+        with cls._pool_lock:
+            for model in cls._replicas.values():
+                gpt_inference = model.gpt.gpt_inference
+                if not isinstance(gpt_inference.transformer, _PrefixCachedTransformer):
+                    gpt_inference.transformer = _PrefixCachedTransformer(gpt_inference.transformer)
+            cls._prefix_cache_enabled = True
+        print("[XTTS] Cache prefiksu mówcy (KV) włączony.")
+
     @property
     def name(self) -> str:
         return "XTTS"
@@ -133,50 +403,137 @@ class XTTSPolishTTS:
     def is_online(self) -> bool:
         return False
 
-    def tts(self, text, output_path="output_polish.wav"):
-        import gc
+    @property
+    def sample_rate(self) -> int:
+        return OUTPUT_SAMPLE_RATE
 
-        clean_text = text.replace("...", ".").replace("…", ".")
-        clean_text = clean_text.strip(".")
+    def synthesize(self, text: str) -> np.ndarray:
+        """
+        Generuje mowę i zwraca surowe próbki float32 (mono, OUTPUT_SAMPLE_RATE)
+        bez zapisu na dysk. Zwracana tablica to bufor wyjściowy modelu - bez kopii.
+        Dla pustego tekstu zwraca pustą tablicę.
+        """
+        # Tekst jest już znormalizowany (app.text_utils.normalize_text) -
+        # tu zostaje tylko formatowanie specyficzne dla XTTS
+        clean_text = text.strip().strip(".")
         if not clean_text.strip():
-            return output_path
+            return np.zeros(0, dtype=np.float32)
         if not re.match(r".*[\.\!\?]$", clean_text):
             clean_text += "."
         clean_text += " "
-        wav_tensor = None
-        out = None
+        replica_id = XTTSPolishTTS._acquire_replica()
+        use_prefix = False
         try:
-            out = self.model.inference(  # type: ignore
-                text=clean_text,  # type: ignore
-                language="pl",  # type: ignore
-                gpt_cond_latent=self.gpt_cond_latent,  # type: ignore
-                speaker_embedding=self.speaker_embedding,  # type: ignore
-                temperature=0.25,  # type: ignore
-                repetition_penalty=6.0,  # type: ignore
-                top_p=0.5,  # type: ignore
-                top_k=50,  # type: ignore
-                length_penalty=1.0,  # type: ignore
-                speed=1.0,  # type: ignore
-                enable_text_splitting=False,  # type: ignore
-            )
-            wav_tensor = torch.tensor(out["wav"]).unsqueeze(0)
-            torchaudio.save(output_path, wav_tensor.cpu(), 22050)
+            model = XTTSPolishTTS._replicas[replica_id]
+            gpt_cond_latent, speaker_embedding = self._latents_for(replica_id)
+            transformer = model.gpt.gpt_inference.transformer
+            use_prefix = XTTSPolishTTS._prefix_cache_enabled and isinstance(transformer, _PrefixCachedTransformer)
+            if use_prefix:
+                transformer.active = self._prefix_kv_for(replica_id, model, gpt_cond_latent)
+            with torch.inference_mode():
+                out = model.inference(  # type: ignore
+                    text=clean_text,  # type: ignore
+                    language="pl",  # type: ignore
+                    gpt_cond_latent=gpt_cond_latent,  # type: ignore
+                    speaker_embedding=speaker_embedding,  # type: ignore
+                    temperature=0.25,  # type: ignore
+                    repetition_penalty=6.0,  # type: ignore
+                    top_p=0.5,  # type: ignore
+                    top_k=50,  # type: ignore
+                    length_penalty=1.0,  # type: ignore
+                    speed=1.0,  # type: ignore
+                    enable_text_splitting=False,  # type: ignore
+                )
+        finally:
+            if use_prefix:
+                transformer.active = None
+            XTTSPolishTTS._release_replica(replica_id)
+        return _as_pcm(out["wav"])
+
+    def synthesize_tensor(self, text: str) -> torch.Tensor:
+        """Jak synthesize(), ale jako tensor CPU współdzielący pamięć z tablicą numpy."""
+        return torch.from_numpy(self.synthesize(text))
+
+    def tts(self, text, output_path="output_polish.wav"):
+        import gc
+
+        pcm = None
+        try:
+            pcm = self.synthesize(text)
+            if pcm.size == 0:
+                return output_path
+            # Kodowanie w procesie do formatu z rozszerzenia (wav/ogg/mp3/flac)
+            encode_pcm(pcm, OUTPUT_SAMPLE_RATE, output_path)
             return output_path
         except Exception as e:
             print(f"Błąd TTS: {e}")
             return output_path
         finally:
             # Jawne czyszczenie pamięci po generacji
-            if wav_tensor is not None:
-                del wav_tensor
-            if out is not None:
-                del out
-            gc.collect()
+            if pcm is not None:
+                del pcm
+            if self.collect_garbage:
+                gc.collect()
+                try:
+                    if torch.cuda.is_available():
+                        torch.cuda.empty_cache()
+                except Exception:
+                    pass
+
+    @classmethod
+    def enable_cpu_perf_mode(
+        cls,
+        num_threads: int | None = None,
+        interop_threads: int | None = None,
+        compile_model: bool = False,
+    ) -> bool:
+        """
+        Tryb wydajności CPU dla współdzielonego modelu: dynamiczna kwantyzacja int8
+        warstw liniowych GPT, ustawienie liczby wątków torch i opcjonalnie
+        torch.compile dekodera HiFi-GAN. Na GPU nic nie robi.
+        Zwraca True, jeśli tryb jest aktywny.
+        """
+        if not cls._replicas:
+            raise RuntimeError("XTTS model is not loaded.")
+        if cls._cpu_perf_enabled:
+            return True
+        cpu_models = [
+            model for replica_id, model in cls._replicas.items()
+            if cls._replica_devices[replica_id].startswith("cpu")
+        ]
+        if not cpu_models:
+            print("[XTTS] Tryb wydajności CPU pominięty - model działa na GPU.")
+            return False
+
+        threads = num_threads or os.cpu_count() or 1
+        torch.set_num_threads(threads)
+        if interop_threads:
             try:
-                if torch.cuda.is_available():
-                    torch.cuda.empty_cache()
-            except Exception:
-                pass
+                torch.set_num_interop_threads(interop_threads)
+            except RuntimeError as e:
+                # Można ustawić tylko przed pierwszą równoległą operacją
+                print(f"[XTTS] Nie można zmienić liczby wątków inter-op: {e}")
+
+        for model in cpu_models:
+            start_t = time.time()
+            replaced = _conv1d_to_linear(model.gpt)
+            torch.ao.quantization.quantize_dynamic(
+                model.gpt, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+            )
+            print(
+                f"[XTTS] GPT skwantyzowany do int8 ({replaced} warstw Conv1D -> Linear) "
+                f"w {time.time() - start_t:.2f}s, wątki: {threads}"
+            )
+
+            if compile_model:
+                try:
+                    model.hifigan_decoder = torch.compile(model.hifigan_decoder, dynamic=True)
+                    print("[XTTS] Dekoder HiFi-GAN skompilowany (torch.compile).")
+                except Exception as e:
+                    print(f"[XTTS] torch.compile niedostępne, pomijam: {e}")
+
+        cls._cpu_perf_enabled = True
+        return True
 
     @classmethod
     def clear_latents_cache(cls) -> int:
@@ -184,12 +541,10 @@ class XTTSPolishTTS:
         Czyści cache zagtępnych latensów głosu.
         Zwraca liczbę usuniętych wpisów.
         """
-        cleared = len(cls._latents_cache)
-        for key in list(cls._latents_cache.keys()):
-            latent, embedding = cls._latents_cache[key]
-            del latent
-            del embedding
-        cls._latents_cache.clear()
+        with cls._cache_lock:
+            cleared = len(cls._latents_cache)
+            cls._latents_cache.clear()
+            cls._prefix_kv_cache.clear()
         import gc
 
         gc.collect()
@@ -0,0 +1,5 @@
+from generators.voice_registry import run_precompute
+
+if __name__ == "__main__":
+    # Jednorazowe przetworzenie głosów z generators/voices (--xtts: także latenty XTTS)
+    run_precompute()
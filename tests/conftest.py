@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Dodajemy katalog główny repozytorium do ścieżki, żeby importy działały
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,22 @@
+import pytest
+
+from app.admission import AdmissionController, AdmissionRejected
+
+
+def test_oversized_request_is_rejected_before_taking_a_slot():
+    admission = AdmissionController(max_pending=1, max_chunks=10)
+    with pytest.raises(AdmissionRejected) as rejected:
+        admission.acquire("xtts", chunks=11)
+    assert rejected.value.status == 413
+    # Odrzucone żądanie nie zajmuje miejsca w limicie modelu
+    admission.release(admission.acquire("xtts", chunks=10))
+    assert admission.stats()["rejected"]["too_large"] == 1
+
+
+def test_size_can_be_checked_after_admission():
+    admission = AdmissionController(max_chunks=10)
+    ticket = admission.acquire("xtts")
+    with pytest.raises(AdmissionRejected):
+        admission.check_size(25)
+    admission.release(ticket)
+    assert admission.stats()["pending"] == {"xtts": 0}
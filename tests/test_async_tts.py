@@ -0,0 +1,163 @@
+import os
+import shutil
+import threading
+import time
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from generators.async_tts import RateLimitedTTS
+from generators.tts_base import TTSBase
+
+
+class StandInServer:
+    """Lokalny serwer udający API TTS: loguje czas zapytań i liczbę równoległych połączeń."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.requests: list[tuple[float, str]] = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                text = self.rfile.read(int(self.headers["Content-Length"])).decode("utf-8")
+                with server._lock:
+                    server.requests.append((time.monotonic(), text))
+                    server.active += 1
+                    server.max_active = max(server.max_active, server.active)
+                try:
+                    time.sleep(server.delay)
+                    body = f"AUDIO:{text}".encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                finally:
+                    with server._lock:
+                        server.active -= 1
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/tts"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class StandInTTS(TTSBase):
+    """Silnik online wysyłający tekst do StandInServer i zapisujący odpowiedź do pliku."""
+
+    def __init__(self, url: str):
+        self.url = url
+        # Limity RateLimitedTTS są wspólne dla nazwy silnika - każdy test ma własną
+        self._name = f"stand_in_{uuid.uuid4().hex[:8]}"
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def is_online(self) -> bool:
+        return True
+
+    def tts(self, text: str, output_path: str) -> str:
+        request = urllib.request.Request(self.url, data=text.encode("utf-8"), method="POST")
+        with urllib.request.urlopen(request, timeout=10) as response:
+            data = response.read()
+        with open(output_path, "wb") as f:
+            f.write(data)
+        return output_path
+
+
+@pytest.fixture
+def server():
+    server = StandInServer()
+    yield server
+    server.close()
+
+
+def read(path) -> str:
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def test_rate_limit_spaces_requests(server, tmp_path):
+    tts = RateLimitedTTS(StandInTTS(server.url), requests_per_second=10.0, burst=1)
+    for i in range(5):
+        tts.tts(f"linia {i}", str(tmp_path / f"{i}.mp3"))
+    times = [t for t, _ in server.requests]
+    # Burst 1 przy 10 zapytaniach/s: kolejne zapytania co najmniej ~0.1 s po sobie
+    assert times[-1] - times[0] >= 0.35
+    assert all(read(tmp_path / f"{i}.mp3") == f"AUDIO:linia {i}" for i in range(5))
+
+
+def test_concurrency_cap(tmp_path):
+    server = StandInServer(delay=0.2)
+    try:
+        tts = RateLimitedTTS(StandInTTS(server.url), requests_per_second=100.0, burst=100, max_concurrency=2)
+        futures = [tts.submit(f"linia {i}", str(tmp_path / f"{i}.mp3")) for i in range(6)]
+        for future in futures:
+            future.result(timeout=10)
+        assert len(server.requests) == 6
+        assert server.max_active == 2
+    finally:
+        server.close()
+
+
+def test_identical_texts_are_coalesced(tmp_path):
+    server = StandInServer(delay=0.3)
+    try:
+        tts = RateLimitedTTS(StandInTTS(server.url), requests_per_second=100.0, burst=100)
+        paths = [str(tmp_path / f"{i}.mp3") for i in range(3)]
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            list(executor.map(lambda path: tts.tts("ten sam tekst", path), paths))
+        assert len(server.requests) == 1
+        assert all(read(path) == "AUDIO:ten sam tekst" for path in paths)
+    finally:
+        server.close()
+
+
+def test_follower_copy_survives_leader_moving_its_file(tmp_path):
+    server = StandInServer(delay=0.3)
+    try:
+        tts = RateLimitedTTS(StandInTTS(server.url), requests_per_second=100.0, burst=100)
+        leader_path = str(tmp_path / "leader.mp3")
+        follower_path = str(tmp_path / "follower.mp3")
+        leader = tts.submit("tekst", leader_path)
+        time.sleep(0.1)
+        follower = tts.submit("tekst", follower_path)
+        # Wołający lidera od razu przenosi plik (np. ze stagingu) - kopia musi już istnieć
+        shutil.move(leader.result(timeout=10), str(tmp_path / "moved.mp3"))
+        assert follower.result(timeout=10) == follower_path
+        assert read(follower_path) == "AUDIO:tekst"
+        assert len(server.requests) == 1
+    finally:
+        server.close()
+
+
+def test_engine_error_reaches_followers(tmp_path):
+    tts = RateLimitedTTS(StandInTTS("http://127.0.0.1:9/unreachable"), requests_per_second=100.0, burst=100)
+    leader = tts.submit("tekst", str(tmp_path / "a.mp3"))
+    follower = tts.submit("tekst", str(tmp_path / "b.mp3"))
+    for future in (leader, follower):
+        with pytest.raises(OSError):
+            future.result(timeout=10)
+    assert not os.path.exists(tmp_path / "b.mp3")
+
+
+def test_conflicting_limits_are_rejected(server):
+    engine = StandInTTS(server.url)
+    RateLimitedTTS(engine, requests_per_second=5.0, burst=2)
+    RateLimitedTTS(engine, requests_per_second=5.0, burst=2)
+    with pytest.raises(ValueError):
+        RateLimitedTTS(engine, requests_per_second=50.0, burst=2)
@@ -0,0 +1,34 @@
+from app import audio_index
+from app.audio_index import AudioMetadataIndex, lookup
+
+
+def test_lookup_reads_the_sidecar_without_keeping_an_index(tmp_path):
+    audio = tmp_path / "a.wav"
+    audio.write_bytes(b"RIFF")
+    writer = AudioMetadataIndex(tmp_path)
+    writer.record(audio, {"duration_s": 1.25})
+    writer.flush()
+
+    assert lookup(audio)["duration_s"] == 1.25
+    assert AudioMetadataIndex.opened(tmp_path) is None
+    # Zmieniony plik - wpis nieaktualny
+    audio.write_bytes(b"RIFF....")
+    assert lookup(audio) is None
+
+
+def test_least_recently_used_index_is_flushed_and_evicted(tmp_path, monkeypatch):
+    monkeypatch.setattr(audio_index, "MAX_OPEN_DIRECTORIES", 2)
+    monkeypatch.setattr(AudioMetadataIndex, "_instances", type(AudioMetadataIndex._instances)())
+    directories = [tmp_path / str(i) for i in range(3)]
+    for directory in directories:
+        directory.mkdir()
+    audio = directories[0] / "a.wav"
+    audio.write_bytes(b"RIFF")
+
+    AudioMetadataIndex.for_directory(directories[0]).record(audio, {"duration_s": 2.0})
+    AudioMetadataIndex.for_directory(directories[1])
+    AudioMetadataIndex.for_directory(directories[2])
+
+    assert AudioMetadataIndex.opened(directories[0]) is None
+    # Zapisany przy usunięciu z pamięci, bez czekania na SAVE_DELAY
+    assert lookup(audio)["duration_s"] == 2.0
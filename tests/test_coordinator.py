@@ -0,0 +1,162 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("flask_cors")
+from app.coordinator import Coordinator
+
+
+class StandInNode:
+    """
+    Serwer TTS, który pierwsze busy_responses żądań odrzuca z 429 i Retry-After,
+    a z broken=True odpowiada na każde żądanie błędem 500.
+    """
+
+    def __init__(self, busy_responses: int = 0, retry_after: str = "1", broken: bool = False):
+        self.posts: list[float] = []
+        node = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self.send_response(200)
+                self.end_headers()
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers["Content-Length"]))
+                node.posts.append(time.monotonic())
+                if broken:
+                    self.send_response(500)
+                elif len(node.posts) <= busy_responses:
+                    self.send_response(429)
+                    self.send_header("Retry-After", retry_after)
+                else:
+                    self.send_response(200)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def wait_for(job, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while not job.finished and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return job.to_dict()
+
+
+def test_busy_node_is_retried_after_retry_after():
+    node = StandInNode(busy_responses=2)
+    try:
+        coordinator = Coordinator([node.url], max_retries=1, request_timeout=10)
+        result = coordinator.dispatch("xtts", {"text": "a", "output_file": "a.wav"})
+        assert result["status"] == "ok"
+        assert len(node.posts) == 3
+        # Kolejne próby dopiero po Retry-After, a 429 nie zużywa max_retries
+        assert node.posts[1] - node.posts[0] >= 0.9
+    finally:
+        node.close()
+
+
+def test_malformed_item_fails_the_line_not_the_job():
+    node = StandInNode()
+    try:
+        coordinator = Coordinator([node.url])
+        job = wait_for(coordinator.submit_batch("xtts", [{"text": "a", "output_file": "a.wav"}, 5]))
+        assert job["status"] == "done"
+        assert (job["done"], job["failed"], job["pending"]) == (1, 1, 0)
+    finally:
+        node.close()
+
+
+def test_finished_jobs_are_evicted():
+    node = StandInNode()
+    try:
+        coordinator = Coordinator([node.url], max_jobs=2)
+        jobs = [coordinator.submit_batch("xtts", [{"text": str(i), "output_file": f"{i}.wav"}]) for i in range(4)]
+        for job in jobs:
+            wait_for(job)
+        coordinator.submit_batch("xtts", [{"text": "x", "output_file": "x.wav"}])
+        assert len(coordinator.jobs) <= 2
+        assert coordinator.get_job(jobs[0].job_id) is None
+    finally:
+        node.close()
+
+
+def test_line_goes_to_the_node_with_the_model_and_voice_loaded():
+    nodes = [StandInNode() for _ in range(3)]
+    try:
+        coordinator = Coordinator([node.url for node in nodes])
+        cold, warm, loaded = (coordinator.workers[node.url] for node in nodes)
+        key = ("xtts", "voice.wav")
+        warm.warm_voices.add(key)
+        loaded.loaded = key
+        loaded.warm_voices.add(key)
+
+        # Kolejno: załadowany model i głos, policzone latenty głosu, dowolny wolny węzeł
+        assert coordinator._acquire("xtts", "voice.wav", set()) is loaded
+        assert coordinator._acquire("xtts", "voice.wav", set()) is warm
+        assert coordinator._acquire("xtts", "voice.wav", set()) is cold
+    finally:
+        for node in nodes:
+            node.close()
+
+
+def test_voice_stays_on_the_node_that_rendered_it():
+    nodes = [StandInNode() for _ in range(2)]
+    try:
+        coordinator = Coordinator([node.url for node in nodes])
+        # Drugi węzeł ma już głos "b"; "a" trafia do pierwszego i tam zostaje
+        coordinator.workers[nodes[1].url].loaded = ("xtts", "b.wav")
+        first = coordinator.dispatch("xtts", {"text": "1", "output_file": "1.wav", "voice_file": "a.wav"})
+        second = coordinator.dispatch("xtts", {"text": "2", "output_file": "2.wav", "voice_file": "b.wav"})
+        third = coordinator.dispatch("xtts", {"text": "3", "output_file": "3.wav", "voice_file": "a.wav"})
+
+        assert first["worker"] == third["worker"] == nodes[0].url
+        assert second["worker"] == nodes[1].url
+    finally:
+        for node in nodes:
+            node.close()
+
+
+def test_line_fails_over_to_another_node_after_a_node_error():
+    broken, healthy = StandInNode(broken=True), StandInNode()
+    try:
+        coordinator = Coordinator([broken.url, healthy.url], max_retries=3)
+        # Zepsuty węzeł ma załadowany głos, więc dostaje linię jako pierwszy
+        coordinator.workers[broken.url].loaded = ("xtts", None)
+        result = coordinator.dispatch("xtts", {"text": "a", "output_file": "a.wav"})
+
+        assert result["status"] == "ok"
+        assert result["worker"] == healthy.url
+        assert len(broken.posts) == 1
+        assert coordinator.workers[broken.url].failures == 1
+        assert coordinator.workers[healthy.url].loaded == ("xtts", None)
+    finally:
+        broken.close()
+        healthy.close()
+
+
+def test_unreachable_node_is_marked_down_and_the_line_fails_over():
+    gone, healthy = StandInNode(), StandInNode()
+    try:
+        coordinator = Coordinator([gone.url, healthy.url], max_retries=3)
+        coordinator.workers[gone.url].loaded = ("xtts", None)
+        gone.close()
+        result = coordinator.dispatch("xtts", {"text": "a", "output_file": "a.wav"})
+
+        assert result["status"] == "ok"
+        assert result["worker"] == healthy.url
+        assert not coordinator.workers[gone.url].healthy
+    finally:
+        healthy.close()
@@ -0,0 +1,60 @@
+import os
+import threading
+import time
+
+from app.deferred import DeferredRenderer
+
+
+def wait_until(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+
+def test_final_render_is_swapped_in_and_reported(tmp_path):
+    draft = tmp_path / "line.wav"
+    draft.write_bytes(b"draft")
+    swapped = []
+
+    def render(entry):
+        entry.metadata["duration_s"] = 1.5
+        final = tmp_path / "final.tmp"
+        final.write_bytes(b"final")
+        return final
+
+    renderer = DeferredRenderer(render, settle_seconds=0.05, on_swap=swapped.append)
+    renderer.register("xtts", None, "tekst", draft)
+    assert wait_until(lambda: swapped)
+    assert draft.read_bytes() == b"final"
+    assert swapped[0].metadata == {"duration_s": 1.5}
+    assert renderer.stats()["finalized"] == 1
+
+
+def test_render_is_discarded_when_the_draft_changes(tmp_path):
+    draft = tmp_path / "line.wav"
+    draft.write_bytes(b"draft")
+    rendering = threading.Event()
+    release = threading.Event()
+    swapped = []
+
+    def render(entry):
+        rendering.set()
+        release.wait(5)
+        final = tmp_path / "final.tmp"
+        final.write_bytes(b"final")
+        return final
+
+    renderer = DeferredRenderer(render, settle_seconds=0.05, on_swap=swapped.append)
+    renderer.register("xtts", None, "tekst", draft)
+    assert rendering.wait(5)
+    # Nowa wersja robocza w trakcie renderu finalnego
+    draft.write_bytes(b"second draft")
+    os.utime(draft, (time.time() + 10, time.time() + 10))
+    release.set()
+    assert wait_until(lambda: renderer.stats()["superseded"] == 1)
+    assert draft.read_bytes() == b"second draft"
+    assert not swapped
+    assert renderer.stats()["pending"] == 0
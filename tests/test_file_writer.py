@@ -0,0 +1,53 @@
+import shutil
+
+import pytest
+
+from app.file_writer import BackgroundWriter, DirectoryCache, deliver_file
+
+
+def test_failed_delivery_forgets_directory(tmp_path):
+    directories = DirectoryCache()
+    target_dir = tmp_path / "out"
+    directories.ensure(target_dir)
+    generated = tmp_path / "generated.wav"
+    generated.write_bytes(b"RIFF")
+    # Katalog zniknął po zapamiętaniu (np. odłączony udział) - zapis się nie uda
+    shutil.rmtree(target_dir)
+
+    with pytest.raises(OSError):
+        deliver_file(generated, [target_dir / "a.wav", target_dir / "b.wav"], directories)
+
+    directories.ensure(target_dir)
+    assert target_dir.is_dir()
+    deliver_file(generated, [target_dir / "a.wav"], directories)
+    assert (target_dir / "a.wav").read_bytes() == b"RIFF"
+
+
+def test_failed_async_delivery_removes_the_staged_file(tmp_path):
+    writer = BackgroundWriter()
+    staged = tmp_path / "staged.wav"
+    staged.write_bytes(b"RIFF")
+    # Miejsce docelowe, którego nie da się utworzyć (rodzic jest plikiem)
+    blocker = tmp_path / "blocker"
+    blocker.write_bytes(b"")
+
+    job_id = writer.submit(staged, [blocker / "a.wav"])
+    writer.flush()
+
+    assert writer.status(job_id)["status"] == "failed"
+    assert not staged.exists()
+
+
+def test_on_done_error_does_not_fail_a_delivered_job(tmp_path):
+    writer = BackgroundWriter()
+    staged = tmp_path / "staged.wav"
+    staged.write_bytes(b"RIFF")
+
+    def on_done(destinations):
+        raise ValueError("index error")
+
+    job_id = writer.submit(staged, [tmp_path / "out" / "a.wav"], on_done=on_done)
+    writer.flush()
+
+    assert writer.status(job_id)["status"] == "done"
+    assert (tmp_path / "out" / "a.wav").read_bytes() == b"RIFF"
@@ -0,0 +1,64 @@
+import os
+
+from app.manifest import FAILED, GENERATED, QUEUED, VERIFIED, JobManifest, file_sha256
+
+
+def lines_for(tmp_path, count: int) -> list[dict]:
+    return [{"text": f"Linia {i}.", "voice_file": "voice.wav", "output_file": str(tmp_path / f"{i}.wav")}
+            for i in range(count)]
+
+
+def write_output(manifest: JobManifest, job_id: str, idx: int, state: str, path: str) -> None:
+    with open(path, "wb") as f:
+        f.write(b"RIFF" + bytes([idx]) * 16)
+    manifest.update_line(job_id, idx, state, output_path=path, output_hash=file_sha256(path))
+
+
+def test_line_state_transitions(tmp_path):
+    manifest = JobManifest(tmp_path / "manifest.db")
+    lines = lines_for(tmp_path, 3)
+    job_id, skipped = manifest.create_job("xtts", lines)
+    assert skipped == 0
+    assert manifest.job_progress(job_id)[QUEUED] == 3
+    assert manifest.incomplete_jobs() == [(job_id, "xtts")]
+
+    write_output(manifest, job_id, 0, GENERATED, lines[0]["output_file"])
+    write_output(manifest, job_id, 1, VERIFIED, lines[1]["output_file"])
+    manifest.update_line(job_id, 2, FAILED, error="timeout")
+    manifest.finish_job(job_id)
+
+    progress = manifest.job_progress(job_id, include_lines=True)
+    assert progress["status"] == "done"
+    assert (progress[QUEUED], progress[GENERATED], progress[VERIFIED], progress[FAILED]) == (0, 1, 1, 1)
+    assert progress["lines"][2] == {"output_file": lines[2]["output_file"], "state": FAILED, "error": "timeout"}
+    row = manifest.job_lines(job_id, (GENERATED,))[0]
+    assert row["output_size"] == os.path.getsize(lines[0]["output_file"])
+    assert manifest.incomplete_jobs() == []
+
+    # Nowe zadanie z tymi samymi liniami: gotowe i niezmienione pliki są pomijane
+    again, skipped = manifest.create_job("xtts", lines)
+    assert skipped == 2
+    assert [row["idx"] for row in manifest.pending_lines(again)] == [2]
+
+
+def test_resume_after_restart_requeues_unfinished_lines(tmp_path):
+    path = tmp_path / "manifest.db"
+    manifest = JobManifest(path)
+    lines = lines_for(tmp_path, 5)
+    job_id, _ = manifest.create_job("xtts", lines)
+    # 0: queued; 1: generated, plik zmieniony; 2: generated; 3: verified; 4: failed
+    write_output(manifest, job_id, 1, GENERATED, lines[1]["output_file"])
+    write_output(manifest, job_id, 2, GENERATED, lines[2]["output_file"])
+    write_output(manifest, job_id, 3, VERIFIED, lines[3]["output_file"])
+    manifest.update_line(job_id, 4, FAILED, error="timeout")
+    with open(lines[1]["output_file"], "ab") as f:
+        f.write(b"edited")
+
+    # Restart serwera: nowy manifest na tej samej bazie, zadanie nie zostało zakończone
+    restarted = JobManifest(path)
+    assert restarted.incomplete_jobs() == [(job_id, "xtts")]
+    assert [row["idx"] for row in restarted.pending_lines(job_id)] == [0, 1, 4]
+
+    # Linia wygenerowana przed restartem, której pliku już nie ma, wraca do kolejki
+    os.remove(lines[2]["output_file"])
+    assert [row["idx"] for row in restarted.pending_lines(job_id)] == [0, 1, 2, 4]
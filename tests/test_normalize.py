@@ -0,0 +1,33 @@
+import pytest
+
+from app.text_utils import normalize_text
+
+
+@pytest.mark.parametrize("text, expected", [
+    # Zwykła spacja rozdziela osobne liczby, twarda spacja to separator tysięcy
+    ("Mam 3 100 zł", "Mam 3 100 zł"),
+    ("Mam 3\u00a0100 zł", "Mam 3100 zł"),
+    ("Koszt: 1\u202f250\u202f000 zł.", "Koszt: 1250000 zł."),
+    # Kropka skrótu w środku zdania znika razem ze skrótem
+    ("Zrobiono to wg. planu.", "Zrobiono to według planu."),
+    ("Wg planu.", "Według planu."),
+    ("Owoce, np. jabłka.", "Owoce, na przykład jabłka."),
+    ("Jabłka itd., a potem gruszki.", "Jabłka i tak dalej, a potem gruszki."),
+    # ... a na końcu zdania zostaje jako kropka kończąca
+    ("Lubię owoce, np.", "Lubię owoce, na przykład."),
+    ("Zrobiono to wg.", "Zrobiono to według."),
+    ("Jabłka, gruszki itd. Potem śliwki.", "Jabłka, gruszki i tak dalej. Potem śliwki."),
+])
+def test_normalize_text(text, expected):
+    assert normalize_text(text) == expected
+
+
+@pytest.mark.parametrize("text", [
+    "Mam 3 100 zł, np. w portfelu",
+    "Lubię owoce, np.",
+    "Jabłka itd. Potem wg. planu…",
+])
+def test_normalize_text_is_idempotent(text):
+    once = normalize_text(text)
+    assert normalize_text(once) == once
+
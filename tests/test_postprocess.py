@@ -0,0 +1,140 @@
+import numpy as np
+import pytest
+
+from app.audio_index import PcmLevels, describe_pcm
+from app.postprocess import PostProcessor
+
+
+def clips(sample_rate: int) -> list[np.ndarray]:
+    rng = np.random.default_rng(0)
+    return [rng.uniform(-0.5, 0.5, n).astype(np.float32) for n in (sample_rate, 0, sample_rate // 2, 300)]
+
+
+@pytest.mark.parametrize("gap_ms", [0, 120])
+def test_streamed_blocks_match_in_memory_merge(gap_ms):
+    postprocessor = PostProcessor(gap_ms=gap_ms)
+    parts = clips(22050)
+    assert postprocessor.streamable(22050)
+
+    merged, _ = postprocessor.process(parts, 22050, trimmed=True)
+    levels = PcmLevels(22050)
+    blocks = []
+    for clip in parts:
+        block = postprocessor.stream_block(clip, 22050, first=levels.frames == 0)
+        levels.add(block)
+        blocks.append(block)
+
+    np.testing.assert_array_equal(np.concatenate(blocks), merged)
+    assert levels.to_dict() == describe_pcm(merged, 22050)
+
+
+def test_whole_signal_steps_are_not_streamable():
+    assert not PostProcessor(crossfade_ms=50).streamable(22050)
+    assert not PostProcessor(target_dbfs=-20.0).streamable(22050)
+    assert not PostProcessor(sample_rate=48000).streamable(22050)
+    assert PostProcessor(sample_rate=22050, dither=True).streamable(22050)
+
+
+def tone(seconds: float, sample_rate: int, amplitude: float = 0.5, frequency: float = 440.0) -> np.ndarray:
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    return (amplitude * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+
+
+def silence(seconds: float, sample_rate: int) -> np.ndarray:
+    return np.zeros(int(seconds * sample_rate), dtype=np.float32)
+
+
+def offset_of(view: np.ndarray, samples: np.ndarray) -> int:
+    return (view.__array_interface__["data"][0] - samples.__array_interface__["data"][0]) // samples.itemsize
+
+
+def test_trim_cuts_only_silence_of_at_least_min_silence():
+    sr = 22050
+    samples = np.concatenate([silence(2.0, sr), tone(1.0, sr), silence(0.5, sr)])
+    trimmed = PostProcessor().trim(samples, sr)
+
+    # Dwie sekundy ciszy na początku są obcięte, pół sekundy na końcu (< 1350 ms) zostaje
+    assert abs(offset_of(trimmed, samples) - 2 * sr) <= sr // 100
+    assert offset_of(trimmed, samples) + len(trimmed) == len(samples)
+    assert np.shares_memory(trimmed, samples)
+
+
+def test_trim_keeps_silent_or_untrimmed_input():
+    sr = 22050
+    quiet = silence(3.0, sr)
+    assert PostProcessor().trim(quiet, sr) is quiet
+    samples = np.concatenate([silence(2.0, sr), tone(1.0, sr)])
+    assert PostProcessor(trim_db=None).trim(samples, sr) is samples
+
+
+def test_trim_matches_pydub_trim_silence():
+    pydub = pytest.importorskip("pydub")
+    from pydub.silence import detect_nonsilent
+
+    def trim_silence(audio, silence_thresh_db=-40, min_silence_ms=1350):
+        # Dotychczasowa implementacja (pydub) z tts_server
+        nonsilent_parts = detect_nonsilent(audio, min_silence_len=min_silence_ms, silence_thresh=silence_thresh_db)
+        if not nonsilent_parts:
+            return audio, 0
+        return audio[nonsilent_parts[0][0]:nonsilent_parts[-1][1]], nonsilent_parts[0][0]
+
+    sr = 22050
+    for lead, tail in ((2.0, 1.6), (0.4, 2.5), (1.0, 0.3)):
+        samples = np.concatenate([silence(lead, sr), tone(1.0, sr), silence(tail, sr)])
+        audio = pydub.AudioSegment((samples * 32767).astype(np.int16).tobytes(), frame_rate=sr,
+                                   sample_width=2, channels=1)
+        expected, expected_start_ms = trim_silence(audio)
+        trimmed = PostProcessor().trim(samples, sr)
+
+        # Zgodnie z pydub z dokładnością do jednej ramki analizy (TRIM_FRAME_MS)
+        assert abs(offset_of(trimmed, samples) / sr * 1000 - expected_start_ms) <= 10
+        assert abs(len(trimmed) / sr * 1000 - len(expected)) <= 10
+
+
+def test_crossfade_join_overlaps_with_a_linear_ramp():
+    sr = 1000
+    postprocessor = PostProcessor(crossfade_ms=100)
+    first, second = np.ones(500, dtype=np.float32), np.zeros(400, dtype=np.float32)
+    joined = postprocessor.join([first, second], sr)
+
+    assert len(joined) == 500 + 400 - 100
+    np.testing.assert_array_equal(joined[:400], 1.0)
+    np.testing.assert_allclose(joined[400:500], np.linspace(1.0, 0.0, 100), atol=1e-6)
+    np.testing.assert_array_equal(joined[500:], 0.0)
+
+
+def test_crossfade_is_limited_to_the_shorter_clip():
+    joined = PostProcessor(crossfade_ms=100).join([np.ones(500, dtype=np.float32),
+                                                    np.ones(30, dtype=np.float32)], 1000)
+    assert len(joined) == 500
+    np.testing.assert_allclose(joined, 1.0, atol=1e-6)
+
+
+def test_gap_join_inserts_silence_between_clips():
+    joined = PostProcessor(gap_ms=50).join([np.ones(100, dtype=np.float32), np.ones(100, dtype=np.float32)], 1000)
+    assert len(joined) == 250
+    np.testing.assert_array_equal(joined[100:150], 0.0)
+
+
+def test_resampling_keeps_duration_and_pitch():
+    samples, sample_rate = PostProcessor(sample_rate=16000).process([tone(1.0, 22050)], 22050, trimmed=True)
+
+    assert sample_rate == 16000
+    assert abs(len(samples) - 16000) <= 1
+    spectrum = np.abs(np.fft.rfft(samples))
+    assert abs(np.argmax(spectrum) * sample_rate / len(samples) - 440) <= 2
+
+
+def test_loudness_reaches_the_target_rms():
+    samples, _ = PostProcessor(target_dbfs=-20.0).process([tone(1.0, 22050, amplitude=0.01)], 22050, trimmed=True)
+    rms_dbfs = 20 * np.log10(np.sqrt(np.mean(np.square(samples, dtype=np.float64))))
+    assert abs(rms_dbfs - -20.0) < 0.1
+
+
+def test_loudness_gain_is_limited_by_the_peak():
+    quiet = tone(1.0, 22050, amplitude=0.01)
+    quiet[100] = 0.5
+    samples, _ = PostProcessor(target_dbfs=-10.0, peak_limit=0.9).process([quiet], 22050, trimmed=True)
+
+    assert np.abs(samples).max() == pytest.approx(0.9, abs=1e-6)
+    assert 20 * np.log10(np.sqrt(np.mean(np.square(samples, dtype=np.float64)))) < -10.0
@@ -0,0 +1,55 @@
+import os
+
+from app.manifest import file_sha256
+from app.project import ProjectIndex
+
+
+def test_draft_entry_is_not_current_for_final_requests(tmp_path):
+    output = tmp_path / "1.wav"
+    output.write_bytes(b"draft")
+    index = ProjectIndex(tmp_path)
+    index.record("1", "abc", output, file_sha256(output), "draft")
+
+    assert index.is_current("1", "abc", output, "draft")
+    assert not index.is_current("1", "abc", output, "final")
+
+    # Po podmianie na render finalny linia jest aktualna dla obu jakości (także po ponownym odczycie)
+    output.write_bytes(b"final")
+    index.record("1", "abc", output, file_sha256(output), "final")
+    index.flush()
+    reloaded = ProjectIndex(tmp_path)
+    assert reloaded.is_current("1", "abc", output, "final")
+    assert reloaded.is_current("1", "abc", output, "draft")
+
+
+def test_lines_are_saved_once_per_flush(tmp_path, monkeypatch):
+    saves = []
+    real_replace = os.replace
+    monkeypatch.setattr(os, "replace", lambda src, dst: (saves.append(dst), real_replace(src, dst)))
+    index = ProjectIndex.for_directory(tmp_path)
+    for i in range(50):
+        output = tmp_path / f"{i}.wav"
+        output.write_bytes(b"x")
+        index.record(str(i), "abc", output, file_sha256(output))
+
+    assert not saves
+    index.flush()
+    assert len(saves) == 1
+    assert len(ProjectIndex(tmp_path)._lines) == 50
+
+
+def test_one_shared_index_per_directory(tmp_path):
+    first, second = tmp_path / "1.wav", tmp_path / "2.wav"
+    first.write_bytes(b"draft")
+    second.write_bytes(b"draft")
+    request_index = ProjectIndex.for_directory(tmp_path)
+    request_index.record("1", "abc", first, file_sha256(first), "draft")
+
+    # Render finalny w tle i kolejne linie żądania trafiają do tego samego obiektu
+    ProjectIndex.for_directory(tmp_path).record("1", "abc", first, file_sha256(first), "final")
+    request_index.record("2", "def", second, file_sha256(second), "draft")
+    request_index.flush()
+
+    reloaded = ProjectIndex(tmp_path)
+    assert reloaded.is_current("1", "abc", first, "final")
+    assert reloaded.is_current("2", "def", second, "draft")
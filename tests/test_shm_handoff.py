@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from app.shm_handoff import SharedPcmStore, ShmLimitExceeded
+
+
+def test_samples_are_written_straight_into_the_segment(tmp_path):
+    store = SharedPcmStore(directory=tmp_path, max_bytes=1024)
+    samples = np.linspace(-1.0, 1.0, 100, dtype=np.float32)
+
+    lease = store.create_from_pcm(samples, 22050)
+
+    assert (lease.frames, lease.channels, lease.sample_rate) == (100, 1, 22050)
+    mapped = np.memmap(lease.path, dtype="<f4", mode="r").reshape(lease.frames, lease.channels)
+    np.testing.assert_array_equal(mapped[:, 0], samples)
+    assert store.release(lease.lease_id)
+    assert not lease.path.exists()
+
+
+def test_limit_is_checked_before_writing(tmp_path):
+    store = SharedPcmStore(directory=tmp_path, max_bytes=256)
+    with pytest.raises(ShmLimitExceeded):
+        store.create_from_pcm(np.zeros(100, dtype=np.float32), 22050)
+    assert store.stats()["leases"] == 0
+    assert not list(tmp_path.iterdir())
+
+
+def test_startup_keeps_segments_of_running_servers(tmp_path):
+    other = SharedPcmStore(directory=tmp_path)
+    live = other.create_from_pcm(np.zeros(10, dtype=np.float32), 22050)
+    # Segment serwera, który już nie działa (pid spoza zakresu), i segment w starym formacie
+    dead = tmp_path / "tts_pcm_999999999_abc.f32"
+    legacy = tmp_path / "tts_pcm_0123abcd.f32"
+    dead.touch()
+    legacy.touch()
+
+    SharedPcmStore(directory=tmp_path)
+
+    assert live.path.exists()
+    assert not dead.exists()
+    assert not legacy.exists()
@@ -0,0 +1,72 @@
+import threading
+from pathlib import Path
+
+import pytest
+
+from app.single_flight import SingleFlight
+
+KEY = ("xtts", "voice.wav", "Dzień dobry.", ".wav", False, False)
+
+
+def test_follower_joins_the_running_flight():
+    flights = SingleFlight()
+    flight, leader = flights.join(KEY, [Path("a.wav")])
+    joined, follower_leads = flights.join(KEY, [Path("b.wav")])
+
+    assert leader and not follower_leads
+    assert joined is flight
+    assert flights.stats() == {"in_flight": 1, "coalesced": 1}
+
+
+def test_close_collects_the_destinations_of_all_followers():
+    flights = SingleFlight()
+    flight, _ = flights.join(KEY, [Path("a.wav")])
+    flights.join(KEY, [Path("b.wav")])
+    # Ponowienie z tym samym plikiem nie dopisuje go drugi raz
+    flights.join(KEY, [Path("a.wav")])
+
+    assert flights.close(KEY, flight) == [Path("a.wav"), Path("b.wav")]
+    assert flights.stats()["in_flight"] == 0
+
+
+def test_failed_leader_propagates_the_error_and_frees_the_key():
+    flights = SingleFlight()
+    flight, _ = flights.join(KEY, [Path("a.wav")])
+    joined = threading.Event()
+    errors = []
+
+    def follower():
+        shared, _ = flights.join(KEY, [Path("b.wav")])
+        joined.set()
+        try:
+            shared.future.result(timeout=5)
+        except RuntimeError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=follower)
+    thread.start()
+    assert joined.wait(5)
+    # Jak w tts_server: lider bez wyniku zamyka lot i przekazuje błąd czekającym
+    flights.close(KEY, flight)
+    flight.future.set_exception(RuntimeError("Coalesced synthesis failed"))
+    thread.join(5)
+
+    assert [str(e) for e in errors] == ["Coalesced synthesis failed"]
+    assert flights.stats()["in_flight"] == 0
+    retry, leader = flights.join(KEY, [Path("a.wav")])
+    assert leader and retry is not flight
+
+
+def test_request_after_close_starts_a_fresh_flight():
+    flights = SingleFlight()
+    flight, _ = flights.join(KEY, [Path("a.wav")])
+    flights.close(KEY, flight)
+
+    fresh, leader = flights.join(KEY, [Path("b.wav")])
+    assert leader and fresh is not flight
+    assert fresh.destinations == [Path("b.wav")]
+    # Spóźnione zamknięcie starego lotu nie usuwa nowego
+    flights.close(KEY, flight)
+    assert flights.stats()["in_flight"] == 1
+    with pytest.raises(TimeoutError):
+        fresh.future.result(timeout=0)
@@ -0,0 +1,62 @@
+import re
+
+from hypothesis import given, settings, strategies as st
+
+from app.text_utils import split_text
+
+# Słowa bez skrótów z POLISH_ABBREVIATIONS (te są najwyżej 4-literowe), więc kropka po nich kończy zdanie
+WORDS = st.text(alphabet="abcdefghijklmnoprstuwyząćęłńóśźż", min_size=5, max_size=10)
+CLAUSE_END = st.sampled_from([",", ";", ":"])
+SENTENCE_END = st.sampled_from([".", "?", "!"])
+# Dowolny tekst: litery, cyfry, interpunkcja i różne białe znaki
+ANY_TEXT = st.text(alphabet="abcXYZąę0123 ,.;:!?-\"\n\t", max_size=1500)
+
+
+@st.composite
+def sentences(draw, max_words: int = 8) -> str:
+    """Zdanie z opcjonalnymi przecinkami między frazami, zakończone . ? lub !"""
+    words = draw(st.lists(WORDS, min_size=1, max_size=max_words))
+    parts = []
+    for i, word in enumerate(words):
+        if i < len(words) - 1 and draw(st.booleans()):
+            word += draw(CLAUSE_END)
+        parts.append(word)
+    return " ".join(parts) + draw(SENTENCE_END)
+
+
+def squeeze(text: str) -> str:
+    return re.sub(r"\s+", "", text)
+
+
+@settings(max_examples=300, deadline=None)
+@given(text=ANY_TEXT, max_len=st.integers(min_value=10, max_value=300))
+def test_chunks_fit_max_len(text, max_len):
+    assert all(len(chunk) <= max_len for chunk in split_text(text, max_len))
+
+
+@settings(max_examples=300, deadline=None)
+@given(text=ANY_TEXT, max_len=st.integers(min_value=10, max_value=300))
+def test_no_text_is_lost(text, max_len):
+    # Podział zmienia najwyżej białe znaki; słowo dłuższe niż max_len jest cięte bez spacji
+    assert squeeze("".join(split_text(text, max_len))) == squeeze(text)
+
+
+@settings(max_examples=200, deadline=None)
+@given(words=st.lists(WORDS, min_size=1, max_size=120), max_len=st.integers(min_value=10, max_value=200))
+def test_words_are_kept_whole(words, max_len):
+    text = " ".join(words)
+    chunks = split_text(text, max_len)
+    assert " ".join(chunks) == text
+
+
+@settings(max_examples=200, deadline=None)
+@given(parts=st.lists(sentences(), min_size=1, max_size=30), max_len=st.integers(min_value=100, max_value=300))
+def test_splits_fall_on_sentence_or_clause_boundaries(parts, max_len):
+    # Każde zdanie mieści się w max_len (najwyżej 8 słów po 11 znaków), więc podział nigdy
+    # nie musi ciąć w środku zdania ani frazy
+    text = " ".join(parts)
+    chunks = split_text(text, max_len)
+    assert " ".join(chunks) == text
+    for chunk in chunks[:-1]:
+        assert chunk[-1] in ".?!,;:"
+
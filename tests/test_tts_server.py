@@ -0,0 +1,104 @@
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+tts_server = pytest.importorskip("app.tts_server")
+from app.profiling import RequestProfile, activate
+from generators.audio_io import encode_pcm
+
+SAMPLE_RATE = 22050
+CHUNK_SAMPLES = SAMPLE_RATE // 10
+
+
+class OutOfOrderEngine:
+    """
+    Model online z submit(): fragment i kończy się tym później, im wcześniej go
+    zlecono, więc wyniki przychodzą w odwrotnej kolejności. Fragment zapisuje
+    stały sygnał o amplitudzie (i + 1) / 10, a fragment fail_at od razu kończy się
+    błędem (pozostałe zlecone są wtedy jeszcze w toku).
+    """
+
+    is_online = True
+
+    def __init__(self, chunks: list[str], fail_at: int | None = None):
+        self.chunks = chunks
+        self.fail_at = fail_at
+        self.futures: list[Future] = []
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+
+    def submit(self, text: str, output_path: str) -> Future:
+        index = self.chunks.index(text)
+        future: Future = Future()
+        self.futures.append(future)
+        with self._lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+
+        def work():
+            # Jak w puli wątków: zlecenie już wykonywane nie da się anulować
+            if not future.set_running_or_notify_cancel():
+                return
+            if index == self.fail_at:
+                with self._lock:
+                    self.running -= 1
+                future.set_exception(RuntimeError(f"chunk {index} failed"))
+                return
+            time.sleep(0.02 * (len(self.chunks) - index))
+            with self._lock:
+                self.running -= 1
+            encode_pcm(np.full(CHUNK_SAMPLES, (index + 1) / 10, dtype=np.float32), SAMPLE_RATE, output_path)
+            future.set_result(output_path)
+
+        threading.Thread(target=work, daemon=True).start()
+        return future
+
+    def tts(self, text: str, output_path: str) -> str:
+        raise AssertionError("online chunks are fetched through submit()")
+
+
+def long_text(chunks: list[str]) -> str:
+    return " ".join(chunks).ljust(tts_server.max_chars_for("online") + 1, ".")
+
+
+def test_windowed_fetches_are_reassembled_in_text_order(tmp_path):
+    chunks = [f"Fragment numer {i}." for i in range(6)]
+    engine = OutOfOrderEngine(chunks)
+    pcm_out: list = []
+
+    tts_server.generate_audio(engine, "online", long_text(chunks), tmp_path / "out.wav",
+                              pcm_out=pcm_out, text_chunks=chunks)
+
+    merged, sample_rate = pcm_out[0]
+    assert sample_rate == SAMPLE_RATE
+    levels = np.round(merged.reshape(len(chunks), CHUNK_SAMPLES).mean(axis=1) * 10)
+    assert levels.tolist() == [1, 2, 3, 4, 5, 6]
+    # Zapytania idą naraz, ale nie więcej niż okno
+    assert 1 < engine.max_running <= tts_server.ONLINE_FETCH_WINDOW
+
+
+def test_failed_fetch_drains_the_futures_in_flight(tmp_path):
+    chunks = [f"Fragment numer {i}." for i in range(6)]
+    engine = OutOfOrderEngine(chunks, fail_at=0)
+
+    with pytest.raises(RuntimeError, match="chunk 0 failed"):
+        tts_server.generate_audio(engine, "online", long_text(chunks), tmp_path / "out.wav",
+                                  text_chunks=chunks)
+
+    # Żaden zlecony fragment nie pisze już do usuniętego katalogu tymczasowego
+    assert engine.futures and all(future.done() for future in engine.futures)
+    assert not list(Path(tmp_path).glob("temp_*"))
+
+
+def test_split_chunks_is_profiled_as_the_split_stage():
+    profile = RequestProfile("xtts/tts")
+    with activate(profile):
+        chunks = tts_server.split_chunks("xtts", "Zdanie testowe numer jeden. " * 20)
+
+    assert len(chunks) > 1
+    assert profile.stages["split"][1] == 1
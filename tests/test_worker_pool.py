@@ -0,0 +1,71 @@
+import multiprocessing
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from app.worker_pool import WorkerProcessPool
+
+
+class SlowStartModel:
+    """Model zastępczy: zapisuje tekst do pliku; ładowanie (start procesu) trwa load_seconds."""
+
+    def __init__(self, load_seconds: float):
+        time.sleep(load_seconds)
+
+    def tts(self, text: str, output_path: str) -> str:
+        Path(output_path).write_text(text, encoding="utf-8")
+        return output_path
+
+
+def slow_start_factory(model_name: str, voice: Path | None) -> SlowStartModel:
+    return SlowStartModel(load_seconds=1.0)
+
+
+class SlowModel(SlowStartModel):
+    """Model zastępczy, którego synteza trwa sekundę."""
+
+    def tts(self, text: str, output_path: str) -> str:
+        time.sleep(1.0)
+        return super().tts(text, output_path)
+
+
+def slow_tts_factory(model_name: str, voice: Path | None) -> SlowModel:
+    return SlowModel(load_seconds=0.0)
+
+
+def test_recycling_does_not_block_the_request(tmp_path):
+    pool = WorkerProcessPool([slow_start_factory], max_requests=1)
+    try:
+        first = tmp_path / "1.txt"
+        assert pool.call("fake", None, "pierwszy", str(first)) == str(first)
+        # Recykling (nowy proces ładuje model przez sekundę) trwa jeszcze po zwróceniu wyniku,
+        # a proces nie wraca do puli wolnych przed końcem
+        assert pool.stats()[0]["recycles"] == 0
+        assert pool._idle.empty()
+        assert first.read_text(encoding="utf-8") == "pierwszy"
+
+        # Kolejne żądanie czeka, aż proces po recyklingu będzie gotowy
+        second = tmp_path / "2.txt"
+        assert pool.call("fake", None, "drugi", str(second)) == str(second)
+        assert pool.stats()[0]["recycles"] == 1
+        assert second.read_text(encoding="utf-8") == "drugi"
+    finally:
+        pool.close()
+
+
+def test_request_finishing_after_close_does_not_recycle(tmp_path):
+    pool = WorkerProcessPool([slow_tts_factory], max_requests=1)
+    caller = threading.Thread(target=pool.call, args=("fake", None, "w toku", str(tmp_path / "1.txt")))
+    caller.start()
+    time.sleep(0.3)
+    # Żądanie w toku kończy się już po close() i osiąga max_requests - bez nowego procesu
+    pool.close()
+    caller.join(10)
+
+    assert pool.stats()[0]["recycles"] == 0
+    assert not pool._recycling
+    assert not multiprocessing.active_children()
+    with pytest.raises(RuntimeError, match="closed"):
+        pool.call("fake", None, "po zamknięciu", str(tmp_path / "2.txt"))
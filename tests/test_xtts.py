@@ -0,0 +1,105 @@
+import threading
+from collections import OrderedDict
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("TTS")
+
+from generators.xtts import XTTSPolishTTS
+
+
+@pytest.fixture
+def caches(monkeypatch):
+    monkeypatch.setattr(XTTSPolishTTS, "_latents_cache", OrderedDict())
+    monkeypatch.setattr(XTTSPolishTTS, "_prefix_kv_cache", OrderedDict())
+    monkeypatch.setattr(XTTSPolishTTS, "_MAX_CACHED_VOICES", 2)
+    return XTTSPolishTTS._latents_cache
+
+
+def test_least_recently_used_voice_leaves_every_replica(caches):
+    for voice in ("a", "b"):
+        for replica in ("0:cpu", "1:cpu"):
+            XTTSPolishTTS._cache_put(caches, (replica, voice), voice)
+    # Odczyt odświeża głos "a" - przy trzecim głosie wypada "b" z obu replik
+    assert XTTSPolishTTS._cache_get(caches, ("1:cpu", "a")) == "a"
+    XTTSPolishTTS._cache_put(caches, ("0:cpu", "c"), "c")
+
+    assert {voice for _, voice in caches} == {"a", "c"}
+    assert ("0:cpu", "a") in caches and ("1:cpu", "a") in caches
+
+
+class StandInLatent:
+    """Latent zastępczy: pamięta urządzenie, na które go przeniesiono."""
+
+    def __init__(self, device: str):
+        self.device = device
+
+    def to(self, device: str) -> "StandInLatent":
+        return StandInLatent(device)
+
+
+class StandInReplica:
+    """Replika zastępcza: inferencja czeka na `release`, jeśli jest ustawione."""
+
+    def __init__(self, replica_id: str, calls: list, release: threading.Event | None = None):
+        self.replica_id = replica_id
+        self.calls = calls
+        self.release = release
+        self.started = threading.Event()
+        self.gpt = SimpleNamespace(gpt_inference=SimpleNamespace(transformer=None))
+
+    def inference(self, gpt_cond_latent, speaker_embedding, **kwargs):
+        self.calls.append((self.replica_id, gpt_cond_latent.device))
+        self.started.set()
+        if self.release is not None:
+            assert self.release.wait(5)
+        return {"wav": np.zeros(4, dtype=np.float32)}
+
+
+@pytest.fixture
+def replicas(monkeypatch, caches):
+    calls = []
+    release = threading.Event()
+    pool = {"0:cpu": StandInReplica("0:cpu", calls, release), "1:cpu": StandInReplica("1:cpu", calls)}
+    monkeypatch.setattr(XTTSPolishTTS, "_replicas", pool)
+    monkeypatch.setattr(XTTSPolishTTS, "_replica_devices", {"0:cpu": "cpu", "1:cpu": "cpu"})
+    monkeypatch.setattr(XTTSPolishTTS, "_replica_locks", {"0:cpu": threading.Lock(), "1:cpu": threading.Lock()})
+    monkeypatch.setattr(XTTSPolishTTS, "_replica_load", {"0:cpu": 0, "1:cpu": 0})
+    monkeypatch.setattr(XTTSPolishTTS, "_prefix_cache_enabled", False)
+    # Instancja bez ładowania modelu i liczenia latentów z pliku głosu
+    tts = object.__new__(XTTSPolishTTS)
+    tts.voice_key = "voice.wav"
+    tts.gpt_cond_latent = StandInLatent("cpu")
+    tts.speaker_embedding = StandInLatent("cpu")
+    return tts, pool, calls, release
+
+
+def test_request_goes_to_the_least_loaded_replica(replicas):
+    tts, pool, calls, release = replicas
+    busy = threading.Thread(target=tts.synthesize, args=("Pierwsza linia.",))
+    busy.start()
+    try:
+        assert pool["0:cpu"].started.wait(5)
+        # Replika 0 jest zajęta - kolejne żądanie trafia do wolnej repliki 1 zamiast czekać
+        assert tts.synthesize("Druga linia.").size == 4
+        assert calls == [("0:cpu", "cpu"), ("1:cpu", "cpu")]
+        assert XTTSPolishTTS._replica_load == {"0:cpu": 1, "1:cpu": 0}
+    finally:
+        release.set()
+        busy.join(5)
+    assert XTTSPolishTTS._replica_load == {"0:cpu": 0, "1:cpu": 0}
+
+
+def test_latents_are_cached_per_replica(replicas):
+    tts, pool, calls, release = replicas
+    release.set()
+    first = tts._latents_for("0:cpu")
+    second = tts._latents_for("1:cpu")
+
+    assert first is not second
+    assert set(XTTSPolishTTS._latents_cache) == {("0:cpu", "voice.wav"), ("1:cpu", "voice.wav")}
+    # Kolejne żądanie na tej samej replice używa latentów z cache, bez ponownego przenoszenia
+    assert tts._latents_for("1:cpu") is second